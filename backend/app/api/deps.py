@@ -1,4 +1,6 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
@@ -7,10 +9,28 @@ from app.crud import user as crud_user
 from app.db.deps import get_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
 
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
-    payload = decode_token(token)
+    return _user_from_token(db, token)
+
+
+def get_stream_user(
+    db: Session = Depends(get_db),
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    ticket: Optional[str] = Query(None, description="Билет из POST /events/ticket для EventSource, который не умеет передавать заголовки"),
+):
+    # В query принимается только короткоживущий билет потока: URL попадает в access log
+    if header_token:
+        return _user_from_token(db, header_token)
+    if ticket:
+        return _user_from_token(db, ticket, typ="stream")
+    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+
+def _user_from_token(db: Session, token: str, typ: str = "access"):
+    payload = decode_token(token, typ)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
     user_id = int(payload["sub"])
@@ -1,16 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from app.crud import user as crud_user
 from app.schemas.auth import UserLogin, UserRegister, TokenResponse
 from app.core.security import create_access_token
 from app.api.deps import get_current_user
-from app.core.image_utils import is_safe_image_file, process_avatar_image, cleanup_temp_file, get_avatar_url
-from app.core.supabase_storage import supabase_storage
+from app.core.config import settings
+from app.core.image_utils import ALLOWED_MIME_TYPES, EXTENSION_BY_MIME_TYPE, MAX_FILE_SIZE
+from app.core.storage import StorageError, delete_by_url, get_storage, original_key
+from app.crud import avatar_job as crud_avatar_job
+from app.models.avatar_job import AvatarJob
+from app.schemas.avatar import AvatarUploadRequest, AvatarUploadTicket, AvatarFinalizeRequest, AvatarJob as AvatarJobSchema
+from app.workers import avatar as avatar_worker
 from app.db.deps import get_db
 from app.models.user import User
-import tempfile
-import os
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 security = HTTPBearer()
@@ -51,69 +59,132 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
         "updated_at": current_user.updated_at
     }
 
-@router.post("/avatar")
+def _job_response(job: AvatarJob) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"{settings.API_V1_PREFIX}/auth/avatar/jobs/{job.id}",
+        },
+    )
+
+
+@router.post("/avatar", status_code=status.HTTP_202_ACCEPTED)
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Upload and update user avatar with comprehensive security checks.
+    Store the uploaded original and queue avatar processing.
+    Poll /auth/avatar/jobs/{job_id} for the result.
     """
+    # Validate file type
+    if not file.content_type or file.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=400, 
+            detail="Only JPEG, PNG and WebP images are allowed"
+        )
+    
+    # Check file size (5MB limit)
+    if file.size and file.size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400, 
+            detail="File size must be less than 5MB"
+        )
+
+    content = await file.read()
+    if len(content) > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail="File size must be less than 5MB"
+        )
+
+    # Тяжелая проверка и обработка изображения выполняются воркером
+    filename = f"{secrets.token_urlsafe(16)}{EXTENSION_BY_MIME_TYPE[file.content_type]}"
+    key = original_key(current_user.id, filename)
     try:
-        # Validate file type
-        if not file.content_type or file.content_type not in ['image/jpeg', 'image/png', 'image/webp']:
-            raise HTTPException(
-                status_code=400, 
-                detail="Only JPEG, PNG and WebP images are allowed"
-            )
-        
-        # Check file size (5MB limit)
-        if file.size and file.size > 5 * 1024 * 1024:
-            raise HTTPException(
-                status_code=400, 
-                detail="File size must be less than 5MB"
-            )
-        
-        # Create temporary file for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            # Write uploaded content to temp file
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
-            
-            try:
-                # Security validation
-                if not is_safe_image_file(temp_file.name, file.content_type):
-                    raise HTTPException(
-                        status_code=400, 
-                        detail="Invalid or unsafe image file"
-                    )
-                
-                # Process and save image
-                filename, avatar_url = await process_avatar_image(temp_file.name, current_user.id)
-                
-                # Update user's avatar_url in database
-                crud_user.update_user_avatar(db, current_user.id, avatar_url)
-                
-                return {
-                    "message": "Avatar uploaded successfully",
-                    "avatar_url": avatar_url,
-                    "filename": filename
-                }
-                
-            finally:
-                # Clean up temporary file
-                cleanup_temp_file(temp_file.name)
-                
-    except HTTPException:
-        raise
-    except Exception as e:
+        await get_storage().upload(key, content, file.content_type)
+    except StorageError as e:
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to upload avatar: {str(e)}"
         )
 
+    job = crud_avatar_job.create_job(db, current_user.id, key)
+    avatar_worker.notify()
+    return _job_response(job)
+
+
+@router.get("/avatar/jobs/{job_id}", response_model=AvatarJobSchema)
+def get_avatar_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status of an avatar processing job."""
+    job = crud_avatar_job.get_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/avatar/upload-url", response_model=AvatarUploadTicket)
+async def create_avatar_upload_url(
+    payload: AvatarUploadRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Issue a short-lived signed URL for uploading an avatar straight to storage.
+    The client then calls /auth/avatar/finalize with the returned key.
+    """
+    if payload.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail="Only JPEG, PNG and WebP images are allowed"
+        )
+
+    filename = f"{secrets.token_urlsafe(16)}{EXTENSION_BY_MIME_TYPE[payload.content_type]}"
+    try:
+        signed = await get_storage().create_signed_upload(
+            original_key(current_user.id, filename),
+            payload.content_type,
+            settings.SIGNED_UPLOAD_EXPIRE_SECONDS,
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=503, detail=f"Storage unavailable: {e}")
+
+    return AvatarUploadTicket(
+        key=signed.key,
+        upload_url=signed.url,
+        method=signed.method,
+        headers=signed.headers,
+        expires_in=signed.expires_in,
+        max_size=MAX_FILE_SIZE,
+    )
+
+
+@router.post("/avatar/finalize", status_code=status.HTTP_202_ACCEPTED)
+async def finalize_avatar_upload(
+    payload: AvatarFinalizeRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue processing of an original uploaded via a signed URL.
+    Poll /auth/avatar/jobs/{job_id} for the result.
+    """
+    if not payload.key.startswith(original_key(current_user.id, "")) or ".." in payload.key:
+        raise HTTPException(status_code=403, detail="Upload does not belong to the current user")
+    # Повторный finalize поставил бы второе задание, которое удалит оригинал первого
+    if crud_avatar_job.job_exists_for_source(db, payload.key):
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+
+    job = crud_avatar_job.create_job(db, current_user.id, payload.key)
+    avatar_worker.notify()
+    return _job_response(job)
+
 
 @router.put("/profile")
 async def update_profile(
@@ -156,20 +227,9 @@ async def remove_avatar(
     """
     try:
         if current_user.avatar_url:
-            # Extract filename from URL
-            filename = os.path.basename(current_user.avatar_url)
-            
-            # Try to delete from Supabase Storage first
-            if supabase_storage.is_available():
-                await supabase_storage.delete_avatar(current_user.id, filename)
-            else:
-                # Fallback to local filesystem deletion
-                try:
-                    avatar_path = os.path.join(os.path.dirname(__file__), "..", "..", "uploads", "avatars", filename)
-                    if os.path.exists(avatar_path):
-                        os.remove(avatar_path)
-                except Exception as e:
-                    print(f"Warning: Could not delete avatar file: {e}")
+            # Delete the stored object from whichever backend served it
+            if not await delete_by_url(current_user.avatar_url):
+                logger.warning(f"Could not delete avatar object: {current_user.avatar_url}")
             
             # Clear avatar_url in database
             crud_user.update_user_avatar(db, current_user.id, "")
@@ -3,7 +3,9 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
 from app.db.deps import get_db
-from app.schemas.channel import ChannelCreate, ChannelUpdate, ChannelPublic
+from app.core.config import settings
+from app.schemas.ordering import MoveRequest
+from app.schemas.channel import ChannelBatch, ChannelCreate, ChannelGroups, ChannelUpdate, ChannelPublic
 from app.crud import channel as crud_channel
 
 router = APIRouter(prefix="/channels", tags=["channels"])
@@ -37,6 +39,23 @@ def create_channel(
     return ch
 
 
+@router.post("/batch", response_model=list[ChannelPublic], summary="Пакетное изменение каналов в одной транзакции")
+def batch_channels(
+    payload: ChannelBatch,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    if len(payload.operations) > settings.CHANNEL_BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.CHANNEL_BATCH_MAX_OPERATIONS} operations per batch",
+        )
+    try:
+        return crud_channel.apply_batch(db, current_user, payload.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.get("/{channel_id}", response_model=ChannelPublic, summary="Получить канал по id (только свой)")
 def get_channel(
     channel_id: int,
@@ -46,7 +65,7 @@ def get_channel(
     ch = crud_channel.get(db, channel_id)
     if not ch or ch.user_id != current_user.id:
         raise HTTPException(status_code=404, detail="Channel not found")
-    return ch
+    return crud_channel.load_group_ids(db, [ch])[0]
 
 
 @router.put("/{channel_id}", response_model=ChannelPublic, summary="Обновить канал (только свой)")
@@ -72,6 +91,22 @@ def update_channel(
     return ch
 
 
+@router.post("/{channel_id}/move", response_model=ChannelPublic, summary="Переместить канал в списке (только свой)")
+def move_channel(
+    channel_id: int,
+    payload: MoveRequest,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    ch = crud_channel.get(db, channel_id)
+    if not ch or ch.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    try:
+        return crud_channel.move(db, ch, payload.after_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
 @router.delete("/{channel_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Удалить канал (только свой)")
 def delete_channel(
     channel_id: int,
@@ -85,6 +120,19 @@ def delete_channel(
     return None
 
 
+@router.put("/{channel_id}/groups", response_model=ChannelPublic, summary="Задать группы канала (только свой)")
+def set_channel_groups(
+    channel_id: int,
+    payload: ChannelGroups,
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    ch = crud_channel.get(db, channel_id)
+    if not ch or ch.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Channel not found")
+    return crud_channel.set_groups(db, ch, payload.group_ids)
+
+
 @router.delete("/{channel_id}/groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Удалить канал из группы")
 def remove_channel_from_group(
     channel_id: int,
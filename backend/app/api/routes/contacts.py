@@ -1,15 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Iterator, List, Literal, Optional
 from app.api.deps import get_db, get_current_user
+from app.models.contact import Contact
 from app.models.user import User
 from app.crud.contact import (
     create_contact, 
     get_user_contacts, 
     remove_contact, 
     search_users,
-    is_contact
+    get_contact_user_ids,
+    iter_contact_cards,
 )
+from app.core.export import EXPORT_FORMATS, render_stream
+from app.crud.sync import CursorExpiredError, sync_contacts
+from app.core.timing import phase
+from app.schemas.channel import ChannelPublic
 from app.schemas.user import UserPublic
 
 router = APIRouter()
@@ -31,11 +38,12 @@ async def search_users_endpoint(
     # Исключаем текущего пользователя из результатов
     users = [user for user in users if user.id != current_user.id]
     
-    # Добавляем информацию о том, является ли пользователь уже контактом
+    # Добавляем информацию о том, является ли пользователь уже контактом (одним запросом)
+    contact_ids = get_contact_user_ids(db, current_user.id, [user.id for user in users])
     result = []
     for user in users:
         user_data = UserPublic.model_validate(user).model_dump()
-        user_data["is_contact"] = is_contact(db, current_user.id, user.id)
+        user_data["is_contact"] = user.id in contact_ids
         result.append(user_data)
     
     return {"users": result}
@@ -48,15 +56,73 @@ async def get_contacts(
 ):
     """Получить список контактов пользователя"""
     contacts = get_user_contacts(db, current_user.id)
-    
+    return {"contacts": serialize_contacts(contacts)}
+
+
+def serialize_contacts(contacts: List[Contact]) -> List[dict]:
+    """Profiles of the contacts' users with the contact id and when they were added."""
     result = []
     for contact in contacts:
         user_data = UserPublic.model_validate(contact.contact_user).model_dump()
         user_data["contact_id"] = contact.id
         user_data["added_at"] = contact.created_at
         result.append(user_data)
-    
-    return {"contacts": result}
+    return result
+
+
+@router.get("/sync")
+def sync_contacts_endpoint(
+    cursor: Optional[str] = Query(None, description="Курсор из предыдущего ответа; без него — полный снимок"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Изменения записной книжки после курсора: контакты, их профили и публичные каналы.
+
+    Повторять с новым курсором, пока has_more. 410 — курсор устарел, нужна полная синхронизация.
+    """
+    try:
+        result = sync_contacts(db, current_user.id, cursor)
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    with phase("serialize"):
+        return {
+            "cursor": result.cursor,
+            "has_more": result.has_more,
+            "full": result.full,
+            "contacts": serialize_contacts(result.contacts),
+            "removed_contacts": result.removed_contacts,
+            "profiles": [UserPublic.model_validate(u).model_dump() for u in result.profiles],
+            "channels": [ChannelPublic.model_validate(ch).model_dump() for ch in result.channels],
+            "removed_channels": result.removed_channels,
+        }
+
+
+@router.get("/export")
+def export_contacts(
+    fmt: Literal["vcf", "csv", "ndjson"] = Query("vcf", alias="format", description="vcf, csv или ndjson"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Выгрузка всех контактов с их публичными каналами потоком (vCard, CSV или NDJSON)"""
+    user_id = current_user.id
+    # Сессия запроса закрывается до отправки тела — поток читает БД через собственную сессию
+    bind = db.get_bind()
+    db.close()
+
+    def content() -> Iterator[str]:
+        with Session(bind=bind) as export_db:
+            yield from render_stream(iter_contact_cards(export_db, user_id), fmt)
+
+    media_type, extension, _, _ = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        content(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="contacts.{extension}"'},
+    )
 
 
 @router.post("/add/{user_id}")
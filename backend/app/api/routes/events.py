@@ -0,0 +1,69 @@
+from typing import AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user, get_stream_user
+from app.core.config import settings
+from app.core.events import Subscription, TooManyConnectionsError, event_hub, format_sse
+from app.core.security import create_stream_ticket
+from app.db.deps import get_db
+from app.models.user import User
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+async def event_stream(subscription: Subscription, heartbeat: float) -> AsyncIterator[str]:
+    """SSE frames for one subscription; unsubscribes when the client goes away."""
+    try:
+        # Клиент переподключается через 5 секунд и затем догоняет изменения через /contacts/sync
+        yield "retry: 5000\n\n"
+        while True:
+            item = await subscription.next(heartbeat)
+            if item is None:
+                # Комментарий держит соединение открытым через прокси
+                yield ": ping\n\n"
+                continue
+            yield format_sse(item)
+    finally:
+        event_hub.unsubscribe(subscription)
+
+
+@router.post("/ticket", summary="Короткоживущий билет для подключения EventSource")
+def stream_ticket(current_user: User = Depends(get_current_user)) -> dict:
+    """
+    A ticket for ``GET /events/stream?ticket=...``.
+
+    Browsers' EventSource cannot send an Authorization header. The ticket only
+    opens a stream and expires after ``EVENTS_TICKET_SECONDS``, so a URL that
+    ends up in access logs does not leak a session token.
+    """
+    return {"ticket": create_stream_ticket(current_user.id), "expires_in": settings.EVENTS_TICKET_SECONDS}
+
+
+@router.get("/stream", summary="Поток уведомлений об изменениях контактов (SSE)")
+async def stream(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_stream_user),
+):
+    """
+    Server-sent events about the contact book of the current user.
+
+    ``change`` events name the changed entity (``contact``, ``profile`` or
+    ``channel`` of a contact); ``resync`` means events were dropped. Either way
+    the client catches up with ``GET /contacts/sync`` from its cursor.
+    """
+    user_id = current_user.id
+    # Соединение с БД не нужно на все время жизни потока — возвращаем его в пул
+    db.close()
+    try:
+        subscription = event_hub.subscribe(user_id)
+    except TooManyConnectionsError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        event_stream(subscription, settings.EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
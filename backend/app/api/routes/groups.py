@@ -1,21 +1,30 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.orm import Session
 from app.api.deps import get_db, get_current_user
+from app.core.etag import json_with_etag
 from app.crud import group as crud_group
-from app.schemas.group import Group, GroupCreate, GroupUpdate
+from app.schemas.group import Group, GroupChannels, GroupCreate, GroupTree, GroupUpdate
+from app.schemas.ordering import MoveRequest
 from app.models.user import User
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Group])
+@router.get("/", response_model=Union[List[Group], GroupTree])
 def get_groups(
+    request: Request,
+    include: Optional[Literal["channels"]] = Query(None, description="channels — вернуть дерево групп с каналами"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get all groups for the current user."""
-    return crud_group.get_groups(db, current_user.id)
+    """Get all groups for the current user, optionally as a tree with their channels."""
+    if include != "channels":
+        return crud_group.get_groups(db, current_user.id)
+
+    groups, ungrouped = crud_group.get_group_tree(db, current_user.id)
+    tree = GroupTree.model_validate({"groups": groups, "ungrouped": ungrouped}, from_attributes=True)
+    return json_with_etag(request, tree)
 
 
 @router.post("/", response_model=Group, status_code=status.HTTP_201_CREATED)
@@ -73,6 +82,29 @@ def update_group(
         )
 
 
+@router.post("/{group_id}/move", response_model=Group)
+def move_group(
+    group_id: int,
+    payload: MoveRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move a group right after another one (or to the top)."""
+    try:
+        group = crud_group.move_group(db, group_id, payload.after_id, current_user.id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
+    return group
+
+
 @router.delete("/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_group(
     group_id: int,
@@ -86,3 +118,35 @@ def delete_group(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Group not found"
         )
+
+
+@router.post("/{group_id}/channels", status_code=status.HTTP_204_NO_CONTENT)
+def add_channels_to_group(
+    group_id: int,
+    payload: GroupChannels,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Add several channels to a group at once."""
+    added = crud_group.add_channels(db, group_id, payload.channel_ids, current_user.id)
+    if added is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
+
+
+@router.delete("/{group_id}/channels", status_code=status.HTTP_204_NO_CONTENT)
+def remove_channels_from_group(
+    group_id: int,
+    channel_ids: List[int] = Query(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Remove several channels from a group at once."""
+    removed = crud_group.remove_channels(db, group_id, channel_ids, current_user.id)
+    if removed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.api.routes.contacts import serialize_contacts
+from app.core.etag import json_with_etag
+from app.core.timing import phase
+from app.crud import channel as crud_channel
+from app.crud import group as crud_group
+from app.crud import recovery as crud_recovery
+from app.crud.contact import get_user_contacts
+from app.db.deps import get_db
+from app.models.user import User
+from app.schemas.channel import ChannelPublic
+from app.schemas.group import Group as GroupSchema
+from app.schemas.recovery import SecurityInfo
+from app.schemas.user import UserPublic
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+
+@router.get("/bootstrap", summary="Все данные кабинета одним запросом")
+def bootstrap(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Everything the dashboard loads after sign-in: the same payloads as
+    ``/auth/me``, ``/channels``, ``/groups``, ``/contacts/`` and ``/auth/security``.
+
+    One token check and one session; the response carries an ETag, so an
+    unchanged dashboard is revalidated with an empty 304.
+    """
+    channels = crud_channel.list_for_user(db, current_user.id)
+    groups = crud_group.get_groups(db, current_user.id)
+    contacts = get_user_contacts(db, current_user.id)
+    # Пользователь уже в identity map сессии — уровень защиты считается без запроса
+    security = crud_recovery.get_security_info(db, current_user.id)
+
+    with phase("serialize"):
+        payload = {
+            "user": UserPublic.model_validate(current_user).model_dump(),
+            "channels": [ChannelPublic.model_validate(ch).model_dump() for ch in channels],
+            "groups": [GroupSchema.model_validate(g).model_dump() for g in groups],
+            "contacts": serialize_contacts(contacts),
+            "security": SecurityInfo(**security).model_dump(),
+        }
+    return json_with_etag(request, payload)
@@ -8,13 +8,16 @@ from app.crud import group as crud_group
 from app.schemas.auth import OAuthUserInfo, TokenResponse
 from app.core.security import create_access_token
 from app.core.config import settings
-import httpx
+from app.core.http_client import oauth_http_client
+from app.core.tracing import tracer
 import json
 import secrets
+from urllib.parse import urlencode
 
 router = APIRouter(prefix="/oauth", tags=["oauth"])
 
 
+@tracer.start_as_current_span("oauth.create_channels")
 def create_oauth_channels(db: Session, user, provider: str, user_info: dict):
     """Create channels automatically based on OAuth provider and user info."""
     try:
@@ -103,79 +106,102 @@ def create_oauth_channels(db: Session, user, provider: str, user_info: dict):
 
 async def get_google_user_info(access_token: str) -> dict:
     """Get user info from Google."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://www.googleapis.com/oauth2/v2/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get Google user info")
-        return response.json()
+    client = oauth_http_client()
+    response = await client.get(
+        f"{settings.GOOGLE_API_URL}/oauth2/v2/userinfo",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get Google user info")
+    return response.json()
 
 
 async def get_github_user_info(access_token: str) -> dict:
     """Get user info from GitHub."""
-    async with httpx.AsyncClient() as client:
-        # Get user info
-        user_response = await client.get(
-            "https://api.github.com/user",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        if user_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get GitHub user info")
-        
-        user_data = user_response.json()
-        
-        # Get email (might be private)
-        email_response = await client.get(
-            "https://api.github.com/user/emails",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        emails = email_response.json() if email_response.status_code == 200 else []
-        primary_email = next((email["email"] for email in emails if email["primary"]), user_data.get("email"))
-        
-        return {
-            "id": str(user_data["id"]),
-            "email": primary_email,
-            "name": user_data.get("name", ""),
-            "login": user_data.get("login", ""),
-            "avatar_url": user_data.get("avatar_url")
-        }
+    client = oauth_http_client()
+    # Get user info
+    user_response = await client.get(
+        f"{settings.GITHUB_API_URL}/user",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if user_response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get GitHub user info")
+    
+    user_data = user_response.json()
+    
+    # Get email (might be private)
+    email_response = await client.get(
+        f"{settings.GITHUB_API_URL}/user/emails",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    emails = email_response.json() if email_response.status_code == 200 else []
+    primary_email = next((email["email"] for email in emails if email["primary"]), user_data.get("email"))
+    
+    return {
+        "id": str(user_data["id"]),
+        "email": primary_email,
+        "name": user_data.get("name", ""),
+        "login": user_data.get("login", ""),
+        "avatar_url": user_data.get("avatar_url")
+    }
 
 
 async def get_discord_user_info(access_token: str) -> dict:
     """Get user info from Discord."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://discord.com/api/users/@me",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get Discord user info")
-        return response.json()
+    client = oauth_http_client()
+    response = await client.get(
+        f"{settings.DISCORD_API_URL}/users/@me",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get Discord user info")
+    return response.json()
 
 
 async def get_telegram_user_info(access_token: str) -> dict:
     """Get user info from Telegram."""
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.telegram.org/bot/getMe",
-            headers={"Authorization": f"Bearer {access_token}"}
-        )
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to get Telegram user info")
-        return response.json()
+    client = oauth_http_client()
+    response = await client.get(
+        f"{settings.TELEGRAM_API_URL}/bot/getMe",
+        headers={"Authorization": f"Bearer {access_token}"}
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to get Telegram user info")
+    return response.json()
+
+
+async def exchange_code_for_token(token_url: str, data: dict) -> str:
+    """Exchange an authorization code for an access token over the shared async client."""
+    client = oauth_http_client()
+    token_response = await client.post(token_url, data=data, headers={"Accept": "application/json"})
+    
+    if token_response.status_code != 200:
+        raise HTTPException(status_code=400, detail="Failed to exchange code for token")
+    
+    access_token = token_response.json().get("access_token")
+    if not access_token:
+        raise HTTPException(status_code=400, detail="No access token received")
+    return access_token
 
 
 @router.get("/google")
 async def google_login(request: Request):
     """Initiate Google OAuth login."""
-    from app.core.oauth import oauth
-    
     # Get redirect_uri from query params or use default
     redirect_uri = request.query_params.get("redirect_uri", "http://localhost:3000/auth/callback/google")
     
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    # State и redirect_uri храним в сессии: они нужны для проверки и обмена кода
+    state = secrets.token_urlsafe(32)
+    request.session["google_oauth"] = {"state": state, "redirect_uri": redirect_uri}
+    
+    params = {
+        "client_id": settings.GOOGLE_CLIENT_ID,
+        "redirect_uri": redirect_uri,
+        "response_type": "code",
+        "scope": "openid email profile",
+        "state": state,
+    }
+    return RedirectResponse(url=f"{settings.GOOGLE_ACCOUNTS_URL}/o/oauth2/v2/auth?{urlencode(params)}")
 
 
 @router.get("/github")
@@ -189,7 +215,7 @@ async def github_login(request: Request):
     
     # Build GitHub authorization URL
     auth_url = (
-        f"https://github.com/login/oauth/authorize"
+        f"{settings.GITHUB_URL}/login/oauth/authorize"
         f"?client_id={settings.GITHUB_CLIENT_ID}"
         f"&redirect_uri={redirect_uri}"
         f"&scope=user:email"
@@ -209,7 +235,7 @@ async def discord_login(request: Request):
     
     # Generate authorization URL
     auth_url = discord_oauth.create_authorization_url(
-        "https://discord.com/api/oauth2/authorize",
+        f"{settings.DISCORD_API_URL}/oauth2/authorize",
         redirect_uri=redirect_uri
     )
     
@@ -219,10 +245,25 @@ async def discord_login(request: Request):
 @router.get("/google/callback", response_model=TokenResponse)
 async def google_callback(request: Request, db: Session = Depends(get_db)):
     """Handle Google OAuth callback."""
-    from app.core.oauth import oauth
+    code = request.query_params.get("code")
+    pending = request.session.pop("google_oauth", None)
     
-    token = await oauth.google.authorize_access_token(request)
-    user_info = await get_google_user_info(token["access_token"])
+    if not code:
+        raise HTTPException(status_code=400, detail="Authorization code not provided")
+    if not pending or not secrets.compare_digest(pending["state"], request.query_params.get("state", "")):
+        raise HTTPException(status_code=400, detail="Invalid OAuth state")
+    
+    access_token = await exchange_code_for_token(
+        settings.GOOGLE_TOKEN_URL,
+        {
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": pending["redirect_uri"],
+        },
+    )
+    user_info = await get_google_user_info(access_token)
     
     # Create OAuth user data
     oauth_data = OAuthUserInfo(
@@ -257,27 +298,16 @@ async def github_callback(request: Request, db: Session = Depends(get_db)):
     if not code:
         raise HTTPException(status_code=400, detail="Authorization code not provided")
     
-    # Exchange code for token using simple HTTP request
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            "https://github.com/login/oauth/access_token",
-            data={
-                "client_id": settings.GITHUB_CLIENT_ID,
-                "client_secret": settings.GITHUB_CLIENT_SECRET,
-                "code": code,
-                "redirect_uri": str(request.url_for("github_callback"))
-            },
-            headers={"Accept": "application/json"}
-        )
-        
-        if token_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to exchange code for token")
-        
-        token_data = token_response.json()
-        access_token = token_data.get("access_token")
-        
-        if not access_token:
-            raise HTTPException(status_code=400, detail="No access token received")
+    # Exchange code for token
+    access_token = await exchange_code_for_token(
+        f"{settings.GITHUB_URL}/login/oauth/access_token",
+        {
+            "client_id": settings.GITHUB_CLIENT_ID,
+            "client_secret": settings.GITHUB_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": str(request.url_for("github_callback"))
+        },
+    )
     
     # Get user info from GitHub
     user_info = await get_github_user_info(access_token)
@@ -310,8 +340,6 @@ async def github_callback(request: Request, db: Session = Depends(get_db)):
 @router.get("/discord/callback", response_model=TokenResponse)
 async def discord_callback(request: Request, db: Session = Depends(get_db)):
     """Handle Discord OAuth callback."""
-    from app.core.oauth import discord_oauth
-    
     # Get authorization code from query params
     code = request.query_params.get("code")
     state = request.query_params.get("state")
@@ -319,14 +347,19 @@ async def discord_callback(request: Request, db: Session = Depends(get_db)):
     if not code:
         raise HTTPException(status_code=400, detail="Authorization code not provided")
     
-    # Exchange code for token
-    token = discord_oauth.fetch_token(
-        "https://discord.com/api/oauth2/token",
-        code=code,
-        redirect_uri=str(request.url_for("discord_callback"))
+    # Exchange code for token (асинхронно, не блокируя event loop)
+    access_token = await exchange_code_for_token(
+        f"{settings.DISCORD_API_URL}/oauth2/token",
+        {
+            "client_id": settings.DISCORD_CLIENT_ID,
+            "client_secret": settings.DISCORD_CLIENT_SECRET,
+            "code": code,
+            "grant_type": "authorization_code",
+            "redirect_uri": str(request.url_for("discord_callback"))
+        },
     )
     
-    user_info = await get_discord_user_info(token["access_token"])
+    user_info = await get_discord_user_info(access_token)
     
     # Create OAuth user data
     oauth_data = OAuthUserInfo(
@@ -1,25 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.etag import PUBLIC_REVALIDATE, json_with_etag
+from app.core.timing import phase
+from app.crud.channel import load_group_ids
+from app.crud.group import get_group_tree
 from app.db.deps import get_db
 from app.models.user import User
 from app.models.channel import Channel
 from app.models.group import Group
-from app.schemas.user import UserPublic
+from app.schemas.user import PublicProfilesRequest, UserPublic
 from app.schemas.channel import ChannelPublic
-from app.schemas.group import Group as GroupSchema
+from app.schemas.group import Group as GroupSchema, GroupTree
 
 router = APIRouter(prefix="/public", tags=["public"])
 
 
 @router.get("/{username}", summary="Публичный профиль по username")
-def public_profile(username: str, db: Session = Depends(get_db)) -> dict:
+def public_profile(
+    username: str,
+    request: Request,
+    include: Optional[Literal["channels"]] = Query(None, description="channels — группы с каналами и каналы без группы"),
+    db: Session = Depends(get_db),
+):
     # Находим пользователя
     user = db.scalar(select(User).where(User.username == username))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    if include == "channels":
+        groups, ungrouped = get_group_tree(db, user.id, public_only=True)
+        with phase("serialize"):
+            tree = GroupTree.model_validate({"groups": groups, "ungrouped": ungrouped}, from_attributes=True)
+            payload = {"user": _public_user(user), **tree.model_dump()}
+        return json_with_etag(request, payload, PUBLIC_REVALIDATE)
+
     # Публичные каналы (is_public = true), сортировка
     channels = list(
         db.scalars(
@@ -28,6 +47,7 @@ def public_profile(username: str, db: Session = Depends(get_db)) -> dict:
             .order_by(Channel.sort_order, Channel.id)
         ).all()
     )
+    load_group_ids(db, channels)
 
     # Группы пользователя
     groups = list(
@@ -38,12 +58,86 @@ def public_profile(username: str, db: Session = Depends(get_db)) -> dict:
         ).all()
     )
 
+    with phase("serialize"):
+        return _profile_payload(user, channels, groups)
+
+
+def _public_user(user: User) -> dict:
     # Возвращаем минимально необходимую публичную инфу (без email)
     user_data = UserPublic.model_validate(user).model_dump()
     user_data.pop("email", None)
+    return user_data
+
 
+def _profile_payload(user: User, channels: list[Channel], groups: list[Group]) -> dict:
     return {
-        "user": user_data,
+        "user": _public_user(user),
         "channels": [ChannelPublic.model_validate(ch).model_dump() for ch in channels],
         "groups": [GroupSchema.model_validate(g).model_dump() for g in groups],
     }
+
+
+def public_profiles(db: Session, usernames: list[str]) -> dict:
+    """
+    Public profiles of many users with a constant number of queries.
+
+    Users, their public channels, the channels' group ids and the users' groups
+    are each loaded with one IN-list query, whatever the number of usernames.
+
+    Returns:
+        dict: ``profiles`` keyed by username (in request order) and the
+            ``missing`` usernames that do not exist
+    """
+    requested = list(dict.fromkeys(usernames))
+    users = {u.username: u for u in db.scalars(select(User).where(User.username.in_(requested)))}
+    user_ids = [u.id for u in users.values()]
+
+    channels: dict[int, list[Channel]] = {user_id: [] for user_id in user_ids}
+    groups: dict[int, list[Group]] = {user_id: [] for user_id in user_ids}
+    if user_ids:
+        public_channels = list(db.scalars(
+            select(Channel)
+            .where(Channel.user_id.in_(user_ids), Channel.is_public == True)  # noqa: E712
+            .order_by(Channel.sort_order, Channel.id)
+        ))
+        load_group_ids(db, public_channels)
+        for ch in public_channels:
+            channels[ch.user_id].append(ch)
+        for g in db.scalars(
+            select(Group).where(Group.user_id.in_(user_ids)).order_by(Group.sort_order, Group.name)
+        ):
+            groups[g.user_id].append(g)
+
+    with phase("serialize"):
+        return {
+            "profiles": {
+                name: _profile_payload(users[name], channels[users[name].id], groups[users[name].id])
+                for name in requested
+                if name in users
+            },
+            "missing": [name for name in requested if name not in users],
+        }
+
+
+def _check_batch_size(usernames: list[str]) -> None:
+    if len(usernames) > settings.PUBLIC_BATCH_MAX_USERNAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.PUBLIC_BATCH_MAX_USERNAMES} usernames per request",
+        )
+
+
+@router.get("", summary="Публичные профили нескольких пользователей")
+def public_profiles_by_query(
+    usernames: str = Query(..., description="Список username через запятую"),
+    db: Session = Depends(get_db),
+) -> dict:
+    names = [name.strip() for name in usernames.split(",") if name.strip()]
+    _check_batch_size(names)
+    return public_profiles(db, names)
+
+
+@router.post("/batch", summary="Публичные профили нескольких пользователей (большие списки)")
+def public_profiles_batch(payload: PublicProfilesRequest, db: Session = Depends(get_db)) -> dict:
+    _check_batch_size(payload.usernames)
+    return public_profiles(db, payload.usernames)
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from app.core.image_utils import MAX_FILE_SIZE
+from app.core.storage import ObjectExistsError, StorageError, local_storage
+from app.crud import avatar_job as crud_avatar_job
+from app.db.deps import get_db
+
+router = APIRouter(prefix="/storage", tags=["storage"])
+
+
+@router.put("/upload/{token}", status_code=status.HTTP_201_CREATED, summary="Загрузка по подписанной ссылке (локальное хранилище)")
+async def signed_upload(token: str, request: Request, db: Session = Depends(get_db)):
+    """
+    Accept a direct upload signed by the local storage stand-in.
+
+    Mirrors the signed upload URLs issued by Supabase Storage, so clients use
+    the same flow whether or not a remote bucket is configured. A URL is
+    single-use: the signed key cannot be written again, including after the
+    original was queued for processing and removed.
+    """
+    try:
+        claims = local_storage.verify_upload_token(token)
+    except StorageError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+
+    if request.headers.get("content-type") != claims["content_type"]:
+        raise HTTPException(status_code=400, detail="Content-Type does not match the signed upload")
+    if crud_avatar_job.job_exists_for_source(db, claims["key"]):
+        raise HTTPException(status_code=409, detail="Upload URL already used")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_FILE_SIZE:
+            raise HTTPException(status_code=413, detail="File size must be less than 5MB")
+
+    try:
+        await local_storage.upload_new(claims["key"], bytes(body))
+    except ObjectExistsError:
+        raise HTTPException(status_code=409, detail="Upload URL already used")
+    except StorageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"key": claims["key"]}
@@ -1,5 +1,11 @@
+from pathlib import Path
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Каталог backend/: относительные пути к файлам не зависят от рабочего каталога процесса
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "OneID API"
@@ -24,7 +30,46 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = ""
     SUPABASE_KEY: str = ""
     SUPABASE_BUCKET: str = "avatars"
-    
+
+    # Object storage: "auto" uses Supabase when configured, otherwise local files
+    STORAGE_BACKEND: str = "auto"
+    LOCAL_STORAGE_DIR: str = "uploads"
+    API_BASE_URL: str = "http://localhost:8000"
+    STORAGE_TIMEOUT: float = 10.0
+    STORAGE_CONNECT_TIMEOUT: float = 3.0
+    STORAGE_POOL_SIZE: int = 10
+    STORAGE_MAX_RETRIES: int = 3
+    STORAGE_RETRY_BACKOFF: float = 0.2  # seconds, base for exponential backoff
+    SIGNED_UPLOAD_EXPIRE_SECONDS: int = 600
+
+    # Раздача аватаров через reverse proxy: "X-Accel-Redirect" (nginx) или "X-Sendfile"
+    AVATAR_SENDFILE_HEADER: str = ""
+    AVATAR_SENDFILE_PREFIX: str = "/protected-uploads"
+
+    # Avatar processing jobs: in-process workers per API process; off by default,
+    # deployments without a dedicated ``python -m app.workers.avatar`` process turn them on
+    AVATAR_WORKER_CONCURRENCY: int = 0
+    AVATAR_JOB_POLL_INTERVAL: float = 1.0
+    AVATAR_JOB_TIMEOUT: int = 300
+    AVATAR_JOB_MAX_ATTEMPTS: int = 3
+
+    # Bulk endpoints
+    CHANNEL_BATCH_MAX_OPERATIONS: int = 200
+    PUBLIC_BATCH_MAX_USERNAMES: int = 500
+
+    # Contact book delta sync
+    SYNC_PAGE_SIZE: int = 500  # change log rows per page
+    SYNC_RETENTION_DAYS: int = 30  # older cursors get 410 and must do a full sync
+    SYNC_PRUNE_INTERVAL: int = 3600  # seconds between change log pruning runs in each API process; 0 disables
+
+    # Push notifications of contact changes (server-sent events)
+    EVENTS_BROKER: str = "auto"  # auto (postgres on PostgreSQL, else local) | local (single worker) | postgres
+    EVENTS_QUEUE_SIZE: int = 100  # per stream; a client that falls behind gets a single resync event
+    EVENTS_MAX_CONNECTIONS: int = 1000  # open streams per worker process
+    EVENTS_MAX_CONNECTIONS_PER_USER: int = 5
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    EVENTS_TICKET_SECONDS: int = 60  # lifetime of a ?ticket= for EventSource clients
+
     # OAuth Configuration
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
@@ -33,6 +78,53 @@ class Settings(BaseSettings):
     DISCORD_CLIENT_ID: str = ""
     DISCORD_CLIENT_SECRET: str = ""
 
+    # Provider endpoints (overridable to point at stand-in servers, see benchmarks.fakes)
+    GOOGLE_ACCOUNTS_URL: str = "https://accounts.google.com"
+    GOOGLE_TOKEN_URL: str = "https://oauth2.googleapis.com/token"
+    GOOGLE_API_URL: str = "https://www.googleapis.com"
+    GITHUB_URL: str = "https://github.com"
+    GITHUB_API_URL: str = "https://api.github.com"
+    DISCORD_API_URL: str = "https://discord.com/api"
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+
+    # Observability
+    METRICS_ENABLED: bool = True
+    SLOW_QUERY_MS: int = 200  # 0 disables the slow query log
+    SQL_N_PLUS_ONE_MODE: str = "off"  # off | warn | raise
+    SQL_N_PLUS_ONE_THRESHOLD: int = 10
+    SERVER_TIMING_ENABLED: bool = True
+    SLOW_REQUEST_MS: int = 1000  # requests slower than this are logged at INFO
+
+    # Request profiling (collapsed stacks for flamegraphs)
+    PROFILING_ENABLED: bool = False
+    PROFILE_SAMPLE_RATE: float = 0.0  # fraction of requests profiled at random
+    PROFILE_TOKEN: str = ""  # X-Profile-Token value forcing a profile; empty disables
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 200
+
+    # Tracing (OpenTelemetry)
+    TRACING_ENABLED: bool = False
+    TRACING_SERVICE_NAME: str = "oneid-api"
+    TRACING_SAMPLE_RATE: float = 0.1  # head sampling of root spans
+    TRACING_EXPORTER: str = "otlp"  # otlp | file | console
+    OTLP_ENDPOINT: str = ""  # e.g. http://localhost:4318/v1/traces
+    TRACING_FILE: str = "traces.jsonl"
+
+    # Production server (gunicorn.conf.py)
+    DB_MIGRATIONS: str = "check"  # check | upgrade | off, once per container at startup
+    WEB_CONCURRENCY: int = 0  # worker processes; 0 sizes the pool from CPU and memory limits
+    WORKER_MEMORY_MB: int = 160
+    WORKER_MAX_REQUESTS: int = 10000  # recycle a worker after this many requests; 0 disables
+    WORKER_MAX_REQUESTS_JITTER: int = 1000
+    WORKER_TIMEOUT: int = 60
+    WORKER_GRACEFUL_TIMEOUT: int = 30
+
+    @field_validator("LOCAL_STORAGE_DIR")
+    @classmethod
+    def _resolve_storage_dir(cls, value: str) -> str:
+        return str(BACKEND_DIR / value)
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
 
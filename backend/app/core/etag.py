@@ -0,0 +1,49 @@
+"""Conditional JSON responses: strong ETag over the rendered body and 304 on match."""
+import hashlib
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.metrics import record_cache
+from app.core.timing import TimedJSONResponse
+
+PRIVATE_REVALIDATE = "private, no-cache"
+PUBLIC_REVALIDATE = "public, no-cache"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match lists ``etag`` (weak comparison, as for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def json_with_etag(request: Request, content: Any, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """
+    Render ``content`` as JSON and tag it with a hash of the body.
+
+    The body is still built on every request, but clients that already have it
+    get an empty 304 instead of the payload.
+
+    Args:
+        request: Incoming request (for If-None-Match)
+        content: Anything ``jsonable_encoder`` accepts
+        cache_control: Cache-Control of both the 200 and the 304
+
+    Returns:
+        Response: 200 with the JSON body, or 304 Not Modified
+    """
+    response = TimedJSONResponse(jsonable_encoder(content))
+    headers = {"etag": f'"{hashlib.sha256(response.body).hexdigest()[:32]}"', "cache-control": cache_control}
+    hit = etag_matches(request, headers["etag"])
+    record_cache("json_etag", hit)
+    if hit:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return response
@@ -0,0 +1,314 @@
+"""
+Push notifications of contact book changes.
+
+``record_changes`` stages one event per change-log row; once the transaction
+commits, the events reach the ``EventHub`` of every API worker, which fans
+them out to the connected followers (``Contact.contacted_by`` of the changed
+user) over server-sent events. Events are hints: clients react by running a
+delta sync from their cursor.
+
+Transports (``EVENTS_BROKER``; ``auto`` picks ``postgres`` on PostgreSQL):
+
+- ``local``: events stay in the process that committed them. Enough for a
+  single worker, development and tests.
+- ``postgres``: events are sent with ``pg_notify`` inside the transaction, so
+  PostgreSQL delivers them at commit to the ``LISTEN`` connection of every
+  worker, including dedicated avatar worker processes as publishers.
+
+Every subscriber has a bounded queue. A client that falls behind gets its
+queue replaced by a single ``resync`` event instead of unbounded buffering.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "oneid_changes"
+RESYNC = {"type": "resync"}
+
+# Ключ в Session.info, где события ждут фиксации транзакции
+_PENDING_KEY = "pending_change_events"
+# NOTIFY ограничивает payload 8000 байтами
+_NOTIFY_MAX_BYTES = 7900
+
+
+class TooManyConnectionsError(Exception):
+    """Raised when a new stream would exceed the per-user or per-process limit."""
+
+
+class Subscription:
+    """One open stream: a bounded queue of events for a single user."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        # Пока resync не прочитан, новые события ничего не добавляют — клиент все равно синхронизируется
+        self.resync_pending = False
+
+    def offer(self, item: dict) -> None:
+        if self.resync_pending:
+            return
+        if item is RESYNC:
+            self._reset()
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: вместо накопления событий просим полную дельта-синхронизацию
+            self._reset()
+
+    def _reset(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+        self.resync_pending = True
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+        try:
+            item = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if item is RESYNC:
+            self.resync_pending = False
+        return item
+
+
+class LocalTransport:
+    """Delivers events committed in this process to this process' hub only."""
+
+    name = "local"
+
+    def stage(self, db: Session, events: list[dict]) -> None:
+        db.info.setdefault(_PENDING_KEY, []).extend(events)
+
+    async def start(self, hub: "EventHub") -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class PostgresTransport:
+    """LISTEN/NOTIFY across all workers connected to the same database."""
+
+    name = "postgres"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def stage(self, db: Session, events: list[dict]) -> None:
+        # NOTIFY внутри транзакции доставляется только после COMMIT и отбрасывается при откате
+        for payload in _chunk_payloads(events):
+            db.execute(select(func.pg_notify(EVENTS_CHANNEL, payload)))
+
+    async def start(self, hub: "EventHub") -> None:
+        self._task = asyncio.create_task(self._listen(hub), name="events-listener")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _listen(self, hub: "EventHub") -> None:
+        import psycopg
+
+        url = make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+        backoff, connected_before = 1.0, False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(url, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {EVENTS_CHANNEL}")
+                    if connected_before:
+                        # Пока соединения не было, уведомления терялись
+                        hub.resync_all()
+                    connected_before, backoff = True, 1.0
+                    async for notify in conn.notifies():
+                        await hub.deliver(json.loads(notify.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Events listener failed, reconnecting in {backoff:.0f}s")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+def _chunk_payloads(events: list[dict]) -> list[str]:
+    payloads, chunk = [], []
+    for item in events:
+        candidate = chunk + [item]
+        if chunk and len(json.dumps(candidate, separators=(",", ":"))) > _NOTIFY_MAX_BYTES:
+            payloads.append(json.dumps(chunk, separators=(",", ":")))
+            candidate = [item]
+        chunk = candidate
+    if chunk:
+        payloads.append(json.dumps(chunk, separators=(",", ":")))
+    return payloads
+
+
+def resolve_broker() -> str:
+    """The transport ``EVENTS_BROKER`` selects: ``local`` or ``postgres``."""
+    if settings.EVENTS_BROKER != "auto":
+        return settings.EVENTS_BROKER
+    return "postgres" if make_url(settings.DATABASE_URL).get_backend_name() == "postgresql" else "local"
+
+
+class EventHub:
+    """Streams of this process and the fan-out of committed changes to them."""
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self._connections = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transport = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def transport(self):
+        if self._transport is None:
+            self._transport = PostgresTransport() if resolve_broker() == "postgres" else LocalTransport()
+        return self._transport
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self.transport.start(self)
+
+    async def stop(self) -> None:
+        await self.transport.stop()
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.offer(RESYNC)
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """
+        Open a stream for ``user_id``.
+
+        Raises:
+            TooManyConnectionsError: if the user or the process is at its limit
+        """
+        if self._connections >= settings.EVENTS_MAX_CONNECTIONS:
+            raise TooManyConnectionsError("Too many open event streams on this server")
+        if len(self._subscribers[user_id]) >= settings.EVENTS_MAX_CONNECTIONS_PER_USER:
+            raise TooManyConnectionsError("Too many open event streams for this user")
+
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, settings.EVENTS_QUEUE_SIZE)
+        self._subscribers[user_id].add(subscription)
+        self._connections += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions and subscription in subscriptions:
+            subscriptions.discard(subscription)
+            self._connections -= 1
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+
+    def resync_all(self) -> None:
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.offer(RESYNC)
+
+    def publish_threadsafe(self, events: list[dict]) -> None:
+        """Hand committed events to the hub's event loop from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed() or not self._subscribers:
+            return
+
+        def schedule() -> None:
+            task = loop.create_task(self.deliver(events))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        loop.call_soon_threadsafe(schedule)
+
+    async def deliver(self, events: list[dict]) -> None:
+        """Fan events out to the connected users they concern."""
+        connected = set(self._subscribers)
+        if not connected:
+            return
+
+        targets: dict[int, list[dict]] = defaultdict(list)
+        subjects = set()
+        for item in events:
+            if item["entity"] == "contact":
+                if item["user_id"] in connected:
+                    targets[item["user_id"]].append(item)
+            else:
+                subjects.add(item["user_id"])
+
+        if subjects:
+            followers = await asyncio.to_thread(self._followers, subjects, connected)
+            for item in events:
+                if item["entity"] != "contact":
+                    for follower in followers.get(item["user_id"], ()):
+                        targets[follower].append(item)
+
+        for user_id, items in targets.items():
+            for subscription in list(self._subscribers.get(user_id, ())):
+                for item in items:
+                    subscription.offer({"type": "change", **item})
+
+    def _followers(self, subjects: set[int], connected: set[int]) -> dict[int, set[int]]:
+        """Connected users who have any of ``subjects`` in their contacts (one query)."""
+        from app.models.contact import Contact
+
+        if self.session_factory is None:
+            from app.db.session import SessionLocal
+
+            self.session_factory = SessionLocal
+
+        result: dict[int, set[int]] = defaultdict(set)
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(Contact.contact_user_id, Contact.user_id).where(
+                    Contact.contact_user_id.in_(subjects),
+                    Contact.user_id.in_(connected),
+                    Contact.is_active == True,  # noqa: E712
+                )
+            )
+            for subject, follower in rows:
+                result[subject].add(follower)
+        return result
+
+
+event_hub = EventHub()
+
+
+def stage_events(db: Session, events: list[dict]) -> None:
+    """Queue change events to be published when ``db``'s transaction commits."""
+    if events:
+        event_hub.transport.stage(db, events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    events = session.info.pop(_PENDING_KEY, None)
+    if events:
+        event_hub.publish_threadsafe(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def format_sse(item: dict) -> str:
+    """Encode an event for a ``text/event-stream`` response."""
+    return f"event: {item.get('type', 'change')}\ndata: {json.dumps(item, separators=(',', ':'))}\n\n"
@@ -0,0 +1,165 @@
+"""
+Contact book export formats: vCard 3.0, CSV and NDJSON.
+
+Each formatter turns one contact card (see ``crud.contact.iter_contact_cards``)
+into a piece of text, so an export can be streamed without holding the
+whole contact book in memory.
+"""
+import csv
+import io
+import json
+import re
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.models.channel import ChannelType
+
+# Профили соцсетей для значений вида "@handle" вместо полного URL
+_PROFILE_URLS = {
+    ChannelType.github.value: "https://github.com/",
+    ChannelType.twitter.value: "https://x.com/",
+    ChannelType.instagram.value: "https://instagram.com/",
+    ChannelType.facebook.value: "https://facebook.com/",
+    ChannelType.linkedin.value: "https://www.linkedin.com/in/",
+}
+_URL_TYPES = {ChannelType.website.value, *_PROFILE_URLS}
+
+
+def _digits(value: str) -> str:
+    return re.sub(r"[^\d+]", "", value)
+
+
+# Мессенджеры: X-SERVICE-TYPE и URI, который открывает чат
+_IMPP = {
+    ChannelType.telegram.value: ("Telegram", lambda v: f"tg://resolve?domain={v.lstrip('@')}"),
+    ChannelType.whatsapp.value: ("WhatsApp", lambda v: f"https://wa.me/{_digits(v).lstrip('+')}"),
+    ChannelType.signal.value: ("Signal", lambda v: f"sgnl://signal.me/#p/{_digits(v)}"),
+}
+
+CSV_PROFILE_COLUMNS = ["username", "display_name", "first_name", "last_name", "bio", "avatar_url"]
+CSV_COLUMNS = CSV_PROFILE_COLUMNS + [t.value for t in ChannelType]
+# Разделитель нескольких каналов одного типа в ячейке CSV
+CSV_MULTI_SEPARATOR = "; "
+# Куски ответа копятся до этого размера: меньше переключений в пул потоков при стриминге
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace(",", "\\,").replace(";", "\\;")
+
+
+def _fold(line: str) -> str:
+    # Переводы строк в URI разорвали бы запись; текстовые значения уже экранированы
+    line = line.replace("\r", "").replace("\n", "")
+    # RFC 2425: строки длиннее 75 октетов переносятся с пробелом в начале продолжения
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, start = [], 0
+    while start < len(encoded):
+        end = min(start + (75 if not parts else 74), len(encoded))
+        # Не разрываем многобайтовый символ UTF-8
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _url(channel: dict) -> str:
+    value = channel["value"]
+    if value.startswith(("http://", "https://")) or channel["type"] not in _PROFILE_URLS:
+        return value
+    return _PROFILE_URLS[channel["type"]] + value.lstrip("@")
+
+
+def _channel_line(channel: dict) -> Optional[str]:
+    kind, value = channel["type"], channel["value"]
+    pref = ",PREF" if channel["is_primary"] else ""
+    if kind == ChannelType.phone.value:
+        return f"TEL;TYPE=CELL{pref}:{_escape(value)}"
+    if kind == ChannelType.email.value:
+        return f"EMAIL;TYPE=INTERNET{pref}:{_escape(value)}"
+    if kind in _IMPP:
+        service, uri = _IMPP[kind]
+        return f"IMPP;X-SERVICE-TYPE={service}{pref}:{uri(value)}"
+    if kind in _URL_TYPES or value.startswith(("http://", "https://")):
+        return f"URL:{_url(channel)}"
+    # Прочие произвольные каналы без URL в vCard не отображаются
+    return None
+
+
+def to_vcard(card: dict) -> str:
+    """One contact as a vCard 3.0 entry with CRLF line endings."""
+    full_name = (
+        card["display_name"]
+        or " ".join(part for part in (card["first_name"], card["last_name"]) if part)
+        or card["username"]
+    )
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        f"FN:{_escape(full_name)}",
+        f"N:{_escape(card['last_name'] or '')};{_escape(card['first_name'] or '')};;;",
+        f"NICKNAME:{_escape(card['username'])}",
+    ]
+    if card["avatar_url"]:
+        lines.append(f"PHOTO;VALUE=uri:{card['avatar_url']}")
+    if card["bio"]:
+        lines.append(f"NOTE:{_escape(card['bio'])}")
+    lines.extend(line for line in map(_channel_line, card["channels"]) if line)
+    lines.append("END:VCARD")
+    return "".join(_fold(line) for line in lines)
+
+
+def to_ndjson(card: dict) -> str:
+    return json.dumps(card, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def csv_header() -> str:
+    return _csv_line(CSV_COLUMNS)
+
+
+def to_csv(card: dict) -> str:
+    """One contact per row; several channels of one type share a cell."""
+    by_type: dict[str, list[str]] = {}
+    for channel in card["channels"]:
+        by_type.setdefault(channel["type"], []).append(channel["value"])
+    row = [card[name] or "" for name in CSV_PROFILE_COLUMNS]
+    row += [CSV_MULTI_SEPARATOR.join(by_type.get(t.value, [])) for t in ChannelType]
+    return _csv_line([_neutralize(cell) for cell in row])
+
+
+def _neutralize(cell: str) -> str:
+    # Значения задают другие пользователи: не даем табличным редакторам выполнить их как формулу
+    if cell[:1] in ("=", "\t", "\r") or (cell[:1] in ("+", "-", "@") and re.search(r"[(=!]", cell)):
+        return "'" + cell
+    return cell
+
+
+def _csv_line(row: list) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(row)
+    return buffer.getvalue()
+
+
+# format -> (media type, расширение файла, заголовок, форматтер одной карточки)
+EXPORT_FORMATS: dict[str, tuple[str, str, str, Callable[[dict], str]]] = {
+    "vcf": ("text/vcard; charset=utf-8", "vcf", "", to_vcard),
+    "csv": ("text/csv; charset=utf-8", "csv", csv_header(), to_csv),
+    "ndjson": ("application/x-ndjson", "ndjson", "", to_ndjson),
+}
+
+
+def render_stream(cards: Iterable[dict], fmt: str) -> Iterator[str]:
+    """Encode ``cards`` in format ``fmt``, yielding pieces of about ``STREAM_CHUNK_BYTES``."""
+    _, _, header, formatter = EXPORT_FORMATS[fmt]
+    pending, size = [header], len(header)
+    for card in cards:
+        piece = formatter(card)
+        pending.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_BYTES:
+            yield "".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield "".join(pending)
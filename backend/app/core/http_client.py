@@ -0,0 +1,52 @@
+"""Shared pooled HTTP client for outbound calls to OAuth providers."""
+import time
+from typing import TYPE_CHECKING, Optional
+
+from app.core.timing import add_timing
+
+if TYPE_CHECKING:
+    import httpx
+
+_oauth_client: Optional["httpx.AsyncClient"] = None
+
+
+def _timed_transport(phase: str) -> "httpx.AsyncBaseTransport":
+    """Default transport that accounts request time to a Server-Timing phase."""
+    # httpx импортируется при первом запросе, а не при старте приложения
+    import httpx
+
+    class TimedTransport(httpx.AsyncBaseTransport):
+        def __init__(self, transport: httpx.AsyncBaseTransport):
+            self._transport = transport
+
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            start = time.perf_counter()
+            try:
+                return await self._transport.handle_async_request(request)
+            finally:
+                add_timing(phase, time.perf_counter() - start)
+
+        async def aclose(self) -> None:
+            await self._transport.aclose()
+
+    return TimedTransport(httpx.AsyncHTTPTransport())
+
+
+def oauth_http_client() -> "httpx.AsyncClient":
+    """Keep-alive client reused by all OAuth provider calls."""
+    global _oauth_client
+    if _oauth_client is None or _oauth_client.is_closed:
+        import httpx
+
+        _oauth_client = httpx.AsyncClient(
+            transport=_timed_transport("oauth"),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+        )
+    return _oauth_client
+
+
+async def close_http_clients() -> None:
+    global _oauth_client
+    if _oauth_client is not None:
+        await _oauth_client.aclose()
+        _oauth_client = None
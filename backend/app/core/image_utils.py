@@ -1,37 +1,52 @@
+import asyncio
+import io
 import os
 import hashlib
-import secrets
-import tempfile
-import shutil
 from pathlib import Path
-from typing import Tuple, Optional
-from PIL import Image, UnidentifiedImageError
-import magic
-from app.core.supabase_storage import supabase_storage
+from typing import TYPE_CHECKING, Tuple, Optional
+from app.core.config import settings
+from app.core.timing import phase
+from app.core.tracing import tracer
+from app.core.storage import StorageError, avatar_key, get_storage, guess_content_type, local_storage
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Configuration
 ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp'}
 ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
+EXTENSION_BY_MIME_TYPE = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-MAX_IMAGE_DIMENSIONS = (2048, 2048)  # Max width/height
+MAX_IMAGE_DIMENSIONS = (2048, 2048)  # Max width/height of formats decoded at full size
+MAX_IMAGE_PIXELS = MAX_IMAGE_DIMENSIONS[0] * MAX_IMAGE_DIMENSIONS[1]
+# JPEGs are draft-decoded near avatar size, so they may be much larger
+JPEG_MAX_IMAGE_DIMENSIONS = (12000, 12000)
+JPEG_MAX_IMAGE_PIXELS = 40_000_000  # Decompression-bomb budget, checked from the header before decoding
 AVATAR_SIZE = (400, 400)  # Avatar dimensions
-UPLOAD_DIR = Path("uploads")
+IMMUTABLE_CACHE_SECONDS = 365 * 24 * 3600  # avatar filenames are content-addressed
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+UPLOAD_DIR = Path(settings.LOCAL_STORAGE_DIR)
 AVATAR_DIR = UPLOAD_DIR / "avatars"
 
-# Ensure upload directories exist
-UPLOAD_DIR.mkdir(exist_ok=True)
-AVATAR_DIR.mkdir(exist_ok=True)
 
-def is_safe_image_file(file_path: str, content_type: str) -> bool:
+def _pil():
+    """Import Pillow on first use (it is only needed by the avatar worker path)."""
+    from PIL import Image
+
+    # PIL's own guard (raises at twice the limit) as a backstop for code paths that skip open_avatar_image
+    Image.MAX_IMAGE_PIXELS = max(MAX_IMAGE_PIXELS, JPEG_MAX_IMAGE_PIXELS)
+    return Image
+
+def check_upload(file_path: str, content_type: str) -> bool:
     """
-    Comprehensive security check for uploaded image files.
+    Cheap checks that don't decode the image: extension, MIME type, size and magic bytes.
     
     Args:
         file_path: Path to the uploaded file
         content_type: MIME type from request
     
     Returns:
-        bool: True if file is safe, False otherwise
+        bool: True if the file may be decoded, False otherwise
     """
     try:
         # Check file extension
@@ -48,28 +63,122 @@ def is_safe_image_file(file_path: str, content_type: str) -> bool:
             return False
         
         # Use python-magic to check actual file content (not just extension)
+        import magic
+
         mime_type = magic.from_file(file_path, mime=True)
-        if mime_type not in ALLOWED_MIME_TYPES:
-            return False
-        
-        # Try to open with PIL to validate it's actually an image
-        with Image.open(file_path) as img:
-            # Check dimensions
-            if img.width > MAX_IMAGE_DIMENSIONS[0] or img.height > MAX_IMAGE_DIMENSIONS[1]:
-                return False
-            
-            # Check if image can be processed
-            img.verify()
+        return mime_type in ALLOWED_MIME_TYPES
         
+    except OSError:
+        return False
+
+def open_avatar_image(file_path: str) -> "Image.Image":
+    """
+    Open an image reading only its header, and enforce the pixel budget.
+
+    Only JPEGs get the large budget: other formats are decoded at full
+    resolution, so they keep the 2048x2048 limit.
+
+    Raises:
+        ValueError: if the file is not an allowed image or is too large to decode
+    """
+    Image = _pil()
+    try:
+        img = Image.open(file_path)
+    except (Image.UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a valid image: {e}")
+
+    width, height = img.size
+    if img.format == 'JPEG':
+        max_dimensions, max_pixels = JPEG_MAX_IMAGE_DIMENSIONS, JPEG_MAX_IMAGE_PIXELS
+    else:
+        max_dimensions, max_pixels = MAX_IMAGE_DIMENSIONS, MAX_IMAGE_PIXELS
+    if (
+        img.format not in ALLOWED_FORMATS
+        or width <= 0 or height <= 0
+        or width > max_dimensions[0] or height > max_dimensions[1]
+        or width * height > max_pixels
+    ):
+        img.close()
+        raise ValueError(f"Unsupported image: {img.format} {width}x{height}")
+    return img
+
+def avatar_target_size(size: Tuple[int, int]) -> Tuple[int, int]:
+    """Size of the final avatar for a source of the given size (fit into AVATAR_SIZE, never upscale)."""
+    width, height = size
+    ratio = min(AVATAR_SIZE[0] / width, AVATAR_SIZE[1] / height, 1)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+def decode_avatar_image(img: "Image.Image") -> "Image.Image":
+    """
+    Decode an opened image at roughly avatar size.
+
+    JPEGs use draft mode, so libjpeg scales by 1/2..1/8 during the DCT
+    and never materialises the full-resolution bitmap. Other formats are
+    decoded fully and then shrunk with a cheap ``reduce`` before the
+    final LANCZOS pass (``thumbnail``'s reducing_gap).
+
+    Raises:
+        ValueError: if the image data is truncated or corrupt
+    """
+    Image = _pil()
+    try:
+        img.draft(None, avatar_target_size(img.size))  # no-op for non-JPEG formats
+        img.load()
+
+        # Convert to RGB if necessary (for JPEG compatibility)
+        if img.mode in ('RGBA', 'LA', 'P', 'CMYK'):
+            img = img.convert('RGB')
+
+        # Resize image maintaining aspect ratio
+        img.thumbnail(AVATAR_SIZE, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        return img
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Corrupt image: {e}")
+
+def is_safe_image_file(file_path: str, content_type: str) -> bool:
+    """
+    Comprehensive security check for uploaded image files.
+    
+    Args:
+        file_path: Path to the uploaded file
+        content_type: MIME type from request
+    
+    Returns:
+        bool: True if file is safe, False otherwise
+    """
+    if not check_upload(file_path, content_type):
+        return False
+    try:
+        with open_avatar_image(file_path) as img:
+            decode_avatar_image(img)
         return True
-        
-    except (UnidentifiedImageError, OSError, ValueError):
+    except ValueError:
         return False
 
+def _render_avatar(file_path: str, file_ext: str) -> bytes:
+    """Validate, decode near the target size and encode the avatar in its original format."""
+    buffer = io.BytesIO()
+    with open_avatar_image(file_path) as img:
+        with tracer.start_as_current_span("avatar.decode") as span:
+            span.set_attribute("avatar.source_size", f"{img.width}x{img.height}")
+            img = decode_avatar_image(img)
+
+        with tracer.start_as_current_span("avatar.encode") as span:
+            span.set_attribute("avatar.format", file_ext)
+            if file_ext == '.png':
+                img.save(buffer, 'PNG', optimize=True)
+            elif file_ext == '.webp':
+                img.save(buffer, 'WEBP', quality=85, optimize=True)
+            else:  # JPEG
+                img.save(buffer, 'JPEG', quality=85, optimize=True)
+    return buffer.getvalue()
+
+
 async def process_avatar_image(file_path: str, user_id: int) -> Tuple[str, str]:
     """
     Process and save avatar image with security measures.
-    Uploads to Supabase Storage if available, otherwise saves locally.
+    The image is validated by the same decode that produces the avatar.
+    Uploads to the configured storage backend, falling back to local storage.
     
     Args:
         file_path: Path to the uploaded file
@@ -78,48 +187,35 @@ async def process_avatar_image(file_path: str, user_id: int) -> Tuple[str, str]:
     Returns:
         Tuple[str, str]: (filename, avatar_url)
     """
-    try:
-        # Generate secure filename
-        random_token = secrets.token_urlsafe(16)
-        file_ext = Path(file_path).suffix.lower()
-        filename = f"avatar_{user_id}_{random_token}{file_ext}"
-        
-        # Create temporary file for processing
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            # Open and process image
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary (for JPEG compatibility)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize image maintaining aspect ratio
-                img.thumbnail(AVATAR_SIZE, Image.Resampling.LANCZOS)
-                
-                # Save processed image to temp file
-                if file_ext == '.png':
-                    img.save(temp_file.name, 'PNG', optimize=True)
-                elif file_ext == '.webp':
-                    img.save(temp_file.name, 'WEBP', quality=85, optimize=True)
-                else:  # JPEG
-                    img.save(temp_file.name, 'JPEG', quality=85, optimize=True)
-            
-            # Try to upload to Supabase Storage first
-            if supabase_storage.is_available():
-                avatar_url = await supabase_storage.upload_avatar(temp_file.name, user_id, filename)
-                if avatar_url:
-                    # Clean up temp file
-                    os.unlink(temp_file.name)
-                    return filename, avatar_url
-            
-            # Fallback to local storage
-            output_path = AVATAR_DIR / filename
-            shutil.move(temp_file.name, output_path)
-            avatar_url = get_avatar_url(filename)
-            
+    with tracer.start_as_current_span("avatar.process") as span:
+        span.set_attribute("avatar.user_id", user_id)
+        try:
+            file_ext = Path(file_path).suffix.lower()
+
+            # Декодирование и ресайз в отдельном потоке, чтобы не блокировать event loop
+            with phase("image"):
+                data = await asyncio.to_thread(_render_avatar, file_path, file_ext)
+
+            # Content-addressed filename: the URL changes whenever the image does,
+            # so the file can be cached forever (see app.core.static)
+            digest = hashlib.sha256(data).hexdigest()[:20]
+            filename = f"avatar_{user_id}_{digest}{file_ext}"
+
+            key = avatar_key(user_id, filename)
+            content_type = guess_content_type(filename)
+            storage = get_storage()
+            try:
+                avatar_url = await storage.upload(key, data, content_type, cache_seconds=IMMUTABLE_CACHE_SECONDS)
+            except StorageError:
+                if storage is local_storage:
+                    raise
+                # Fallback to local storage
+                avatar_url = await local_storage.upload(key, data, content_type, cache_seconds=IMMUTABLE_CACHE_SECONDS)
+
             return filename, avatar_url
         
-    except Exception as e:
-        raise ValueError(f"Failed to process image: {str(e)}")
+        except Exception as e:
+            raise ValueError(f"Failed to process image: {str(e)}")
 
 def cleanup_temp_file(file_path: str) -> None:
     """Clean up temporary uploaded file."""
@@ -131,17 +227,13 @@ def cleanup_temp_file(file_path: str) -> None:
 
 def get_avatar_url(filename: str) -> str:
     """Generate avatar URL from filename."""
-    # Get base URL from environment or use default
-    base_url = os.getenv("API_BASE_URL", "http://localhost:8000")
-    return f"{base_url}/uploads/avatars/{filename}"
+    return f"{settings.API_BASE_URL}/uploads/avatars/{filename}"
 
 def validate_image_dimensions(file_path: str) -> bool:
     """Validate image dimensions are reasonable."""
     try:
-        with Image.open(file_path) as img:
-            return (img.width <= MAX_IMAGE_DIMENSIONS[0] and 
-                   img.height <= MAX_IMAGE_DIMENSIONS[1] and
-                   img.width > 0 and img.height > 0)
-    except Exception:
+        with open_avatar_image(file_path):
+            return True
+    except ValueError:
         return False
 
@@ -0,0 +1,174 @@
+"""
+Prometheus metrics.
+
+Metric names match the Grafana dashboards under ``monitoring/grafana``.
+When several worker processes serve the app, set ``PROMETHEUS_MULTIPROC_DIR``
+to an empty writable directory before the workers start; every process then
+writes its samples there and ``/metrics`` aggregates them.
+"""
+import os
+import time
+import weakref
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured size of the SQLAlchemy connection pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open DB connections held by the pool",
+    multiprocess_mode="livesum",
+)
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss); hit ratio = hit / total",
+    ["cache", "result"],
+)
+
+AVATAR_JOBS_QUEUED = Gauge(
+    "avatar_jobs_queued",
+    "Avatar processing jobs waiting for a worker",
+    # Значение общее для всех процессов: берем последнее измерение, а не исторический пик
+    multiprocess_mode="mostrecent",
+)
+AVATAR_JOBS_IN_PROGRESS = Gauge(
+    "avatar_jobs_in_progress",
+    "Avatar processing jobs being handled right now",
+    multiprocess_mode="livesum",
+)
+AVATAR_JOB_DURATION = Histogram(
+    "avatar_job_duration_seconds",
+    "Time to process one avatar job",
+    ["status"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count one cache lookup."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+_instrumented_engines: "weakref.WeakSet[Engine]" = weakref.WeakSet()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Track pool usage through pool events instead of polling the pool."""
+    # Повторный create_app() не должен удваивать счетчики
+    if engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(engine)
+
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.set(size())
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.inc()
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.dec()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        DB_POOL_CHECKED_OUT.dec()
+
+
+def route_template(scope: Scope) -> str:
+    """Route template of a served request, so label cardinality stays bounded."""
+    route = scope.get("route")
+    if route is not None:
+        return getattr(route, "path_format", None) or route.path
+    # Mounts (например, /uploads) не выставляют route, но дописывают свой префикс в root_path
+    return scope.get("root_path") or "unmatched"
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording per-route latency, status and in-flight requests."""
+
+    def __init__(self, app: ASGIApp, skip_paths: tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = skip_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            labels = (method, route_template(scope), str(status_code))
+            REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+            REQUESTS.labels(*labels).inc()
+
+
+def metrics_response() -> Response:
+    """Render all metrics, aggregating worker processes in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
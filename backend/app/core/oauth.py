@@ -1,44 +1,65 @@
-from authlib.integrations.starlette_client import OAuth
-from authlib.integrations.httpx_client import OAuth2Client
+from functools import lru_cache
+
 from app.core.config import settings
 
-# Создаем OAuth клиент
-oauth = OAuth()
-
-# Google OAuth2
-oauth.register(
-    name='google',
-    client_id=settings.GOOGLE_CLIENT_ID,
-    client_secret=settings.GOOGLE_CLIENT_SECRET,
-    server_metadata_url="https://accounts.google.com/.well-known/openid_configuration",
-    client_kwargs={"scope": "openid email profile"}
-)
-
-# GitHub OAuth2 - создаем клиент напрямую
-print(f"GitHub Client ID: {settings.GITHUB_CLIENT_ID}")
-print(f"GitHub Client Secret: {'*' * len(settings.GITHUB_CLIENT_SECRET) if settings.GITHUB_CLIENT_SECRET else 'NOT SET'}")
-
-github_oauth = OAuth2Client(
-    client_id=settings.GITHUB_CLIENT_ID,
-    client_secret=settings.GITHUB_CLIENT_SECRET,
-    authorize_url="https://github.com/login/oauth/authorize",
-    token_url="https://github.com/login/oauth/access_token",
-    scope="user:email"
-)
-
-# Discord OAuth2 - создаем клиент напрямую
-discord_oauth = OAuth2Client(
-    client_id=settings.DISCORD_CLIENT_ID,
-    client_secret=settings.DISCORD_CLIENT_SECRET,
-    authorize_url="https://discord.com/api/oauth2/authorize",
-    token_url="https://discord.com/api/oauth2/token",
-    scope="identify email"
-)
-
-# OAuth провайдеры
-OAUTH_PROVIDERS = {
-    "google": oauth.google,
-    "github": github_oauth,
-    "discord": discord_oauth
-}
+# Клиенты authlib создаются при первом обращении: authlib и httpx не нужны для старта приложения
+
+
+@lru_cache(maxsize=None)
+def _build_oauth():
+    from authlib.integrations.starlette_client import OAuth
+
+    oauth = OAuth()
+
+    # Google OAuth2
+    oauth.register(
+        name='google',
+        client_id=settings.GOOGLE_CLIENT_ID,
+        client_secret=settings.GOOGLE_CLIENT_SECRET,
+        server_metadata_url=f"{settings.GOOGLE_ACCOUNTS_URL}/.well-known/openid-configuration",
+        client_kwargs={"scope": "openid email profile"}
+    )
+    return oauth
+
+
+@lru_cache(maxsize=None)
+def _build_github_oauth():
+    from authlib.integrations.httpx_client import OAuth2Client
+
+    return OAuth2Client(
+        client_id=settings.GITHUB_CLIENT_ID,
+        client_secret=settings.GITHUB_CLIENT_SECRET,
+        authorize_url=f"{settings.GITHUB_URL}/login/oauth/authorize",
+        token_url=f"{settings.GITHUB_URL}/login/oauth/access_token",
+        scope="user:email"
+    )
+
+
+@lru_cache(maxsize=None)
+def _build_discord_oauth():
+    from authlib.integrations.httpx_client import OAuth2Client
+
+    return OAuth2Client(
+        client_id=settings.DISCORD_CLIENT_ID,
+        client_secret=settings.DISCORD_CLIENT_SECRET,
+        authorize_url=f"{settings.DISCORD_API_URL}/oauth2/authorize",
+        token_url=f"{settings.DISCORD_API_URL}/oauth2/token",
+        scope="identify email"
+    )
+
 
+def __getattr__(name: str):
+    # oauth, github_oauth, discord_oauth и OAUTH_PROVIDERS остаются доступны как атрибуты модуля
+    if name == "oauth":
+        return _build_oauth()
+    if name == "github_oauth":
+        return _build_github_oauth()
+    if name == "discord_oauth":
+        return _build_discord_oauth()
+    if name == "OAUTH_PROVIDERS":
+        return {
+            "google": _build_oauth().google,
+            "github": _build_github_oauth(),
+            "discord": _build_discord_oauth(),
+        }
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,146 @@
+"""
+Opt-in sampling profiler for individual HTTP requests.
+
+A background thread snapshots Python stacks with ``sys._current_frames()``
+every ``PROFILE_INTERVAL_MS`` while a profiled request is in flight; no
+``sys.setprofile`` hook is installed, so unprofiled requests pay nothing.
+Stacks are written in collapsed ("folded") format, ready for flamegraph.pl,
+speedscope or inferno.
+
+The sampler sees every thread of the process: the event loop and the
+threadpool the request uses, but also whatever concurrent requests are doing.
+Only one request is profiled at a time.
+"""
+import asyncio
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile-token"
+
+# Потоки, которые просто ждут (idle event loop, пустой threadpool), в профиль не пишем
+IDLE_FUNCTIONS = {"select", "poll", "wait"}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Collects collapsed stacks of all other threads until stopped."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def profile_filename(method: str, route: str, duration: float) -> str:
+    """File name carrying the route and latency, so profiles can be picked by eye."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}_{method}_{slug}_{round(duration * 1000)}ms_{secrets.token_hex(3)}.folded"
+
+
+def write_profile(directory: Path, filename: str, content: str, max_files: int) -> Path:
+    """Write a profile and drop the oldest ones above ``max_files``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / filename
+    path.write_text(content)
+
+    profiles = sorted(directory.glob("*.folded"), key=lambda p: p.stat().st_mtime)
+    for old in profiles[:-max_files] if max_files > 0 else []:
+        old.unlink(missing_ok=True)
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Pure ASGI middleware profiling a sampled fraction of requests.
+
+    A request is profiled when it carries ``X-Profile-Token`` matching
+    ``PROFILE_TOKEN``, or with probability ``PROFILE_SAMPLE_RATE``.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = threading.Lock()
+
+    def _should_profile(self, scope: Scope) -> bool:
+        token = Headers(scope=scope).get(PROFILE_HEADER)
+        if token and settings.PROFILE_TOKEN and secrets.compare_digest(token, settings.PROFILE_TOKEN):
+            return True
+        return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        # Параллельные профили смешали бы стеки — второй запрос идет без профилирования
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.stop()
+            self._busy.release()
+            duration = time.perf_counter() - start
+            filename = profile_filename(scope["method"], route_template(scope), duration)
+            try:
+                path = await asyncio.to_thread(
+                    write_profile, Path(settings.PROFILE_DIR), filename, sampler.folded(), settings.PROFILE_MAX_FILES
+                )
+                logger.info(f"Request profile written: {path} ({sampler.samples} samples)")
+            except OSError as e:
+                logger.error(f"Failed to write request profile: {e}")
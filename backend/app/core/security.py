@@ -34,10 +34,22 @@ def create_access_token(subject: str | int, expires_minutes: int | None = None)
     return encoded
 
 
-def decode_token(token: str) -> Optional[dict[str, Any]]:
+def create_stream_ticket(subject: str | int) -> str:
+    """Short-lived token that only opens an event stream (safe to put in a URL)."""
+    now = datetime.now(tz=timezone.utc)
+    to_encode: dict[str, Any] = {
+        "sub": str(subject),
+        "iat": int(now.timestamp()),
+        "exp": int((now + timedelta(seconds=settings.EVENTS_TICKET_SECONDS)).timestamp()),
+        "typ": "stream",
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_token(token: str, typ: str = "access") -> Optional[dict[str, Any]]:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("typ") != "access":
+        if payload.get("typ") != typ:
             return None
         return payload
     except JWTError:
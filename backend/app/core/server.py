@@ -0,0 +1,76 @@
+"""
+Sizing of the production worker pool.
+
+Containers usually see every host core in ``os.cpu_count()``; the limits
+that matter are the CPU affinity mask and the cgroup CPU/memory limits,
+so the pool is sized from those.
+"""
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """CPU quota of the container in cores, or None when unlimited."""
+    # cgroup v2: "<quota> <period>" или "max <period>"
+    if (value := _read(root / "cpu.max")) is not None:
+        quota, _, period = value.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    # cgroup v1
+    quota = _read(root / "cpu" / "cpu.cfs_quota_us")
+    period = _read(root / "cpu" / "cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cgroup_memory_limit(root: Path = CGROUP_ROOT) -> Optional[int]:
+    """Memory limit of the container in bytes, or None when unlimited."""
+    value = _read(root / "memory.max") or _read(root / "memory" / "memory.limit_in_bytes")
+    if not value or value == "max":
+        return None
+    limit = int(value)
+    # v1 сообщает "без ограничений" огромным числом
+    return limit if limit < 1 << 60 else None
+
+
+def effective_cpu_count(root: Path = CGROUP_ROOT) -> int:
+    """Cores this process may actually use."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(cpus, 1)
+
+
+def default_worker_count(worker_memory_mb: int, root: Path = CGROUP_ROOT) -> int:
+    """
+    One async worker per usable core, capped by the container memory limit.
+
+    Args:
+        worker_memory_mb: Expected resident memory of one worker
+        root: cgroup filesystem root
+
+    Returns:
+        int: Number of worker processes, at least 1
+    """
+    workers = effective_cpu_count(root)
+    memory = cgroup_memory_limit(root)
+    if memory is not None and worker_memory_mb > 0:
+        workers = min(workers, memory // (worker_memory_mb * 1024 * 1024))
+    return max(int(workers), 1)
@@ -0,0 +1,68 @@
+import os
+import re
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.core.config import settings
+from app.core.metrics import record_cache
+from app.core.storage import guess_content_type
+
+# Имена вида avatar_<user_id>_<sha256[:20]>.<ext> — содержимое по такому имени никогда не меняется
+HASHED_AVATAR_RE = re.compile(r"^avatar_\d+_(?P<digest>[0-9a-f]{20})\.(?:jpe?g|png|webp)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Каталоги хранилища, которые можно раздавать публично (оригиналы загрузок — нельзя)
+PUBLIC_DIRECTORIES = {"avatars"}
+
+
+class AvatarStaticFiles(StaticFiles):
+    """
+    StaticFiles for locally stored avatars.
+
+    Content-hashed names are served with a year-long immutable Cache-Control
+    and a strong ETag equal to the content digest, so browsers and CDNs never
+    revalidate them. Conditional requests are answered with 304 before any
+    file I/O. Starlette's FileResponse already uses ``http.response.pathsend``
+    when the server supports it; behind nginx/Apache set
+    ``AVATAR_SENDFILE_HEADER`` (``X-Accel-Redirect`` or ``X-Sendfile``) to
+    hand the body off to the proxy's sendfile instead of streaming it from Python.
+    """
+
+    def get_path(self, scope: Scope) -> str:
+        path = super().get_path(scope)
+        if path.split(os.sep, 1)[0] not in PUBLIC_DIRECTORIES:
+            raise HTTPException(status_code=404)
+        return path
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        match = HASHED_AVATAR_RE.match(name)
+
+        if settings.AVATAR_SENDFILE_HEADER:
+            relative_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            response = Response(
+                status_code=status_code,
+                media_type=guess_content_type(name),
+                headers={settings.AVATAR_SENDFILE_HEADER: f"{settings.AVATAR_SENDFILE_PREFIX.rstrip('/')}/{relative_path}"},
+            )
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        if match:
+            response.headers["etag"] = f'"{match["digest"]}"'
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["cache-control"] = DEFAULT_CACHE_CONTROL
+
+        hit = self.is_not_modified(response.headers, request_headers)
+        record_cache("avatar_static", hit)
+        if hit:
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,298 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from app.core.config import settings
+from app.core.timing import phase
+
+logger = logging.getLogger(__name__)
+
+# Явные типы для форматов аватаров (mimetypes на некоторых системах не знает webp)
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+class StorageError(Exception):
+    """Raised when a storage backend fails to complete an operation."""
+
+
+class ObjectExistsError(StorageError):
+    """Raised when a write that must create a new object finds the key taken."""
+
+
+def guess_content_type(filename: str) -> str:
+    """Return the MIME type for a stored object based on its extension."""
+    ext = Path(filename).suffix.lower()
+    if ext in CONTENT_TYPES:
+        return CONTENT_TYPES[ext]
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def avatar_key(user_id: int, filename: str) -> str:
+    """Object key of a user's avatar inside the storage bucket."""
+    return f"avatars/{user_id}/{filename}"
+
+
+def original_key(user_id: int, filename: str) -> str:
+    """Object key of a raw, not yet processed avatar upload."""
+    return f"originals/{user_id}/{filename}"
+
+
+@dataclass
+class SignedUpload:
+    """Short-lived instructions that let a client upload an object directly."""
+
+    key: str
+    url: str
+    method: str = "PUT"
+    headers: dict[str, str] = field(default_factory=dict)
+    expires_in: int = 0
+
+
+class StorageBackend:
+    """Interface shared by all object storage backends."""
+
+    name = "base"
+
+    def is_available(self) -> bool:
+        return True
+
+    async def upload(
+        self, key: str, data: bytes, content_type: Optional[str] = None, cache_seconds: int = 3600
+    ) -> str:
+        """
+        Store an object.
+
+        Args:
+            key: Object key inside the bucket
+            data: Object content
+            content_type: MIME type, guessed from the key when omitted
+            cache_seconds: max-age the object should be served with, where supported
+
+        Returns:
+            str: Public URL of the stored object
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        """Delete an object. Returns True if it existed and was removed."""
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    async def create_signed_upload(self, key: str, content_type: str, expires_in: int) -> SignedUpload:
+        """Issue a signed URL the client can upload ``key`` to without going through the API."""
+        raise NotImplementedError
+
+    async def download(self, key: str, dest_path: str, max_bytes: int) -> int:
+        """
+        Stream an object into a local file.
+
+        Args:
+            key: Object key inside the bucket
+            dest_path: File to write to
+            max_bytes: Abort if the object is larger than this
+
+        Returns:
+            int: Number of bytes written
+
+        Raises:
+            StorageError: if the object is missing, too large or cannot be fetched
+        """
+        raise NotImplementedError
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Map a public URL produced by this backend back to its object key."""
+        prefix = self.public_url("")
+        if url and url.startswith(prefix):
+            return url[len(prefix):] or None
+        return None
+
+    async def aclose(self) -> None:
+        """Release network resources held by the backend."""
+
+
+class LocalStorage(StorageBackend):
+    """
+    Filesystem stand-in for remote object storage.
+
+    Objects are written below ``root`` and served by the ``/uploads`` mount,
+    so the same code paths can be exercised offline and in tests.
+    """
+
+    name = "local"
+
+    def __init__(self, root: Optional[str] = None, base_url: Optional[str] = None):
+        self.root = Path(root or settings.LOCAL_STORAGE_DIR)
+        self.base_url = (base_url or settings.API_BASE_URL).rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root.resolve()):
+            raise StorageError(f"Invalid object key: {key}")
+        return path
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы не отдавать частично записанный объект
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _write_new(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        try:
+            # link() атомарно отказывает, если объект уже существует
+            os.link(tmp_path, path)
+        except FileExistsError as e:
+            raise ObjectExistsError(f"Object already exists: {key}") from e
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _remove(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def upload(
+        self, key: str, data: bytes, content_type: Optional[str] = None, cache_seconds: int = 3600
+    ) -> str:
+        # Заголовки кэширования выставляет AvatarStaticFiles при раздаче
+        try:
+            with phase("storage"):
+                await asyncio.to_thread(self._write, key, data)
+        except OSError as e:
+            raise StorageError(f"Failed to write {key}: {e}") from e
+        return self.public_url(key)
+
+    async def delete(self, key: str) -> bool:
+        try:
+            with phase("storage"):
+                return await asyncio.to_thread(self._remove, key)
+        except OSError as e:
+            logger.error(f"Failed to delete local object {key}: {e}")
+            return False
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/uploads/{key}"
+
+    async def upload_new(self, key: str, data: bytes) -> str:
+        """
+        Store an object that must not exist yet.
+
+        Raises:
+            ObjectExistsError: if the key is taken
+            StorageError: if the write fails
+        """
+        try:
+            with phase("storage"):
+                await asyncio.to_thread(self._write_new, key, data)
+        except OSError as e:
+            raise StorageError(f"Failed to write {key}: {e}") from e
+        return self.public_url(key)
+
+    @property
+    def _signer(self) -> URLSafeSerializer:
+        return URLSafeSerializer(settings.SECRET_KEY, salt="local-storage-upload")
+
+    async def create_signed_upload(self, key: str, content_type: str, expires_in: int) -> SignedUpload:
+        self._path(key)  # validate the key before signing it
+        # Срок действия подписан в самом токене: у каждой ссылки свой expires_in
+        token = self._signer.dumps({"key": key, "content_type": content_type, "exp": int(time.time()) + expires_in})
+        return SignedUpload(
+            key=key,
+            url=f"{self.base_url}{settings.API_V1_PREFIX}/storage/upload/{token}",
+            headers={"Content-Type": content_type},
+            expires_in=expires_in,
+        )
+
+    def verify_upload_token(self, token: str) -> dict:
+        """
+        Check a token issued by ``create_signed_upload`` against its signed expiry.
+
+        Returns:
+            dict: ``key`` and ``content_type`` the upload was signed for
+
+        Raises:
+            StorageError: if the token is forged or expired
+        """
+        try:
+            claims = self._signer.loads(token)
+        except BadSignature as e:
+            raise StorageError("Invalid upload URL") from e
+        if time.time() > claims.get("exp", 0):
+            raise StorageError("Upload URL expired")
+        return claims
+
+    def _copy_to(self, key: str, dest_path: str, max_bytes: int) -> int:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError as e:
+            raise StorageError(f"Object not found: {key}") from e
+        if size > max_bytes:
+            raise StorageError(f"Object {key} exceeds {max_bytes} bytes")
+        with open(path, "rb") as src, open(dest_path, "wb") as dst:
+            while chunk := src.read(64 * 1024):
+                dst.write(chunk)
+        return size
+
+    async def download(self, key: str, dest_path: str, max_bytes: int) -> int:
+        with phase("storage"):
+            return await asyncio.to_thread(self._copy_to, key, dest_path, max_bytes)
+
+
+local_storage = LocalStorage()
+
+
+def get_storage() -> StorageBackend:
+    """Return the configured primary storage backend."""
+    from app.core.supabase_storage import supabase_storage
+
+    backend = settings.STORAGE_BACKEND
+    if backend == "local":
+        return local_storage
+    if backend == "supabase" or supabase_storage.is_available():
+        return supabase_storage
+    return local_storage
+
+
+async def delete_by_url(url: str) -> bool:
+    """Delete an object given the public URL it was served from."""
+    from app.core.supabase_storage import supabase_storage
+
+    for backend in (supabase_storage, local_storage):
+        if not backend.is_available():
+            continue
+        key = backend.key_for_url(url)
+        if key:
+            return await backend.delete(key)
+    return False
+
+
+async def close_storage() -> None:
+    """Close pooled clients of all storage backends."""
+    # Модуль Supabase мог так и не понадобиться — не импортируем его ради закрытия
+    module = sys.modules.get("app.core.supabase_storage")
+    if module is not None:
+        await module.supabase_storage.aclose()
@@ -1,133 +1,242 @@
-import os
-import tempfile
-from typing import Optional, Tuple
-from supabase import create_client, Client
+import asyncio
+import random
+import time
+from typing import Optional
+import httpx
 from app.core.config import settings
+from app.core.timing import add_timing
+from app.core.storage import SignedUpload, StorageBackend, StorageError, avatar_key, guess_content_type
 import logging
 
 logger = logging.getLogger(__name__)
 
-class SupabaseStorage:
-    """Supabase Storage client for file operations."""
-    
-    def __init__(self):
-        self.client: Optional[Client] = None
-        self.bucket_name = settings.SUPABASE_BUCKET
-        
-        # Initialize Supabase client if credentials are provided
-        if settings.SUPABASE_URL and settings.SUPABASE_KEY:
-            try:
-                self.client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-                logger.info("Supabase Storage client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Supabase client: {e}")
-                self.client = None
-        else:
+# Ответы, после которых имеет смысл повторить запрос
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class SupabaseStorage(StorageBackend):
+    """Supabase Storage backend talking to the Storage REST API over a pooled async client."""
+
+    name = "supabase"
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        key: Optional[str] = None,
+        bucket: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.url = (url if url is not None else settings.SUPABASE_URL).rstrip("/")
+        self.key = key if key is not None else settings.SUPABASE_KEY
+        self.bucket_name = bucket or settings.SUPABASE_BUCKET
+        self.max_retries = settings.STORAGE_MAX_RETRIES
+        self.retry_backoff = settings.STORAGE_RETRY_BACKOFF
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+        if not self.is_available():
             logger.warning("Supabase credentials not provided, using local storage")
-    
+
     def is_available(self) -> bool:
-        """Check if Supabase Storage is available."""
-        return self.client is not None
-    
+        """Check if Supabase Storage is configured."""
+        return bool(self.url and self.key)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Клиент создается лениво, чтобы привязаться к работающему event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.url}/storage/v1",
+                headers={"Authorization": f"Bearer {self.key}", "apikey": self.key},
+                timeout=httpx.Timeout(settings.STORAGE_TIMEOUT, connect=settings.STORAGE_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.STORAGE_POOL_SIZE,
+                    max_keepalive_connections=settings.STORAGE_POOL_SIZE,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying transient failures with exponential backoff and full jitter.
+
+        With ``stream=True`` the body is not read; the caller must close the response.
+
+        Raises:
+            StorageError: if the request still fails after all attempts
+        """
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                request = self.client.build_request(method, path, **kwargs)
+                response = await self.client.send(request, stream=stream)
+            except httpx.TransportError as e:
+                add_timing("storage", time.perf_counter() - start)
+                error = f"{type(e).__name__}: {e}"
+            else:
+                add_timing("storage", time.perf_counter() - start)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                await response.aclose()
+                error = f"HTTP {response.status_code}"
+
+            if attempt < self.max_retries:
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                logger.warning(f"Supabase {method} {path} failed ({error}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        raise StorageError(f"Supabase {method} {path} failed after {self.max_retries + 1} attempts: {error}")
+
+    async def upload(
+        self, key: str, data: bytes, content_type: Optional[str] = None, cache_seconds: int = 3600
+    ) -> str:
+        if not self.is_available():
+            raise StorageError("Supabase Storage is not configured")
+
+        response = await self._request(
+            "POST",
+            f"/object/{self.bucket_name}/{key}",
+            content=data,
+            headers={
+                "Content-Type": content_type or guess_content_type(key),
+                "cache-control": str(cache_seconds),
+                "x-upsert": "true",
+            },
+        )
+        if response.status_code >= 400:
+            raise StorageError(f"Supabase upload of {key} failed: HTTP {response.status_code} {response.text}")
+
+        public_url = self.public_url(key)
+        logger.info(f"Object uploaded to Supabase: {public_url}")
+        return public_url
+
+    async def delete(self, key: str) -> bool:
+        if not self.is_available():
+            return False
+
+        try:
+            response = await self._request(
+                "DELETE", f"/object/{self.bucket_name}", json={"prefixes": [key]}
+            )
+        except StorageError as e:
+            logger.error(f"Error deleting object from Supabase: {e}")
+            return False
+
+        if response.status_code >= 400:
+            logger.error(f"Failed to delete object from Supabase: {key} (HTTP {response.status_code})")
+            return False
+
+        logger.info(f"Object deleted from Supabase: {key}")
+        return bool(response.json())
+
+    def public_url(self, key: str) -> str:
+        return f"{self.url}/storage/v1/object/public/{self.bucket_name}/{key}"
+
+    async def create_signed_upload(self, key: str, content_type: str, expires_in: int) -> SignedUpload:
+        if not self.is_available():
+            raise StorageError("Supabase Storage is not configured")
+
+        # Supabase сам ограничивает срок жизни подписанной ссылки; expires_in сообщаем клиенту
+        response = await self._request("POST", f"/object/upload/sign/{self.bucket_name}/{key}")
+        if response.status_code >= 400:
+            raise StorageError(f"Failed to sign upload for {key}: HTTP {response.status_code}")
+
+        signed_path = response.json()["url"]
+        return SignedUpload(
+            key=key,
+            url=f"{self.url}/storage/v1{signed_path}",
+            # Без upsert повторная загрузка по той же ссылке отклоняется: ссылка одноразовая
+            headers={"Content-Type": content_type, "x-upsert": "false"},
+            expires_in=expires_in,
+        )
+
+    async def download(self, key: str, dest_path: str, max_bytes: int) -> int:
+        response = await self._request("GET", f"/object/{self.bucket_name}/{key}", stream=True)
+        try:
+            if response.status_code == 404 or response.status_code == 400:
+                raise StorageError(f"Object not found: {key}")
+            if response.status_code >= 400:
+                raise StorageError(f"Failed to download {key}: HTTP {response.status_code}")
+
+            size = 0
+            # Файловый ввод-вывод — в пуле потоков, чтобы не блокировать event loop
+            f = await asyncio.to_thread(open, dest_path, "wb")
+            try:
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise StorageError(f"Object {key} exceeds {max_bytes} bytes")
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            return size
+        except httpx.TransportError as e:
+            raise StorageError(f"Failed to download {key}: {e}") from e
+        finally:
+            await response.aclose()
+
     async def upload_avatar(self, file_path: str, user_id: int, filename: str) -> Optional[str]:
         """
         Upload avatar to Supabase Storage.
-        
+
         Args:
             file_path: Path to the local file
             user_id: User ID for unique path
             filename: Generated filename
-            
+
         Returns:
             Optional[str]: Public URL if successful, None otherwise
         """
         if not self.is_available():
             logger.warning("Supabase Storage not available, falling back to local storage")
             return None
-        
+
         try:
-            # Create path in Supabase Storage
-            storage_path = f"avatars/{user_id}/{filename}"
-            
-            # Read file content
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            
-            # Upload to Supabase Storage
-            response = self.client.storage.from_(self.bucket_name).upload(
-                path=storage_path,
-                file=file_content,
-                file_options={
-                    "content-type": "image/jpeg",
-                    "cache-control": "3600"
-                }
-            )
-            
-            if response:
-                # Get public URL
-                public_url = self.client.storage.from_(self.bucket_name).get_public_url(storage_path)
-                logger.info(f"Avatar uploaded to Supabase: {public_url}")
-                return public_url
-            else:
-                logger.error("Failed to upload avatar to Supabase")
-                return None
-                
-        except Exception as e:
+            data = await asyncio.to_thread(_read_file, file_path)
+            return await self.upload(avatar_key(user_id, filename), data, guess_content_type(filename))
+        except (OSError, StorageError) as e:
             logger.error(f"Error uploading avatar to Supabase: {e}")
             return None
-    
+
     async def delete_avatar(self, user_id: int, filename: str) -> bool:
         """
         Delete avatar from Supabase Storage.
-        
+
         Args:
             user_id: User ID
             filename: Filename to delete
-            
+
         Returns:
             bool: True if successful, False otherwise
         """
-        if not self.is_available():
-            return False
-        
-        try:
-            storage_path = f"avatars/{user_id}/{filename}"
-            
-            # Delete from Supabase Storage
-            response = self.client.storage.from_(self.bucket_name).remove([storage_path])
-            
-            if response:
-                logger.info(f"Avatar deleted from Supabase: {storage_path}")
-                return True
-            else:
-                logger.error(f"Failed to delete avatar from Supabase: {storage_path}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Error deleting avatar from Supabase: {e}")
-            return False
-    
+        return await self.delete(avatar_key(user_id, filename))
+
     def get_public_url(self, user_id: int, filename: str) -> Optional[str]:
         """
         Get public URL for avatar from Supabase Storage.
-        
+
         Args:
             user_id: User ID
             filename: Filename
-            
+
         Returns:
             Optional[str]: Public URL if available, None otherwise
         """
         if not self.is_available():
             return None
-        
-        try:
-            storage_path = f"avatars/{user_id}/{filename}"
-            public_url = self.client.storage.from_(self.bucket_name).get_public_url(storage_path)
-            return public_url
-        except Exception as e:
-            logger.error(f"Error getting public URL from Supabase: {e}")
-            return None
+        return self.public_url(avatar_key(user_id, filename))
+
+
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
 
 # Global instance
 supabase_storage = SupabaseStorage()
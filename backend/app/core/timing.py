@@ -0,0 +1,122 @@
+"""
+Per-request phase timings exposed as a ``Server-Timing`` header.
+
+Code wraps expensive phases in ``phase("storage")`` etc.; DB time comes from
+the query statistics of ``app.db.query_stats``. Accumulation is a dict in a
+context variable, so the cost is one ``perf_counter`` pair per phase.
+Phases run via ``asyncio.to_thread`` are recorded too, since the worker
+thread receives a copy of the context that refers to the same dict.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.query_stats import current_stats
+
+logger = logging.getLogger(__name__)
+
+_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("server_timings", default=None)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    """Add time spent in a phase of the current request (no-op outside a request)."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the enclosed block as part of phase ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that accounts JSON encoding to the ``serialize`` phase."""
+
+    def render(self, content) -> bytes:
+        with phase("serialize"):
+            return super().render(content)
+
+
+def _format_header(timings: dict[str, float], db_queries: int, total: float) -> str:
+    parts = []
+    for name, seconds in timings.items():
+        if name == "db":
+            parts.append(f'db;dur={seconds * 1000:.1f};desc="{db_queries} queries"')
+        else:
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware emitting ``Server-Timing`` and logging the breakdown.
+
+    Must run inside ``QueryStatsMiddleware`` so DB time is available when the
+    response starts.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                stats = current_stats()
+                if stats is not None and stats.count:
+                    timings["db"] = stats.duration
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    _format_header(timings, stats.count if stats else 0, time.perf_counter() - start),
+                )
+                # Разрешаем фронтенду с другого origin видеть тайминги в devtools
+                origin = Headers(scope=scope).get("origin")
+                if origin and origin in settings.CORS_ORIGINS:
+                    headers.append("Timing-Allow-Origin", origin)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
+            total = time.perf_counter() - start
+            fields = {name: round(seconds * 1000, 1) for name, seconds in timings.items()}
+            level = logging.INFO if total * 1000 >= settings.SLOW_REQUEST_MS else logging.DEBUG
+            logger.log(
+                level,
+                "%s %s %s %.1fms %s",
+                scope["method"], scope["path"], status_code, total * 1000,
+                " ".join(f"{k}={v}" for k, v in fields.items()),
+                extra={
+                    "http_method": scope["method"],
+                    "http_path": scope["path"],
+                    "http_status": status_code,
+                    "duration_ms": round(total * 1000, 1),
+                    "timings_ms": fields,
+                },
+            )
@@ -0,0 +1,130 @@
+"""
+OpenTelemetry tracing.
+
+When ``TRACING_ENABLED`` is set, FastAPI routes, SQLAlchemy statements and
+outbound httpx calls (storage, OAuth providers) get spans automatically;
+code adds its own with ``tracer.start_as_current_span(...)``. Without a
+configured provider the API tracer is a no-op, so manual spans cost nothing.
+
+Sampling is decided at the root (``TRACING_SAMPLE_RATE``) and followed by
+child spans, including ones started in worker threads, since the trace
+context lives in a context variable.
+"""
+import json
+import logging
+import threading
+from typing import Optional, Sequence
+
+from opentelemetry import trace
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("app")
+
+_provider = None
+
+
+def _file_exporter(path: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class FileSpanExporter(SpanExporter):
+        """Append finished spans to a local file, one JSON object per line."""
+
+        def __init__(self, path: str):
+            self.path = path
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence) -> "SpanExportResult":
+            lines = "".join(json.dumps(json.loads(span.to_json())) + "\n" for span in spans)
+            try:
+                with self._lock, open(self.path, "a") as f:
+                    f.write(lines)
+            except OSError as e:
+                logger.error(f"Failed to write spans to {self.path}: {e}")
+                return SpanExportResult.FAILURE
+            return SpanExportResult.SUCCESS
+
+    return FileSpanExporter(path)
+
+
+def _exporter():
+    exporter = settings.TRACING_EXPORTER
+    if exporter == "file":
+        return _file_exporter(settings.TRACING_FILE)
+    if exporter == "console":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        return ConsoleSpanExporter()
+    if exporter == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        # Пустой endpoint — берется из OTEL_EXPORTER_OTLP_ENDPOINT или localhost:4318
+        return OTLPSpanExporter(endpoint=settings.OTLP_ENDPOINT or None)
+    raise ValueError(f"Unknown TRACING_EXPORTER: {exporter}")
+
+
+def setup_tracing(app=None, engine=None) -> None:
+    """
+    Install the tracer provider and auto-instrumentation.
+
+    The provider and the httpx/SQLAlchemy instrumentation are process-wide and
+    installed once (the global provider cannot be replaced); every application
+    passed in is instrumented on its own, so each ``create_app()`` in the same
+    process gets route spans.
+
+    Args:
+        app: FastAPI application to instrument, if any
+        engine: SQLAlchemy engine to instrument, if any
+    """
+    global _provider
+    if not settings.TRACING_ENABLED:
+        return
+
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+
+    if _provider is None:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+        _provider = TracerProvider(
+            resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+            sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATE)),
+        )
+        _provider.add_span_processor(BatchSpanProcessor(_exporter()))
+        trace.set_tracer_provider(_provider)
+        # Клиенты httpx создаются лениво, поэтому инструментируются и пул хранилища, и OAuth-клиент
+        HTTPXClientInstrumentor().instrument(tracer_provider=_provider)
+        logger.info(
+            f"Tracing enabled: exporter={settings.TRACING_EXPORTER}, sample rate={settings.TRACING_SAMPLE_RATE}"
+        )
+
+    if app is not None and not getattr(app, "_is_instrumented_by_opentelemetry", False):
+        from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=_provider, excluded_urls="health,metrics")
+    if engine is not None and not SQLAlchemyInstrumentor().is_instrumented_by_opentelemetry:
+        SQLAlchemyInstrumentor().instrument(engine=engine, tracer_provider=_provider)
+
+
+def shutdown_tracing() -> None:
+    """
+    Flush pending spans.
+
+    The provider stays installed and is reused by a later ``setup_tracing``
+    (another app, a reload); the SDK shuts it down when the process exits.
+    """
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def current_trace_id() -> Optional[str]:
+    """Hex id of the active sampled trace, for correlating logs with traces."""
+    context = trace.get_current_span().get_span_context()
+    if not context.is_valid or not context.trace_flags.sampled:
+        return None
+    return format(context.trace_id, "032x")
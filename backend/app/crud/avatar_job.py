@@ -0,0 +1,133 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+
+from app.crud.change_log import record_change
+from app.models.avatar_job import AvatarJob, AvatarJobStatus
+from app.models.change_log import ChangeEntity
+from app.models.user import User
+
+
+def create_job(db: Session, user_id: int, source_key: str) -> AvatarJob:
+    """Queue processing of an uploaded original."""
+    job = AvatarJob(id=uuid.uuid4().hex, user_id=user_id, source_key=source_key)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_job(db: Session, job_id: str, user_id: int) -> Optional[AvatarJob]:
+    """Get a job by ID for a user."""
+    stmt = select(AvatarJob).where(AvatarJob.id == job_id, AvatarJob.user_id == user_id)
+    return db.scalar(stmt)
+
+
+def job_exists_for_source(db: Session, source_key: str) -> bool:
+    """Whether an original has already been handed to a job (queued or processed)."""
+    return db.scalar(select(AvatarJob.id).where(AvatarJob.source_key == source_key).limit(1)) is not None
+
+
+def claim_next_job(db: Session) -> Optional[AvatarJob]:
+    """
+    Atomically take the oldest queued job and mark it as processing.
+
+    SKIP LOCKED lets several workers poll Postgres concurrently; the conditional
+    UPDATE keeps the claim safe on SQLite, where row locks are not available.
+    """
+    stmt = (
+        select(AvatarJob.id)
+        .where(AvatarJob.status == AvatarJobStatus.queued.value)
+        .order_by(AvatarJob.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    job_id = db.scalar(stmt)
+    if job_id is None:
+        db.rollback()
+        return None
+
+    result = db.execute(
+        update(AvatarJob)
+        .where(AvatarJob.id == job_id, AvatarJob.status == AvatarJobStatus.queued.value)
+        .values(
+            status=AvatarJobStatus.processing.value,
+            attempts=AvatarJob.attempts + 1,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    db.commit()
+    if result.rowcount != 1:
+        return None  # another worker claimed it first
+    return db.get(AvatarJob, job_id)
+
+
+def get_claimed_job(db: Session, job_id: str, attempt: int) -> Optional[AvatarJob]:
+    """
+    The job if it is still processing under the given claim, locked until commit.
+
+    Returns None once the job was requeued after a timeout (and possibly claimed
+    again) or finished by someone else: the caller no longer owns it.
+    """
+    stmt = (
+        select(AvatarJob)
+        .where(
+            AvatarJob.id == job_id,
+            AvatarJob.status == AvatarJobStatus.processing.value,
+            AvatarJob.attempts == attempt,
+        )
+        .with_for_update()
+    )
+    return db.scalar(stmt)
+
+
+def mark_done(db: Session, job: AvatarJob, avatar_url: str) -> AvatarJob:
+    """
+    Swap the user's avatar and mark the job done in one transaction.
+
+    A single commit keeps the row lock from ``get_claimed_job`` until both
+    writes land, so a requeued attempt cannot record its avatar in between.
+    """
+    user = db.get(User, job.user_id)
+    if user is None:
+        raise ValueError("User not found")
+    user.avatar_url = avatar_url
+    record_change(db, user.id, ChangeEntity.profile, user.id)
+    job.status = AvatarJobStatus.done.value
+    job.avatar_url = avatar_url
+    job.error = None
+    db.commit()
+    return job
+
+
+def mark_failed(db: Session, job: AvatarJob, error: str) -> AvatarJob:
+    job.status = AvatarJobStatus.failed.value
+    job.error = error[:500]
+    db.commit()
+    return job
+
+
+def requeue_stale_jobs(db: Session, older_than: timedelta, max_attempts: int) -> int:
+    """Return jobs abandoned by crashed workers to the queue; give up after max_attempts."""
+    cutoff = datetime.utcnow() - older_than
+    stale = (AvatarJob.status == AvatarJobStatus.processing.value) & (AvatarJob.updated_at < cutoff)
+    db.execute(
+        update(AvatarJob)
+        .where(stale, AvatarJob.attempts >= max_attempts)
+        .values(status=AvatarJobStatus.failed.value, error="Processing timed out")
+    )
+    result = db.execute(
+        update(AvatarJob)
+        .where(stale, AvatarJob.attempts < max_attempts)
+        .values(status=AvatarJobStatus.queued.value, updated_at=datetime.utcnow())
+    )
+    db.commit()
+    return result.rowcount
+
+
+def count_queued(db: Session) -> int:
+    stmt = select(func.count()).select_from(AvatarJob).where(AvatarJob.status == AvatarJobStatus.queued.value)
+    return db.scalar(stmt) or 0
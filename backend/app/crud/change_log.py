@@ -0,0 +1,124 @@
+"""
+Change sequence behind contact book sync.
+
+Writers call ``record_change`` inside the transaction that makes the change,
+so a change is visible in the log exactly when it is committed. The same
+call stages a push notification that is published on commit (see
+``app.core.events``).
+
+On PostgreSQL sequence values are handed out at insert time but become
+visible at commit, so a reader could see seq 11 while 10 is still in flight
+and skip it forever. Writers therefore hold a shared advisory lock until
+commit, and ``stable_horizon`` briefly takes it exclusively: once acquired,
+every seq up to the returned horizon is committed.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List
+
+from sqlalchemy import delete, func, insert, literal, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.events import stage_events
+from app.models.change_log import ChangeEntity, ChangeLog, ChangeOp
+from app.models.contact import Contact
+
+# Ключ advisory lock, разделяемого писателями журнала изменений
+CHANGE_LOG_LOCK_ID = 7_431_202_002
+
+
+def _is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def record_changes(db: Session, changes: Iterable[tuple[int, ChangeEntity, int, ChangeOp]]) -> None:
+    """
+    Append ``(user_id, entity, entity_id, op)`` rows to the change log. Does not commit.
+
+    Args:
+        db: Session of the transaction making the changes
+        changes: One tuple per changed row
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "entity": entity.value, "entity_id": entity_id, "op": op.value, "created_at": now}
+        for user_id, entity, entity_id, op in changes
+    ]
+    if not rows:
+        return
+    if _is_postgres(db):
+        db.execute(text("SELECT pg_advisory_xact_lock_shared(:id)"), {"id": CHANGE_LOG_LOCK_ID})
+    db.execute(insert(ChangeLog), rows)
+    stage_events(db, [{k: row[k] for k in ("user_id", "entity", "entity_id", "op")} for row in rows])
+
+
+def record_change(
+    db: Session, user_id: int, entity: ChangeEntity, entity_id: int, op: ChangeOp = ChangeOp.upsert
+) -> None:
+    """Append a single change to the log. Does not commit."""
+    record_changes(db, [(user_id, entity, entity_id, op)])
+
+
+def record_follower_changes(db: Session, contact_user_id: int, op: ChangeOp) -> None:
+    """Record a ``contact`` change for everyone who has ``contact_user_id`` in their contacts (INSERT ... SELECT)."""
+    if _is_postgres(db):
+        db.execute(text("SELECT pg_advisory_xact_lock_shared(:id)"), {"id": CHANGE_LOG_LOCK_ID})
+    followers = select(
+        Contact.user_id,
+        literal(ChangeEntity.contact.value, ChangeLog.entity.type),
+        Contact.contact_user_id,
+        literal(op.value, ChangeLog.op.type),
+        literal(datetime.utcnow(), ChangeLog.created_at.type),
+    ).where(Contact.contact_user_id == contact_user_id, Contact.is_active == True)  # noqa: E712
+    stmt = insert(ChangeLog).from_select(["user_id", "entity", "entity_id", "op", "created_at"], followers)
+    follower_ids = db.scalars(stmt.returning(ChangeLog.user_id)).all()
+    stage_events(db, [
+        {"user_id": user_id, "entity": ChangeEntity.contact.value, "entity_id": contact_user_id, "op": op.value}
+        for user_id in follower_ids
+    ])
+
+
+def stable_horizon(db: Session) -> int:
+    """
+    Highest seq below which no change can still appear. Ends the current transaction.
+
+    Returns:
+        int: Sequence value safe to use as the upper bound of a sync page
+    """
+    if _is_postgres(db):
+        # Ждем завершения транзакций, которые уже получили seq, но еще не зафиксированы
+        db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": CHANGE_LOG_LOCK_ID})
+    horizon = db.scalar(select(func.coalesce(func.max(ChangeLog.seq), 0)))
+    db.commit()
+    return horizon
+
+
+def changes_since(db: Session, user_id: int, after: int, upto: int, limit: int) -> List[ChangeLog]:
+    """
+    Changes relevant to a user's contact book with ``after < seq <= upto``, oldest first.
+
+    Relevant are changes of the user's own contact list and profile/channel
+    changes of users currently in it.
+    """
+    contact_ids = select(Contact.contact_user_id).where(Contact.user_id == user_id, Contact.is_active == True)  # noqa: E712
+    stmt = (
+        select(ChangeLog)
+        .where(
+            ChangeLog.seq > after,
+            ChangeLog.seq <= upto,
+            or_(
+                (ChangeLog.user_id == user_id) & (ChangeLog.entity == ChangeEntity.contact.value),
+                ChangeLog.user_id.in_(contact_ids) & (ChangeLog.entity != ChangeEntity.contact.value),
+            ),
+        )
+        .order_by(ChangeLog.seq)
+        .limit(limit)
+    )
+    return list(db.scalars(stmt))
+
+
+def prune_changes(db: Session, older_than: timedelta) -> int:
+    """Delete log rows older than ``older_than``; clients with older cursors must resync."""
+    result = db.execute(delete(ChangeLog).where(ChangeLog.created_at < datetime.utcnow() - older_than))
+    db.commit()
+    return result.rowcount
+
@@ -1,16 +1,50 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import delete as sql_delete, exists, insert, literal, select, update as sql_update
 from sqlalchemy.orm import Session
 
 from app.models.channel import Channel
+from app.models.channel_groups import channel_groups
 from app.models.user import User
 from app.models.group import Group
+from app.crud import ordering
+from app.crud.change_log import record_change, record_changes
+from app.models.change_log import ChangeEntity, ChangeOp
 
 
 def list_for_user(db: Session, user_id: int) -> List[Channel]:
     stmt = select(Channel).where(Channel.user_id == user_id).order_by(Channel.sort_order, Channel.id)
-    return list(db.scalars(stmt).all())
+    return load_group_ids(db, list(db.scalars(stmt).all()))
+
+
+def load_group_ids(db: Session, channels: List[Channel]) -> List[Channel]:
+    """
+    Set ``group_ids`` on each channel from a single query over ``channel_groups``.
+
+    ``ChannelPublic.group_ids`` is read from this attribute; going through the
+    ``groups`` relationship instead would lazy-load once per channel.
+
+    Args:
+        db: Database session
+        channels: Channels to fill in place
+
+    Returns:
+        List[Channel]: The same channels
+    """
+    if not channels:
+        return channels
+    membership: dict[int, List[int]] = {ch.id: [] for ch in channels}
+    rows = db.execute(
+        select(channel_groups.c.channel_id, channel_groups.c.group_id)
+        .where(channel_groups.c.channel_id.in_(membership))
+        .order_by(channel_groups.c.channel_id, channel_groups.c.group_id)
+    )
+    for channel_id, group_id in rows:
+        membership[channel_id].append(group_id)
+    for ch in channels:
+        ch.group_ids = membership[ch.id]
+    return channels
 
 
 def get(db: Session, channel_id: int) -> Optional[Channel]:
@@ -23,13 +57,13 @@ def create(db: Session, *, user: User, group_ids: List[int] = None, **data) -> C
     db.flush()  # Flush to get the channel ID
     
     # Add to groups if specified
-    if group_ids is not None:
-        groups = db.query(Group).filter(Group.id.in_(group_ids), Group.user_id == user.id).all()
-        ch.groups.extend(groups)
+    if group_ids:
+        replace_groups(db, ch.id, user.id, group_ids)
+    record_change(db, user.id, ChangeEntity.channel, ch.id)
     
     db.commit()
     db.refresh(ch)
-    return ch
+    return load_group_ids(db, [ch])[0]
 
 
 def update(db: Session, ch: Channel, group_ids: List[int] = None, **data) -> Channel:
@@ -38,39 +72,191 @@ def update(db: Session, ch: Channel, group_ids: List[int] = None, **data) -> Cha
         if v is not None:
             setattr(ch, k, v)
     
-    # Update groups if specified
+    # Update groups if specified (even if empty array)
     if group_ids is not None:
-        # Clear existing groups
-        ch.groups.clear()
-        # Add new groups (even if empty array)
-        groups = db.query(Group).filter(Group.id.in_(group_ids), Group.user_id == ch.user_id).all()
-        ch.groups.extend(groups)
+        replace_groups(db, ch.id, ch.user_id, group_ids)
+    record_change(db, ch.user_id, ChangeEntity.channel, ch.id)
     
     db.add(ch)
     db.commit()
     db.refresh(ch)
-    return ch
+    return load_group_ids(db, [ch])[0]
 
 
 def delete(db: Session, ch: Channel) -> None:
+    record_change(db, ch.user_id, ChangeEntity.channel, ch.id, ChangeOp.delete)
     db.delete(ch)
     db.commit()
 
 
 def remove_from_group(db: Session, channel_id: int, group_id: int, user_id: int) -> bool:
     """Remove channel from specific group."""
-    ch = get(db, channel_id)
-    if not ch or ch.user_id != user_id:
-        return False
-    
-    group = db.get(Group, group_id)
-    if not group or group.user_id != user_id:
-        return False
-    
-    if group in ch.groups:
-        ch.groups.remove(group)
-        db.commit()
-        return True
-    
-    return False
+    owned_channel = select(Channel.id).where(Channel.id == channel_id, Channel.user_id == user_id)
+    owned_group = select(Group.id).where(Group.id == group_id, Group.user_id == user_id)
+    result = db.execute(
+        sql_delete(channel_groups).where(
+            channel_groups.c.channel_id.in_(owned_channel),
+            channel_groups.c.group_id.in_(owned_group),
+        )
+    )
+    if result.rowcount:
+        # group_ids канала входят в синхронизацию и события
+        record_change(db, user_id, ChangeEntity.channel, channel_id)
+    db.commit()
+    return result.rowcount > 0
+
 
+def _link_groups(channel_id: int, user_id: int, group_ids: List[int]):
+    """INSERT ... SELECT adding the user's groups from ``group_ids`` the channel is not yet in."""
+    already_linked = exists().where(
+        channel_groups.c.channel_id == channel_id, channel_groups.c.group_id == Group.id
+    )
+    return insert(channel_groups).from_select(
+        ["channel_id", "group_id"],
+        select(literal(channel_id), Group.id).where(
+            Group.id.in_(group_ids), Group.user_id == user_id, ~already_linked
+        ),
+    )
+
+
+def replace_groups(db: Session, channel_id: int, user_id: int, group_ids: List[int]) -> None:
+    """
+    Make the channel's groups exactly ``group_ids`` by diff, without loading either side.
+
+    One DELETE of memberships no longer wanted and one INSERT ... SELECT of the
+    missing ones; group ids not owned by the user are ignored. Does not commit.
+    """
+    db.execute(
+        sql_delete(channel_groups).where(
+            channel_groups.c.channel_id == channel_id,
+            channel_groups.c.group_id.not_in(group_ids),
+        )
+    )
+    if group_ids:
+        db.execute(_link_groups(channel_id, user_id, group_ids))
+
+
+def set_groups(db: Session, ch: Channel, group_ids: List[int]) -> Channel:
+    """Replace a channel's group membership."""
+    replace_groups(db, ch.id, ch.user_id, group_ids)
+    record_change(db, ch.user_id, ChangeEntity.channel, ch.id)
+    db.commit()
+    db.refresh(ch)
+    return load_group_ids(db, [ch])[0]
+
+
+def move(db: Session, ch: Channel, after_id: Optional[int]) -> Channel:
+    """Move a channel right after ``after_id`` (first when None), usually writing one row."""
+    moved = ordering.move_after(db, ch, after_id, Channel.id)
+    record_changes(db, [(ch.user_id, ChangeEntity.channel, channel_id, ChangeOp.upsert) for channel_id in moved])
+    db.commit()
+    db.refresh(ch)
+    return load_group_ids(db, [ch])[0]
+
+
+# Поля канала, которые можно задать через пакетные операции
+BATCH_FIELDS = ("type", "value", "label", "is_public", "is_primary", "sort_order")
+
+
+def apply_batch(db: Session, user: User, operations: Sequence) -> List[Channel]:
+    """
+    Apply create/update/delete/move operations to a user's channels in one transaction.
+
+    Operations are grouped by kind and each group runs as a single bulk statement:
+    deletes first, then updates, then moves, then creates. Moves place a channel
+    after ``after_id`` with the same gap ranks as ``move``. Group ids that do
+    not belong to the user are ignored, as in ``create``/``update``.
+
+    Args:
+        db: Database session
+        user: Owner of the channels
+        operations: ``ChannelBatch*`` operations
+
+    Returns:
+        List[Channel]: The user's channels after the batch
+
+    Raises:
+        ValueError: if an operation references an unknown or foreign channel,
+            or the same channel more than once
+    """
+    user_id = user.id
+    now = datetime.utcnow()
+    creates, updates, deletes, moves = [], {}, [], {}
+    memberships: dict[int, List[int]] = {}
+
+    for op in operations:
+        if op.op == "create":
+            creates.append(op)
+            continue
+        if op.id in updates or op.id in deletes or op.id in moves:
+            raise ValueError(f"Channel {op.id} appears in more than one operation")
+        if op.op == "delete":
+            deletes.append(op.id)
+        elif op.op == "move":
+            moves[op.id] = op.after_id
+        else:
+            updates[op.id] = {k: getattr(op, k) for k in BATCH_FIELDS if getattr(op, k) is not None}
+            if op.group_ids is not None:
+                memberships[op.id] = op.group_ids
+
+    touched = set(updates) | set(deletes) | set(moves)
+    if touched:
+        owned = set(db.scalars(select(Channel.id).where(Channel.user_id == user_id, Channel.id.in_(touched))))
+        missing = sorted(touched - owned)
+        if missing:
+            raise ValueError(f"Channels not found: {', '.join(map(str, missing))}")
+
+    requested_groups = {gid for op in creates for gid in op.group_ids}
+    requested_groups.update(gid for ids in memberships.values() for gid in ids)
+    allowed_groups = set()
+    if requested_groups:
+        allowed_groups = set(db.scalars(
+            select(Group.id).where(Group.user_id == user_id, Group.id.in_(requested_groups))
+        ))
+
+    changes = [(user_id, ChangeEntity.channel, cid, ChangeOp.delete) for cid in deletes]
+    changes += [(user_id, ChangeEntity.channel, cid, ChangeOp.upsert) for cid in updates]
+
+    if deletes:
+        db.execute(sql_delete(channel_groups).where(channel_groups.c.channel_id.in_(deletes)))
+        db.execute(
+            sql_delete(Channel).where(Channel.id.in_(deletes), Channel.user_id == user_id),
+            execution_options={"synchronize_session": False},
+        )
+
+    if updates:
+        # UPDATE по первичному ключу, executemany
+        db.execute(sql_update(Channel), [{"id": cid, **fields, "updated_at": now} for cid, fields in updates.items()])
+
+    if moves:
+        # Те же ранги с промежутками, что и у одиночного перемещения: одно чтение и один bulk UPDATE
+        moved = ordering.move_many(db, Channel, user_id, list(moves.items()), Channel.id)
+        changes += [(user_id, ChangeEntity.channel, cid, ChangeOp.upsert) for cid in moved if cid not in updates]
+
+    if creates:
+        rows = [
+            {"user_id": user_id, **{k: getattr(op, k) for k in BATCH_FIELDS}, "created_at": now, "updated_at": now}
+            for op in creates
+        ]
+        # RETURNING в порядке параметров: id сопоставляются с операциями по позиции
+        new_ids = db.scalars(insert(Channel).returning(Channel.id, sort_by_parameter_order=True), rows).all()
+        for cid, op in zip(new_ids, creates):
+            memberships[cid] = op.group_ids
+        changes += [(user_id, ChangeEntity.channel, cid, ChangeOp.upsert) for cid in new_ids]
+
+    if memberships:
+        replaced = [cid for cid in memberships if cid in updates]
+        if replaced:
+            db.execute(sql_delete(channel_groups).where(channel_groups.c.channel_id.in_(replaced)))
+        pairs = [
+            {"channel_id": cid, "group_id": gid}
+            for cid, gids in memberships.items()
+            for gid in dict.fromkeys(gids)
+            if gid in allowed_groups
+        ]
+        if pairs:
+            db.execute(insert(channel_groups), pairs)
+
+    record_changes(db, changes)
+    db.commit()
+    return list_for_user(db, user_id)
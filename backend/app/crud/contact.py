@@ -1,8 +1,12 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from itertools import chain, groupby
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, select
+from app.crud.change_log import record_change
+from app.models.change_log import ChangeEntity, ChangeOp
+from app.models.channel import Channel
 from app.models.contact import Contact
 from app.models.user import User
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional, Set
 
 
 def create_contact(db: Session, user_id: int, contact_user_id: int) -> Contact:
@@ -33,6 +37,7 @@ def create_contact(db: Session, user_id: int, contact_user_id: int) -> Contact:
         contact_user_id=contact_user_id
     )
     db.add(contact)
+    record_change(db, user_id, ChangeEntity.contact, contact_user_id)
     db.commit()
     db.refresh(contact)
     return contact
@@ -40,7 +45,8 @@ def create_contact(db: Session, user_id: int, contact_user_id: int) -> Contact:
 
 def get_user_contacts(db: Session, user_id: int) -> List[Contact]:
     """Получить все контакты пользователя"""
-    return db.query(Contact).filter(
+    # joinedload: профили контактов приходят тем же запросом, без N+1
+    return db.query(Contact).options(joinedload(Contact.contact_user)).filter(
         and_(
             Contact.user_id == user_id,
             Contact.is_active == True
@@ -62,6 +68,7 @@ def remove_contact(db: Session, user_id: int, contact_user_id: int) -> bool:
         return False
     
     contact.is_active = False
+    record_change(db, user_id, ChangeEntity.contact, contact_user_id, ChangeOp.delete)
     db.commit()
     return True
 
@@ -90,3 +97,64 @@ def is_contact(db: Session, user_id: int, contact_user_id: int) -> bool:
     ).first()
     
     return contact is not None
+
+
+def get_contact_user_ids(db: Session, user_id: int, candidate_ids: Iterable[int]) -> Set[int]:
+    """Из переданных ID вернуть тех, кто уже в контактах пользователя (одним запросом)"""
+    candidate_ids = list(candidate_ids)
+    if not candidate_ids:
+        return set()
+    rows = db.query(Contact.contact_user_id).filter(
+        and_(
+            Contact.user_id == user_id,
+            Contact.contact_user_id.in_(candidate_ids),
+            Contact.is_active == True
+        )
+    ).all()
+    return {row.contact_user_id for row in rows}
+
+
+# Поля профиля контакта, которые попадают в экспорт
+EXPORT_USER_FIELDS = ("username", "display_name", "first_name", "last_name", "avatar_url", "bio")
+EXPORT_CHANNEL_FIELDS = ("type", "label", "value", "is_primary")
+
+
+def iter_contact_cards(db: Session, user_id: int, chunk_size: int = 1000) -> Iterator[dict]:
+    """
+    Stream a user's contacts with their public channels, ordered by username.
+
+    One query over contacts, users and public channels, read through a
+    server-side cursor ``chunk_size`` rows at a time; plain column rows are
+    grouped into one dict per contact, so memory does not grow with the
+    size of the contact book.
+
+    Args:
+        db: Session kept open for as long as the iterator is consumed
+        user_id: Owner of the contact book
+        chunk_size: Rows fetched from the database per round trip
+
+    Yields:
+        dict: Profile fields of ``EXPORT_USER_FIELDS`` plus ``channels``
+    """
+    user_columns = [getattr(User, name) for name in EXPORT_USER_FIELDS]
+    channel_columns = [getattr(Channel, name).label(f"channel_{name}") for name in EXPORT_CHANNEL_FIELDS]
+    stmt = (
+        select(User.id, *user_columns, *channel_columns)
+        .select_from(Contact)
+        .join(User, User.id == Contact.contact_user_id)
+        .outerjoin(Channel, and_(Channel.user_id == User.id, Channel.is_public == True))  # noqa: E712
+        .where(Contact.user_id == user_id, Contact.is_active == True)  # noqa: E712
+        .order_by(User.username, User.id, Channel.sort_order, Channel.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    # Строки одного контакта идут подряд благодаря сортировке
+    for _, rows in groupby(db.execute(stmt), key=lambda row: row.id):
+        first = next(rows)
+        card = {name: getattr(first, name) for name in EXPORT_USER_FIELDS}
+        card["channels"] = [
+            {name: getattr(row, f"channel_{name}") for name in EXPORT_CHANNEL_FIELDS}
+            for row in chain([first], rows)
+            if row.channel_type is not None
+        ]
+        yield card
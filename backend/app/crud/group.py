@@ -1,8 +1,14 @@
 from typing import List, Optional
-from sqlalchemy import select
+from sqlalchemy import delete, exists, insert, literal, select
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.exc import IntegrityError
+from app.models.channel import Channel
+from app.models.channel_groups import channel_groups
 from app.models.group import Group
+from app.crud import ordering
+from app.crud.change_log import record_changes
+from app.models.change_log import ChangeEntity, ChangeOp
 from app.schemas.group import GroupCreate, GroupUpdate
 
 
@@ -12,6 +18,48 @@ def get_groups(db: Session, user_id: int) -> List[Group]:
     return list(db.scalars(stmt).all())
 
 
+def get_group_tree(db: Session, user_id: int, public_only: bool = False) -> tuple[List[Group], List[Channel]]:
+    """
+    Load a user's groups with their channels, plus the channels in no group.
+
+    Two queries: the groups, and the channels outer-joined to ``channel_groups``.
+    Each group's ``channels`` and each channel's ``group_ids`` are filled from
+    the join, so nothing is lazy-loaded afterwards.
+
+    Args:
+        db: Database session
+        user_id: Owner of the groups
+        public_only: Only include channels with ``is_public``
+
+    Returns:
+        tuple[List[Group], List[Channel]]: (groups with channels, ungrouped channels)
+    """
+    groups = get_groups(db, user_id)
+    stmt = (
+        select(Channel, channel_groups.c.group_id)
+        .outerjoin(channel_groups, channel_groups.c.channel_id == Channel.id)
+        .where(Channel.user_id == user_id)
+        .order_by(Channel.sort_order, Channel.id, channel_groups.c.group_id)
+    )
+    if public_only:
+        stmt = stmt.where(Channel.is_public == True)  # noqa: E712
+
+    members: dict[int, List[Channel]] = {g.id: [] for g in groups}
+    channels: dict[int, Channel] = {}
+    for ch, group_id in db.execute(stmt):
+        if ch.id not in channels:
+            channels[ch.id] = ch
+            ch.group_ids = []
+        if group_id is not None:
+            ch.group_ids.append(group_id)
+            members[group_id].append(ch)
+
+    for group in groups:
+        # Заполняем связь как загруженную, не помечая объект измененным
+        set_committed_value(group, "channels", members[group.id])
+    return groups, [ch for ch in channels.values() if not ch.group_ids]
+
+
 def get_group(db: Session, group_id: int, user_id: int) -> Optional[Group]:
     """Get a specific group by ID for a user."""
     stmt = select(Group).where(Group.id == group_id, Group.user_id == user_id)
@@ -73,12 +121,78 @@ def update_group(db: Session, group_id: int, group_data: GroupUpdate, user_id: i
         raise ValueError(f"Group with name '{update_data.get('name', group.name)}' already exists")
 
 
+def _record_channel_changes(db: Session, user_id: int, channel_ids) -> None:
+    # Состав групп отдается в group_ids каждого канала, поэтому меняется сам канал
+    record_changes(db, [(user_id, ChangeEntity.channel, channel_id, ChangeOp.upsert) for channel_id in channel_ids])
+
+
 def delete_group(db: Session, group_id: int, user_id: int) -> bool:
     """Delete a group."""
     group = get_group(db, group_id, user_id)
     if not group:
         return False
     
+    members = db.scalars(select(channel_groups.c.channel_id).where(channel_groups.c.group_id == group_id)).all()
+    _record_channel_changes(db, user_id, members)
     db.delete(group)
     db.commit()
     return True
+
+
+def move_group(db: Session, group_id: int, after_id: Optional[int], user_id: int) -> Optional[Group]:
+    """Move a group right after ``after_id`` (first when None), usually writing one row."""
+    group = get_group(db, group_id, user_id)
+    if not group:
+        return None
+
+    ordering.move_after(db, group, after_id, Group.name)
+    db.commit()
+    db.refresh(group)
+    return group
+
+
+def add_channels(db: Session, group_id: int, channel_ids: List[int], user_id: int) -> Optional[int]:
+    """
+    Add the user's channels to a group with a single INSERT ... SELECT.
+
+    Returns:
+        Optional[int]: Number of channels added, None if the group is not found
+    """
+    if not get_group(db, group_id, user_id):
+        return None
+
+    already_linked = exists().where(
+        channel_groups.c.group_id == group_id, channel_groups.c.channel_id == Channel.id
+    )
+    added = db.scalars(
+        insert(channel_groups).from_select(
+            ["channel_id", "group_id"],
+            select(Channel.id, literal(group_id)).where(
+                Channel.id.in_(channel_ids), Channel.user_id == user_id, ~already_linked
+            ),
+        ).returning(channel_groups.c.channel_id)
+    ).all()
+    _record_channel_changes(db, user_id, added)
+    db.commit()
+    return len(added)
+
+
+def remove_channels(db: Session, group_id: int, channel_ids: List[int], user_id: int) -> Optional[int]:
+    """
+    Remove channels from a group with a single DELETE.
+
+    Returns:
+        Optional[int]: Number of channels removed, None if the group is not found
+    """
+    if not get_group(db, group_id, user_id):
+        return None
+
+    removed = db.scalars(
+        delete(channel_groups).where(
+            channel_groups.c.group_id == group_id,
+            channel_groups.c.channel_id.in_(channel_ids),
+        ).returning(channel_groups.c.channel_id)
+    ).all()
+    _record_channel_changes(db, user_id, removed)
+    db.commit()
+    return len(removed)
@@ -0,0 +1,138 @@
+"""
+Gap-based ordering of a user's channels and groups.
+
+``sort_order`` values are spaced ``RANK_STEP`` apart, so moving an item
+writes only that item's row with a rank between its new neighbours. When
+two neighbours have no free integer between them (or legacy rows share the
+same value) the user's items are renumbered once with a single bulk UPDATE.
+``move_many`` applies several moves the same way with one read and one write.
+"""
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+RANK_STEP = 1024
+
+
+def _siblings(model, user_id: int, tiebreak):
+    return select(model.id, model.sort_order).where(model.user_id == user_id).order_by(model.sort_order, tiebreak)
+
+
+def rebalance(db: Session, model, user_id: int, tiebreak, order: Optional[list[int]] = None) -> list[int]:
+    """
+    Renumber a user's items to ``RANK_STEP``, ``2 * RANK_STEP``, ...
+
+    Args:
+        db: Database session
+        model: ``Channel`` or ``Group``
+        user_id: Owner of the items
+        tiebreak: Secondary sort column the list is displayed with
+        order: Item ids in the desired order; the current order when omitted
+
+    Returns:
+        list[int]: Ids of the rows whose rank changed
+    """
+    current = {row.id: row.sort_order for row in db.execute(_siblings(model, user_id, tiebreak))}
+    if order is None:
+        order = list(current)
+    rows = [
+        {"id": item_id, "sort_order": (i + 1) * RANK_STEP}
+        for i, item_id in enumerate(order)
+        if current.get(item_id) != (i + 1) * RANK_STEP
+    ]
+    if rows:
+        db.execute(update(model), rows)
+    return [row["id"] for row in rows]
+
+
+def _rank_between(prev_rank: Optional[int], next_rank: Optional[int]) -> Optional[int]:
+    """A rank strictly between two neighbours' ranks, or None when there is no gap."""
+    if prev_rank is None and next_rank is None:
+        return 0
+    if prev_rank is None:
+        return next_rank - RANK_STEP
+    if next_rank is None:
+        return prev_rank + RANK_STEP
+    if next_rank - prev_rank > 1:
+        return (prev_rank + next_rank) // 2
+    return None
+
+
+def move_after(db: Session, item, after_id: Optional[int], tiebreak) -> list[int]:
+    """
+    Place ``item`` directly after sibling ``after_id`` (or first when None).
+
+    Usually one UPDATE of ``item``; renumbers all siblings only when there is
+    no gap left at the target position. Does not commit. Returns the ids of
+    the rows written.
+
+    Raises:
+        ValueError: if ``after_id`` is not another item of the same user
+    """
+    model = type(item)
+    if after_id == item.id:
+        raise ValueError("Cannot move an item after itself")
+
+    prev_rank = None
+    if after_id is not None:
+        prev_rank = db.scalar(select(model.sort_order).where(model.id == after_id, model.user_id == item.user_id))
+        if prev_rank is None:
+            raise ValueError(f"{model.__name__} {after_id} not found")
+
+    stmt = select(model.sort_order).where(model.user_id == item.user_id, model.id != item.id)
+    if after_id is not None:
+        stmt = stmt.where(model.id != after_id, model.sort_order >= prev_rank)
+    next_rank = db.scalar(stmt.order_by(model.sort_order, tiebreak).limit(1))
+
+    rank = _rank_between(prev_rank, next_rank)
+    if rank is None:
+        # Свободного места между соседями нет — перенумеровываем список целиком
+        order = [row.id for row in db.execute(_siblings(model, item.user_id, tiebreak)) if row.id != item.id]
+        order.insert(order.index(after_id) + 1 if after_id is not None else 0, item.id)
+        return rebalance(db, model, item.user_id, tiebreak, order)
+
+    db.execute(update(model).where(model.id == item.id).values(sort_order=rank))
+    return [item.id]
+
+
+def move_many(db: Session, model, user_id: int, moves: list[tuple[int, Optional[int]]], tiebreak) -> list[int]:
+    """
+    Apply ``(item_id, after_id)`` moves in sequence, as repeated ``move_after`` would.
+
+    The user's items are read once; moved items get gap ranks between their
+    final neighbours and are written with one bulk UPDATE, or the whole list
+    is renumbered when a gap is missing. Does not commit. Returns the ids of
+    the rows written.
+
+    Raises:
+        ValueError: if an item or ``after_id`` is not an item of the user
+    """
+    ranks = {row.id: row.sort_order for row in db.execute(_siblings(model, user_id, tiebreak))}
+    order = list(ranks)
+    for item_id, after_id in moves:
+        if after_id == item_id:
+            raise ValueError("Cannot move an item after itself")
+        for ref in (item_id, after_id):
+            if ref is not None and ref not in ranks:
+                raise ValueError(f"{model.__name__} {ref} not found")
+        order.remove(item_id)
+        order.insert(order.index(after_id) + 1 if after_id is not None else 0, item_id)
+
+    moved = {item_id for item_id, _ in moves}
+    new_ranks = {}
+    for i, item_id in enumerate(order):
+        if item_id not in moved:
+            continue
+        prev_rank = new_ranks.get(order[i - 1], ranks[order[i - 1]]) if i > 0 else None
+        # Следующий сосед — ближайший неперемещенный элемент: ранги перемещенных еще не назначены
+        next_rank = next((ranks[other] for other in order[i + 1:] if other not in moved), None)
+        rank = _rank_between(prev_rank, next_rank)
+        if rank is None:
+            return rebalance(db, model, user_id, tiebreak, order)
+        new_ranks[item_id] = rank
+
+    rows = [{"id": item_id, "sort_order": rank} for item_id, rank in new_ranks.items() if ranks[item_id] != rank]
+    if rows:
+        db.execute(update(model), rows)
+    return [row["id"] for row in rows]
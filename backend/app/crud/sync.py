@@ -0,0 +1,164 @@
+"""
+Delta sync of a user's contact book.
+
+The client keeps an opaque cursor. Without one it gets a full snapshot;
+with one, only what changed since: contacts added or removed, contacts'
+profiles, and their public channels, with tombstones for channels that
+were deleted or made private. Work is proportional to the number of
+changes, not to the size of the address book.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.crud.change_log import changes_since, stable_horizon
+from app.crud.channel import load_group_ids
+from app.models.change_log import ChangeEntity
+from app.models.channel import Channel
+from app.models.contact import Contact
+from app.models.user import User
+
+
+class CursorExpiredError(ValueError):
+    """The cursor predates the retained change log; the client must do a full sync."""
+
+
+@dataclass
+class SyncResult:
+    cursor: str
+    has_more: bool
+    full: bool
+    contacts: List[Contact] = field(default_factory=list)
+    removed_contacts: List[int] = field(default_factory=list)
+    profiles: List[User] = field(default_factory=list)
+    channels: List[Channel] = field(default_factory=list)
+    removed_channels: List[int] = field(default_factory=list)
+
+
+def _serializer() -> URLSafeSerializer:
+    return URLSafeSerializer(settings.SECRET_KEY, salt="contacts-sync")
+
+
+def encode_cursor(seq: int, issued_at: Optional[float] = None) -> str:
+    return _serializer().dumps({"seq": seq, "ts": int(issued_at if issued_at is not None else time.time())})
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Sequence number a cursor stands for.
+
+    Raises:
+        ValueError: if the cursor is malformed or forged
+        CursorExpiredError: if changes after it may already have been pruned
+    """
+    try:
+        data = _serializer().loads(cursor)
+        seq, issued = int(data["seq"]), int(data["ts"])
+    except (BadSignature, KeyError, TypeError, ValueError) as e:
+        raise ValueError("Invalid sync cursor") from e
+    if issued < time.time() - settings.SYNC_RETENTION_DAYS * 86400:
+        raise CursorExpiredError("Sync cursor expired, full sync required")
+    return seq
+
+
+def _active_contacts(db: Session, user_id: int, contact_user_ids: Optional[List[int]] = None) -> List[Contact]:
+    stmt = (
+        select(Contact)
+        .options(joinedload(Contact.contact_user))
+        .where(Contact.user_id == user_id, Contact.is_active == True)  # noqa: E712
+        .order_by(Contact.id)
+    )
+    if contact_user_ids is not None:
+        stmt = stmt.where(Contact.contact_user_id.in_(contact_user_ids))
+    return list(db.scalars(stmt).unique())
+
+
+def _public_channels(db: Session, owner_ids: List[int]) -> List[Channel]:
+    if not owner_ids:
+        return []
+    stmt = (
+        select(Channel)
+        .where(Channel.user_id.in_(owner_ids), Channel.is_public == True)  # noqa: E712
+        .order_by(Channel.user_id, Channel.sort_order, Channel.id)
+    )
+    return load_group_ids(db, list(db.scalars(stmt)))
+
+
+def sync_contacts(db: Session, user_id: int, cursor: Optional[str] = None) -> SyncResult:
+    """
+    One page of contact book changes after ``cursor`` (a full snapshot when None).
+
+    Args:
+        db: Database session; its transaction is ended to read a stable horizon
+        user_id: Owner of the contact book
+        cursor: Cursor returned by the previous call
+
+    Returns:
+        SyncResult: Current state of everything that changed, plus the next cursor
+
+    Raises:
+        ValueError / CursorExpiredError: see ``decode_cursor``
+    """
+    after = decode_cursor(cursor) if cursor is not None else None
+    horizon = stable_horizon(db)
+
+    if after is None:
+        contacts = _active_contacts(db, user_id)
+        return SyncResult(
+            cursor=encode_cursor(horizon),
+            has_more=False,
+            full=True,
+            contacts=contacts,
+            channels=_public_channels(db, [c.contact_user_id for c in contacts]),
+        )
+
+    page = changes_since(db, user_id, after, horizon, settings.SYNC_PAGE_SIZE + 1)
+    has_more = len(page) > settings.SYNC_PAGE_SIZE
+    page = page[: settings.SYNC_PAGE_SIZE]
+    next_seq = page[-1].seq if has_more else max(horizon, after)
+
+    # Журнал говорит только что изменилось; состояние читаем текущее
+    contact_ids = {c.entity_id for c in page if c.entity == ChangeEntity.contact.value}
+    profile_ids = {c.entity_id for c in page if c.entity == ChangeEntity.profile.value}
+    channel_ids = {c.entity_id for c in page if c.entity == ChangeEntity.channel.value}
+
+    result = SyncResult(cursor=encode_cursor(next_seq), has_more=has_more, full=False)
+    if contact_ids:
+        result.contacts = _active_contacts(db, user_id, list(contact_ids))
+        added = {c.contact_user_id for c in result.contacts}
+        result.removed_contacts = sorted(contact_ids - added)
+        # Новый контакт приходит целиком: профиль в contacts, все публичные каналы
+        result.channels = _public_channels(db, sorted(added))
+        profile_ids -= added | set(result.removed_contacts)
+
+    if profile_ids or channel_ids:
+        contact_user_ids = select(Contact.contact_user_id).where(
+            Contact.user_id == user_id, Contact.is_active == True  # noqa: E712
+        )
+
+    if profile_ids:
+        result.profiles = list(db.scalars(
+            select(User).where(User.id.in_(profile_ids), User.id.in_(contact_user_ids)).order_by(User.id)
+        ))
+        result.removed_contacts.extend(sorted(profile_ids - {u.id for u in result.profiles}))
+
+    if channel_ids:
+        sent = {ch.id for ch in result.channels}
+        changed = [
+            ch for ch in db.scalars(
+                select(Channel)
+                .where(Channel.id.in_(channel_ids - sent), Channel.user_id.in_(contact_user_ids))
+                .order_by(Channel.user_id, Channel.sort_order, Channel.id)
+            )
+            if ch.is_public
+        ]
+        result.channels.extend(load_group_ids(db, changed))
+        # Удаленные и ставшие приватными каналы — надгробия
+        result.removed_channels = sorted(channel_ids - sent - {ch.id for ch in changed})
+
+    return result
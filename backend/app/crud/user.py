@@ -3,6 +3,8 @@ from typing import Optional
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.crud.change_log import record_change, record_follower_changes
+from app.models.change_log import ChangeEntity, ChangeOp
 from app.models.user import User
 from app.core.security import get_password_hash, verify_password
 from app.schemas.auth import UserRegister, OAuthUserInfo
@@ -103,6 +105,7 @@ def update_user_avatar(db: Session, user_id: int, avatar_url: str) -> User:
         raise ValueError("User not found")
     
     user.avatar_url = avatar_url
+    record_change(db, user.id, ChangeEntity.profile, user.id)
     db.commit()
     db.refresh(user)
     return user
@@ -171,6 +174,7 @@ def update_user_profile(db: Session, user_id: int, profile_data: dict) -> User:
         user.display_name = profile_data['display_name']
     if 'bio' in profile_data:
         user.bio = profile_data['bio']
+    record_change(db, user.id, ChangeEntity.profile, user.id)
     
     db.commit()
     db.refresh(user)
@@ -183,6 +187,8 @@ def delete_user(db: Session, user_id: int) -> bool:
     if not user:
         return False
     
+    # Все, у кого пользователь в контактах, получат удаление контакта при синхронизации
+    record_follower_changes(db, user.id, ChangeOp.delete)
     db.delete(user)
     db.commit()
     return True
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Startup check of the database schema against the Alembic migrations.
+
+Runs once per container (in the gunicorn master), not once per worker.
+With ``DB_MIGRATIONS=upgrade`` pending migrations are applied under a
+PostgreSQL advisory lock, so replicas starting together migrate only once.
+"""
+import logging
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Произвольный, но постоянный ключ advisory lock для миграций
+MIGRATION_LOCK_ID = 7_431_202_001
+
+
+class PendingMigrationsError(RuntimeError):
+    """Raised when the database is behind the code and may not be upgraded here."""
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    # Не перенастраиваем логирование уже работающего процесса (см. migrations/env.py)
+    config.attributes["configure_logger"] = False
+    config.set_main_option("script_location", str(BACKEND_DIR / "migrations"))
+    return config
+
+
+def pending_migrations(engine: Engine) -> tuple[set[str], set[str]]:
+    """
+    Compare applied revisions with the migration heads.
+
+    Returns:
+        tuple[set[str], set[str]]: (current revisions, head revisions)
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(_alembic_config()).get_heads())
+    with engine.connect() as conn:
+        current = set(MigrationContext.configure(conn).get_current_heads())
+    return current, heads
+
+
+def check_migrations(engine: Engine, mode: Optional[str] = None) -> None:
+    """
+    Ensure the schema is at the migration head.
+
+    Args:
+        engine: Database to check
+        mode: "check" fails on pending migrations, "upgrade" applies them,
+            "off" skips the check; defaults to ``settings.DB_MIGRATIONS``
+
+    Raises:
+        PendingMigrationsError: in "check" mode when the database is behind
+    """
+    mode = mode or settings.DB_MIGRATIONS
+    if mode == "off":
+        return
+
+    current, heads = pending_migrations(engine)
+    if current == heads:
+        logger.info(f"Database schema is up to date ({', '.join(sorted(heads))})")
+        return
+    if mode != "upgrade":
+        raise PendingMigrationsError(
+            f"Database is at {sorted(current) or 'an empty schema'}, migrations head is {sorted(heads)}; "
+            "run `alembic upgrade head` or start with DB_MIGRATIONS=upgrade"
+        )
+
+    from alembic import command
+
+    with engine.connect() as conn:
+        locked = engine.dialect.name == "postgresql"
+        if locked:
+            conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            # Пока ждали блокировку, миграции мог применить другой экземпляр
+            if pending_migrations(engine)[0] != heads:
+                logger.info(f"Upgrading database schema to {sorted(heads)}")
+                command.upgrade(_alembic_config(), "head")
+        finally:
+            if locked:
+                conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+                conn.commit()
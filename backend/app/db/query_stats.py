@@ -0,0 +1,131 @@
+"""
+Per-request SQL instrumentation.
+
+Engine events count statements and DB time into a context variable scoped
+to the current request, log slow statements with the *shape* of their bound
+parameters (types, never values), and detect N+1 patterns: the same
+statement template executed more than ``SQL_N_PLUS_ONE_THRESHOLD`` times
+in one request warns or raises depending on ``SQL_N_PLUS_ONE_MODE``.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.interfaces import ExecuteStyle
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class NPlusOneError(Exception):
+    """Raised in ``raise`` mode when a statement repeats too often within one request."""
+
+
+@dataclass
+class QueryStats:
+    label: str = ""
+    count: int = 0
+    duration: float = 0.0  # seconds
+    templates: Counter = field(default_factory=Counter)
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """Stats of the request being served, or None outside a tracked scope."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(label: str = "") -> Iterator[QueryStats]:
+    """Collect statistics for all statements executed inside the block."""
+    stats = QueryStats(label=label)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def param_shape(parameters: Any, executemany: bool = False) -> str:
+    """Describe bound parameters by type only, so logs never contain user data."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = param_shape(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - getattr(context, "_query_start", time.perf_counter())
+
+    if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s | params: %s",
+            elapsed * 1000, " ".join(statement.split()), param_shape(parameters, executemany),
+        )
+
+    stats = _current_stats.get()
+    if stats is None:
+        return
+
+    stats.count += 1
+    stats.duration += elapsed
+    # Пакеты insertmanyvalues — один вызов execute() приложения, разбитый SQLAlchemy
+    # (на SQLite INSERT ... RETURNING в порядке параметров идет по строке), а не N+1
+    if getattr(context, "execute_style", None) is ExecuteStyle.INSERTMANYVALUES:
+        return
+    stats.templates[statement] += 1
+
+    mode = settings.SQL_N_PLUS_ONE_MODE
+    threshold = settings.SQL_N_PLUS_ONE_THRESHOLD
+    # Сообщаем один раз — в момент превышения порога
+    if mode != "off" and stats.templates[statement] == threshold + 1:
+        message = (
+            f"Possible N+1 in {stats.label or 'request'}: statement executed more than "
+            f"{threshold} times: {' '.join(statement.split())}"
+        )
+        if mode == "raise":
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Register the instrumentation on an engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware opening a query-tracking scope per HTTP request."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope['method']} {scope['path']}") as stats:
+            await self.app(scope, receive, send)
+        if stats.count:
+            logger.debug(
+                "%s: %d queries, %.1f ms in DB", stats.label, stats.count, stats.duration * 1000
+            )
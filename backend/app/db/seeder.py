@@ -0,0 +1,352 @@
+"""
+Bulk generator of realistic users, channels, groups and contacts.
+
+    python -m app.db.seeder --scale 0.01      # 10k users
+    python -m app.db.seeder --scale 1         # 1M users, ~10M channels, ~20M contacts
+
+Rows bypass the ORM: ids are assigned up front so links can be generated
+without reading anything back, every user shares one precomputed password
+hash, and rows are streamed with COPY on PostgreSQL and ``executemany`` on
+SQLite. Seeded users are ``seed_user_<n>`` / ``seed<n>@<SEED_EMAIL_DOMAIN>``
+with the password ``SEED_PASSWORD``; a new run replaces them.
+"""
+import argparse
+import csv
+import io
+import logging
+import math
+import random
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Engine
+
+from app.models.channel import Channel, ChannelType
+from app.models.channel_groups import channel_groups
+from app.models.contact import Contact
+from app.models.group import Group
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+SEED_PASSWORD = "seed-password"
+SEED_EMAIL_DOMAIN = "seed.example"
+
+# Масштаб 1.0 — миллион пользователей
+BASE_USERS = 1_000_000
+BATCH_USERS = 10_000
+
+# Относительная частота типов каналов
+CHANNEL_TYPE_WEIGHTS = {
+    ChannelType.email: 20,
+    ChannelType.phone: 20,
+    ChannelType.telegram: 15,
+    ChannelType.whatsapp: 10,
+    ChannelType.instagram: 8,
+    ChannelType.linkedin: 6,
+    ChannelType.twitter: 5,
+    ChannelType.signal: 4,
+    ChannelType.facebook: 4,
+    ChannelType.website: 4,
+    ChannelType.github: 3,
+    ChannelType.custom: 1,
+}
+CHANNEL_LABELS = [None, None, None, "Личный", "Рабочий", "Основной"]
+GROUP_NAMES = ["Family", "Friends", "Work", "Clients", "Close", "Gaming", "Travel", "Neighbours"]
+
+USER_COLUMNS = ("id", "email", "username", "password_hash", "display_name", "first_name", "last_name", "created_at", "updated_at")
+GROUP_COLUMNS = ("id", "name", "description", "user_id", "sort_order", "created_at", "updated_at")
+CHANNEL_COLUMNS = ("id", "user_id", "type", "label", "value", "is_public", "is_primary", "sort_order", "created_at", "updated_at")
+LINK_COLUMNS = ("channel_id", "group_id")
+CONTACT_COLUMNS = ("id", "user_id", "contact_user_id", "created_at", "is_active")
+
+FIRST_NAMES = ["Anna", "Ivan", "Maria", "Alex", "Olga", "Dmitry", "Elena", "Sergey", "Kate", "Max"]
+LAST_NAMES = ["Smirnov", "Ivanova", "Petrov", "Sokolova", "Popov", "Lebedeva", "Kozlov", "Novikova"]
+
+
+def seed_username(n: int) -> str:
+    return f"seed_user_{n}"
+
+
+def seed_email(n: int) -> str:
+    return f"seed{n}@{SEED_EMAIL_DOMAIN}"
+
+
+@dataclass
+class SeedPlan:
+    """Dataset shape; per-user counts are means of skewed distributions."""
+
+    users: int
+    channels_per_user: float = 10.0
+    groups_per_user: float = 2.5
+    contacts_per_user: float = 20.0
+    seed: int = 42
+
+    @classmethod
+    def from_scale(cls, scale: float, **overrides) -> "SeedPlan":
+        return cls(users=max(int(BASE_USERS * scale), 2), **overrides)
+
+
+@dataclass
+class IdStart:
+    user: int
+    group: int
+    channel: int
+    contact: int
+
+
+def _channel_value(channel_type: ChannelType, n: int, index: int, rng: random.Random) -> str:
+    handle = f"{seed_username(n)}{index or ''}"
+    if channel_type == ChannelType.email:
+        return f"{handle}@mail.{SEED_EMAIL_DOMAIN}"
+    if channel_type in (ChannelType.phone, ChannelType.whatsapp, ChannelType.signal):
+        return f"+7{rng.randrange(10**9, 10**10)}"
+    if channel_type == ChannelType.website:
+        return f"https://{handle}.{SEED_EMAIL_DOMAIN}"
+    if channel_type == ChannelType.custom:
+        return f"matrix:@{handle}:{SEED_EMAIL_DOMAIN}"
+    return f"@{handle}"
+
+
+def _skewed_count(rng: random.Random, mean: float, cap: int) -> int:
+    """Log-normal count with the given mean: most users have a few, some have many."""
+    if mean <= 0 or cap <= 0:
+        return 0
+    sigma = 1.0
+    value = rng.lognormvariate(math.log(mean) - sigma**2 / 2, sigma)
+    return min(int(round(value)), cap)
+
+
+def user_rows(plan: SeedPlan, ids: IdStart, password_hash: str, now: datetime) -> Iterator[tuple]:
+    rng = random.Random(plan.seed)
+    for n in range(1, plan.users + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        created = now - timedelta(minutes=rng.randrange(525_600))
+        yield (
+            ids.user + n - 1, seed_email(n), seed_username(n), password_hash,
+            f"{first} {last}", first, last, created, created,
+        )
+
+
+def batch_rows(plan: SeedPlan, ids: IdStart, first_n: int, last_n: int, now: datetime) -> dict[str, list[tuple]]:
+    """Groups, channels, channel-group links and contacts of users ``first_n..last_n``."""
+    rng = random.Random(plan.seed * 1_000_003 + first_n)
+    types = list(CHANNEL_TYPE_WEIGHTS)
+    weights = list(CHANNEL_TYPE_WEIGHTS.values())
+    rows = {"groups": [], "channels": [], "channel_groups": [], "contacts": []}
+
+    # Заранее известные id: на батч отводится диапазон, поэтому батчи независимы
+    group_id = ids.group + (first_n - 1) * len(GROUP_NAMES)
+    channel_id = ids.channel + (first_n - 1) * int(plan.channels_per_user * 8)
+    contact_id = ids.contact + (first_n - 1) * int(plan.contacts_per_user * 8)
+
+    for n in range(first_n, last_n + 1):
+        user_id = ids.user + n - 1
+
+        user_groups = []
+        for order, name in enumerate(rng.sample(GROUP_NAMES, _skewed_count(rng, plan.groups_per_user, len(GROUP_NAMES)))):
+            rows["groups"].append((group_id, name, None, user_id, order, now, now))
+            user_groups.append(group_id)
+            group_id += 1
+
+        channel_count = max(_skewed_count(rng, plan.channels_per_user, int(plan.channels_per_user * 8)), 1)
+        for order, channel_type in enumerate(rng.choices(types, weights, k=channel_count)):
+            rows["channels"].append((
+                channel_id, user_id, channel_type.value, rng.choice(CHANNEL_LABELS),
+                _channel_value(channel_type, n, order, rng), rng.random() < 0.7, order == 0, order, now, now,
+            ))
+            if user_groups and rng.random() < 0.6:
+                for group in rng.sample(user_groups, min(len(user_groups), rng.choice((1, 1, 1, 2)))):
+                    rows["channel_groups"].append((channel_id, group))
+            channel_id += 1
+
+        # Популярные пользователи (малые номера) попадают в контакты чаще
+        contact_count = _skewed_count(rng, plan.contacts_per_user, min(int(plan.contacts_per_user * 8), plan.users - 1))
+        targets = set()
+        while len(targets) < contact_count:
+            target = 1 + int(plan.users * rng.random() ** 2)
+            if target != n:
+                targets.add(target)
+        for target in targets:
+            rows["contacts"].append((contact_id, user_id, ids.user + target - 1, now, True))
+            contact_id += 1
+
+    return rows
+
+
+class RowWriter:
+    """Writes row tuples with the fastest bulk path the database driver offers."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.connection = engine.raw_connection()
+
+    def write(self, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+        cursor = self.connection.cursor()
+        try:
+            if self.dialect == "postgresql":
+                return self._copy(cursor, table, columns, rows)
+            return self._executemany(cursor, table, columns, rows)
+        finally:
+            cursor.close()
+
+    def _copy(self, cursor, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+        statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+        count = 0
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+            return count
+
+        # psycopg2: CSV в памяти кусками
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        buffer.seek(0)
+        cursor.copy_expert(f"{statement} WITH (FORMAT csv)", buffer)
+        return count
+
+    def _executemany(self, cursor, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+        placeholders = ", ".join("?" if self.dialect == "sqlite" else "%s" for _ in columns)
+        rows = [tuple(_sqlite_value(v) for v in row) for row in rows] if self.dialect == "sqlite" else list(rows)
+        cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    def commit(self) -> None:
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def _sqlite_value(value):
+    # Тот же формат, в котором SQLAlchemy хранит DateTime в SQLite
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    return value
+
+
+def clear_seeded(engine: Engine) -> None:
+    """Remove users created by a previous run and everything they own."""
+    seeded = select(User.id).where(User.email.like(f"%@{SEED_EMAIL_DOMAIN}"))
+    seeded_channels = select(Channel.id).where(Channel.user_id.in_(seeded))
+    with engine.begin() as conn:
+        conn.execute(delete(channel_groups).where(channel_groups.c.channel_id.in_(seeded_channels)))
+        conn.execute(delete(Contact).where(Contact.user_id.in_(seeded) | Contact.contact_user_id.in_(seeded)))
+        conn.execute(delete(Channel).where(Channel.user_id.in_(seeded)))
+        conn.execute(delete(Group).where(Group.user_id.in_(seeded)))
+        conn.execute(delete(User).where(User.id.in_(seeded)))
+
+
+def _next_ids(engine: Engine) -> IdStart:
+    with engine.connect() as conn:
+        def next_id(model) -> int:
+            return (conn.scalar(select(func.max(model.id))) or 0) + 1
+
+        return IdStart(next_id(User), next_id(Group), next_id(Channel), next_id(Contact))
+
+
+def _reset_sequences(engine: Engine) -> None:
+    # После вставки с явными id последовательности PostgreSQL нужно сдвинуть вручную
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in ("users", "groups", "channels", "contacts"):
+            conn.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+            )
+
+
+def seed(engine: Engine, plan: SeedPlan, password_hash: Optional[str] = None) -> dict:
+    """
+    Replace previously seeded data with a dataset of the given plan.
+
+    Args:
+        engine: Target database
+        plan: Dataset shape
+        password_hash: Hash shared by all users; computed once from SEED_PASSWORD if omitted
+
+    Returns:
+        dict: Plan, inserted row counts and elapsed seconds
+    """
+    if password_hash is None:
+        from app.core.security import get_password_hash
+
+        password_hash = get_password_hash(SEED_PASSWORD)
+
+    start = time.perf_counter()
+    clear_seeded(engine)
+    ids = _next_ids(engine)
+    now = datetime.utcnow()
+    counts = dict.fromkeys(("users", "groups", "channels", "channel_groups", "contacts"), 0)
+
+    writer = RowWriter(engine)
+    try:
+        if writer.dialect == "sqlite":
+            writer.connection.execute("PRAGMA synchronous = OFF")
+
+        # Сначала все пользователи, чтобы контакты могли ссылаться на любого из них
+        counts["users"] = writer.write("users", USER_COLUMNS, user_rows(plan, ids, password_hash, now))
+        writer.commit()
+
+        for first_n in range(1, plan.users + 1, BATCH_USERS):
+            last_n = min(first_n + BATCH_USERS - 1, plan.users)
+            rows = batch_rows(plan, ids, first_n, last_n, now)
+            counts["groups"] += writer.write("groups", GROUP_COLUMNS, rows["groups"])
+            counts["channels"] += writer.write("channels", CHANNEL_COLUMNS, rows["channels"])
+            counts["channel_groups"] += writer.write("channel_groups", LINK_COLUMNS, rows["channel_groups"])
+            counts["contacts"] += writer.write("contacts", CONTACT_COLUMNS, rows["contacts"])
+            writer.commit()
+            elapsed = time.perf_counter() - start
+            logger.info(f"Seeded {last_n}/{plan.users} users ({sum(counts.values()) / elapsed:,.0f} rows/s)")
+    finally:
+        writer.close()
+
+    _reset_sequences(engine)
+    return {"plan": asdict(plan), "rows": counts, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generate a realistic dataset in DATABASE_URL")
+    parser.add_argument("--scale", type=float, default=0.001, help=f"Fraction of {BASE_USERS:,} users")
+    parser.add_argument("--users", type=int, help="Exact number of users (overrides --scale)")
+    parser.add_argument("--channels-per-user", type=float, default=10.0)
+    parser.add_argument("--groups-per-user", type=float, default=2.5)
+    parser.add_argument("--contacts-per-user", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser
+
+
+def plan_from_args(args: argparse.Namespace) -> SeedPlan:
+    options = dict(
+        channels_per_user=args.channels_per_user,
+        groups_per_user=args.groups_per_user,
+        contacts_per_user=args.contacts_per_user,
+        seed=args.seed,
+    )
+    if args.users is not None:
+        return SeedPlan(users=args.users, **options)
+    return SeedPlan.from_scale(args.scale, **options)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    from app.db.session import engine
+
+    result = seed(engine, plan_from_args(args))
+    logger.info(f"Done: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
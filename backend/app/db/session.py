@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.query_stats import install_query_hooks
 
 # Для SQLite нужен connect_args с check_same_thread=False
 if settings.DATABASE_URL.startswith("sqlite"):
@@ -11,4 +12,7 @@ if settings.DATABASE_URL.startswith("sqlite"):
 else:
     engine = create_engine(settings.DATABASE_URL)
 
+# Счетчики запросов на каждый HTTP-запрос, лог медленных запросов и детектор N+1
+install_query_hooks(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,11 +1,24 @@
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response
 from starlette.middleware.sessions import SessionMiddleware
-import os
+from contextlib import asynccontextmanager
+from pathlib import Path
 
 from app.core.config import settings
+from app.core import metrics
+from app.core.events import event_hub
+from app.core.http_client import close_http_clients
+from app.core.profiling import ProfilingMiddleware
+from app.core.static import AvatarStaticFiles
+from app.core.storage import close_storage
+from app.core.timing import ServerTimingMiddleware, TimedJSONResponse
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.crud import avatar_job as crud_avatar_job
+from app.db.query_stats import QueryStatsMiddleware
+from app.db.session import SessionLocal, engine
+from app.workers import avatar as avatar_worker
+from app.workers import maintenance
 from app.api.routes import auth as auth_routes
 from app.api.routes import channels as channels_routes
 from app.api.routes import public as public_routes
@@ -13,45 +26,111 @@ from app.api.routes import contacts as contacts_routes
 from app.api.routes import oauth as oauth_routes
 from app.api.routes import groups as groups_routes
 from app.api.routes import recovery as recovery_routes
+from app.api.routes import storage as storage_routes
+from app.api.routes import me as me_routes
+from app.api.routes import events as events_routes
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version="0.1.0",
-    description="MVP: Living Contact Book / DNS for People",
-)
-
-# Раздача статических файлов (аватары)
-uploads_dir = os.path.join(os.path.dirname(__file__), "..", "uploads")
-if not os.path.exists(uploads_dir):
-    os.makedirs(uploads_dir, exist_ok=True)
-
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
-
-# Session middleware для OAuth
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
-
-# CORS — для локальной разработки с Next.js и для продакшена через .env
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.CORS_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Системный эндпоинт
-@app.get("/health", summary="Health check", tags=["_service"])
-def health() -> JSONResponse:
-    return JSONResponse({"status": "ok", "service": "oneid", "version": "0.1.0"})
-
-# API v1 роутер
-api_router = APIRouter(prefix=settings.API_V1_PREFIX)
-api_router.include_router(auth_routes.router)
-api_router.include_router(channels_routes.router)
-api_router.include_router(public_routes.router)
-api_router.include_router(contacts_routes.router, prefix="/contacts", tags=["contacts"])
-api_router.include_router(oauth_routes.router)
-api_router.include_router(groups_routes.router, prefix="/groups", tags=["groups"])
-api_router.include_router(recovery_routes.router)
-
-app.include_router(api_router)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In-process воркеры обработки аватаров (0 — только отдельные процессы воркеров)
+    workers_stop, workers = avatar_worker.start_in_process_workers(settings.AVATAR_WORKER_CONCURRENCY)
+    # Доставка уведомлений об изменениях в SSE-потоки этого процесса
+    await event_hub.start()
+    # Очистка журнала изменений старше срока хранения курсоров синхронизации
+    maintenance_stop, maintenance_tasks = maintenance.start_maintenance()
+    yield
+    await maintenance.stop_maintenance(maintenance_stop, maintenance_tasks)
+    await event_hub.stop()
+    await avatar_worker.stop_in_process_workers(workers_stop, workers)
+    # Закрываем пул соединений к хранилищу
+    await close_storage()
+    await close_http_clients()
+    shutdown_tracing()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application.
+
+    Heavy subsystems (Pillow, python-magic, authlib, httpx, storage clients)
+    are imported on first use, so building the app stays cheap and can run
+    in a preloading master process before workers fork.
+    """
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version="0.1.0",
+        description="MVP: Living Contact Book / DNS for People",
+        lifespan=lifespan,
+        default_response_class=TimedJSONResponse,
+    )
+
+    # Раздача статических файлов (аватары); без каталога до первой загрузки StaticFiles отвечал бы 500
+    Path(settings.LOCAL_STORAGE_DIR).mkdir(parents=True, exist_ok=True)
+    app.mount("/uploads", AvatarStaticFiles(directory=settings.LOCAL_STORAGE_DIR), name="uploads")
+
+    # Session middleware для OAuth
+    app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+
+    # CORS — для локальной разработки с Next.js и для продакшена через .env
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Server-Timing: должен быть внутри QueryStatsMiddleware, чтобы видеть статистику SQL
+    if settings.SERVER_TIMING_ENABLED:
+        app.add_middleware(ServerTimingMiddleware)
+
+    # Статистика SQL-запросов на каждый HTTP-запрос
+    app.add_middleware(QueryStatsMiddleware)
+
+    # Сэмплирующий профилировщик запросов (выключен по умолчанию)
+    if settings.PROFILING_ENABLED:
+        app.add_middleware(ProfilingMiddleware)
+
+    # Метрики Prometheus (снаружи остальных middleware, чтобы учитывать полное время ответа)
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(engine)
+        app.add_middleware(metrics.PrometheusMiddleware)
+
+    # Трейсинг (роуты, SQL, исходящие httpx-запросы)
+    setup_tracing(app, engine)
+
+    # Системный эндпоинт
+    @app.get("/health", summary="Health check", tags=["_service"])
+    def health() -> JSONResponse:
+        return JSONResponse({"status": "ok", "service": "oneid", "version": "0.1.0"})
+
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", summary="Prometheus metrics", tags=["_service"], include_in_schema=False)
+        def prometheus_metrics() -> Response:
+            try:
+                with SessionLocal() as db:
+                    metrics.AVATAR_JOBS_QUEUED.set(crud_avatar_job.count_queued(db))
+            except Exception:
+                pass  # метрики приложения важнее, чем глубина очереди
+            return metrics.metrics_response()
+
+    # API v1 роутер
+    api_router = APIRouter(prefix=settings.API_V1_PREFIX)
+    api_router.include_router(auth_routes.router)
+    api_router.include_router(channels_routes.router)
+    api_router.include_router(public_routes.router)
+    api_router.include_router(contacts_routes.router, prefix="/contacts", tags=["contacts"])
+    api_router.include_router(oauth_routes.router)
+    api_router.include_router(groups_routes.router, prefix="/groups", tags=["groups"])
+    api_router.include_router(recovery_routes.router)
+    api_router.include_router(storage_routes.router)
+    api_router.include_router(me_routes.router)
+    api_router.include_router(events_routes.router)
+
+    app.include_router(api_router)
+    return app
+
+
+# Для `uvicorn app.main:app`; `uvicorn --factory app.main:create_app` строит приложение заново
+app = create_app()
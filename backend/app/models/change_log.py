@@ -0,0 +1,39 @@
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import BigInteger, String, Integer, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class ChangeEntity(str, Enum):
+    contact = "contact"  # user_id — владелец записной книжки, entity_id — пользователь-контакт
+    profile = "profile"  # user_id = entity_id — пользователь, чей профиль изменился
+    channel = "channel"  # user_id — владелец канала
+
+
+class ChangeOp(str, Enum):
+    upsert = "upsert"
+    delete = "delete"
+
+
+class ChangeLog(Base):
+    """
+    Append-only log of changes that contact book clients sync from.
+
+    ``seq`` is the monotonic change sequence; rows only say *what* changed,
+    the current state is read at sync time.
+    """
+
+    __tablename__ = "change_log"
+
+    seq: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # Без внешнего ключа: записи об удалении переживают удаленные строки
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    entity: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(10), default=ChangeOp.upsert.value, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True, nullable=False)
+
+    __table_args__ = (
+        Index("ix_change_log_user_id_seq", "user_id", "seq"),
+    )
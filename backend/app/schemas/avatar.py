@@ -0,0 +1,31 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class AvatarUploadRequest(BaseModel):
+    content_type: str = Field(description="MIME type of the image that will be uploaded")
+
+
+class AvatarUploadTicket(BaseModel):
+    key: str
+    upload_url: str
+    method: str
+    headers: dict[str, str]
+    expires_in: int
+    max_size: int
+
+
+class AvatarFinalizeRequest(BaseModel):
+    key: str
+
+
+class AvatarJob(BaseModel):
+    id: str
+    status: str
+    avatar_url: str | None = None
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
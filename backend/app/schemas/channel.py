@@ -1,6 +1,9 @@
 from datetime import datetime
+from typing import Annotated, Literal, Union
 from pydantic import BaseModel, Field
 
+from app.schemas.ordering import MoveRequest
+
 
 class ChannelBase(BaseModel):
     type: str = Field(description="Тип канала (phone, email, telegram, ...)")
@@ -41,3 +44,36 @@ class ChannelPublic(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ChannelBatchCreate(ChannelCreate):
+    op: Literal["create"]
+
+
+class ChannelBatchUpdate(ChannelUpdate):
+    op: Literal["update"]
+    id: int
+
+
+class ChannelBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+
+class ChannelBatchMove(MoveRequest):
+    op: Literal["move"]
+    id: int
+
+
+ChannelBatchOperation = Annotated[
+    Union[ChannelBatchCreate, ChannelBatchUpdate, ChannelBatchDelete, ChannelBatchMove],
+    Field(discriminator="op"),
+]
+
+
+class ChannelBatch(BaseModel):
+    operations: list[ChannelBatchOperation] = Field(description="Операции над каналами, применяются в одной транзакции")
+
+
+class ChannelGroups(BaseModel):
+    group_ids: list[int] = Field(description="Полный список групп канала")
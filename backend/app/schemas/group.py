@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+from app.schemas.channel import ChannelPublic
+
 
 class GroupBase(BaseModel):
     name: str
@@ -30,7 +32,16 @@ class Group(GroupBase):
 
 
 class GroupWithChannels(Group):
-    channels: list = []
+    channels: list[ChannelPublic] = []
 
     class Config:
         from_attributes = True
+
+
+class GroupTree(BaseModel):
+    groups: list[GroupWithChannels]
+    ungrouped: list[ChannelPublic] = []
+
+
+class GroupChannels(BaseModel):
+    channel_ids: list[int]
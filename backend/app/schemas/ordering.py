@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+
+class MoveRequest(BaseModel):
+    after_id: int | None = Field(default=None, description="Поставить элемент сразу после этого; null — в начало списка")
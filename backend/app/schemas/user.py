@@ -30,3 +30,7 @@ class UserPublic(BaseModel):
 
     class Config:
         from_attributes = True  # pydantic v2: поддержка ORM-объектов
+
+
+class PublicProfilesRequest(BaseModel):
+    usernames: list[str] = Field(description="Username пользователей, чьи публичные профили нужны")
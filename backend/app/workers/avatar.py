@@ -0,0 +1,209 @@
+"""
+Avatar processing worker.
+
+Uploads only store the original and queue an ``AvatarJob``; this worker
+validates the original, derives the avatar and swaps ``avatar_url``.
+
+Run dedicated worker processes with ``python -m app.workers.avatar``. The API
+process starts ``AVATAR_WORKER_CONCURRENCY`` in-process workers from its
+lifespan hook (0 by default; set it where no dedicated worker is deployed).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import tempfile
+import time
+from datetime import timedelta
+from typing import Optional
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.image_utils import MAX_FILE_SIZE, check_upload, cleanup_temp_file, process_avatar_image
+from app.core.storage import StorageError, delete_by_url, get_storage, guess_content_type
+from app.core.tracing import setup_tracing, shutdown_tracing, tracer
+from app.crud import avatar_job as crud_avatar_job
+from app.crud import user as crud_user
+from app.db.session import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Будит in-process воркеры сразу после постановки задачи, не дожидаясь опроса
+_wakeup: Optional[asyncio.Event] = None
+
+
+def notify() -> None:
+    """Wake up in-process workers after a job was queued from this process."""
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def _claim() -> Optional[tuple[str, int, str, int]]:
+    with SessionLocal() as db:
+        job = crud_avatar_job.claim_next_job(db)
+        if job is None:
+            return None
+        return job.id, job.user_id, job.source_key, job.attempts
+
+
+def _finish(job_id: str, attempt: int, avatar_url: str) -> bool:
+    """Record the avatar; False if the job was requeued meanwhile and the result is dropped."""
+    with SessionLocal() as db:
+        job = crud_avatar_job.get_claimed_job(db, job_id, attempt)
+        if job is None:
+            return False
+        crud_avatar_job.mark_done(db, job, avatar_url)
+        return True
+
+
+def _avatar_in_use(user_id: int, avatar_url: str) -> bool:
+    with SessionLocal() as db:
+        user = crud_user.get(db, user_id)
+        return user is not None and user.avatar_url == avatar_url
+
+
+def _fail(job_id: str, attempt: int, error: str) -> bool:
+    """Mark the job failed; False if the job was requeued meanwhile."""
+    with SessionLocal() as db:
+        job = crud_avatar_job.get_claimed_job(db, job_id, attempt)
+        if job is None:
+            return False
+        crud_avatar_job.mark_failed(db, job, error)
+        return True
+
+
+def _requeue_stale() -> int:
+    with SessionLocal() as db:
+        return crud_avatar_job.requeue_stale_jobs(
+            db,
+            older_than=timedelta(seconds=settings.AVATAR_JOB_TIMEOUT),
+            max_attempts=settings.AVATAR_JOB_MAX_ATTEMPTS,
+        )
+
+
+async def process_job(job_id: str, user_id: int, source_key: str, attempt: int) -> None:
+    """
+    Derive the avatar for one claimed job and record the outcome.
+
+    The original is deleted only after the outcome is committed under this
+    claim. A cancelled job, or one requeued after ``AVATAR_JOB_TIMEOUT`` while
+    still running, keeps its original for the retry.
+    """
+    storage = get_storage()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(source_key)[1]) as temp_file:
+        pass
+
+    metrics.AVATAR_JOBS_IN_PROGRESS.inc()
+    start = time.perf_counter()
+    outcome = "failed"
+    recorded = False
+    avatar_url = None
+    try:
+        await storage.download(source_key, temp_file.name, MAX_FILE_SIZE)
+        safe = await asyncio.to_thread(check_upload, temp_file.name, guess_content_type(source_key))
+        if not safe:
+            raise ValueError("Invalid or unsafe image file")
+
+        # Полная проверка изображения происходит при том же декодировании, что строит аватар
+        _, avatar_url = await process_avatar_image(temp_file.name, user_id)
+        recorded = await asyncio.to_thread(_finish, job_id, attempt, avatar_url)
+        outcome = "done"
+        logger.info(f"Avatar job {job_id} done: {avatar_url}")
+    except (StorageError, ValueError) as e:
+        logger.warning(f"Avatar job {job_id} failed: {e}")
+        recorded = await asyncio.to_thread(_fail, job_id, attempt, str(e))
+    except Exception as e:
+        logger.exception(f"Avatar job {job_id} crashed")
+        recorded = await asyncio.to_thread(_fail, job_id, attempt, f"Failed to process image: {e}")
+    finally:
+        metrics.AVATAR_JOBS_IN_PROGRESS.dec()
+        metrics.AVATAR_JOB_DURATION.labels(outcome).observe(time.perf_counter() - start)
+        cleanup_temp_file(temp_file.name)
+
+    if recorded:
+        # Оригинал нужен повторной попытке, пока результат не зафиксирован этой попыткой
+        await storage.delete(source_key)
+        return
+    logger.warning(f"Avatar job {job_id} was requeued while processing; result of attempt {attempt} dropped")
+    # Имена файлов аватаров зависят от содержимого: та же картинка могла уже стать аватаром другой попытки
+    if avatar_url and not await asyncio.to_thread(_avatar_in_use, user_id, avatar_url):
+        await delete_by_url(avatar_url)
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    """Claim and process jobs until ``stop`` is set."""
+    poll_interval = settings.AVATAR_JOB_POLL_INTERVAL
+    last_requeue = 0.0
+
+    while not stop.is_set():
+        try:
+            if time.monotonic() - last_requeue > settings.AVATAR_JOB_TIMEOUT / 2:
+                last_requeue = time.monotonic()
+                if requeued := await asyncio.to_thread(_requeue_stale):
+                    logger.warning(f"Requeued {requeued} stale avatar jobs")
+
+            claimed = await asyncio.to_thread(_claim)
+        except Exception:
+            logger.exception("Failed to poll avatar job queue")
+            claimed = None
+
+        if claimed is not None:
+            # Задание — корень собственного трейса, в который попадают SQL, хранилище и декодирование
+            with tracer.start_as_current_span("avatar.job", attributes={"avatar.job_id": claimed[0]}):
+                await process_job(*claimed)
+            continue
+
+        # Очередь пуста — ждем уведомления или следующего опроса
+        waiters = [asyncio.ensure_future(stop.wait())]
+        if _wakeup is not None:
+            waiters.append(asyncio.ensure_future(_wakeup.wait()))
+        await asyncio.wait(waiters, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in waiters:
+            waiter.cancel()
+        if _wakeup is not None:
+            _wakeup.clear()
+
+
+def start_in_process_workers(concurrency: int) -> tuple[asyncio.Event, list[asyncio.Task]]:
+    """Start background worker tasks on the running event loop."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(run_worker(stop)) for _ in range(concurrency)]
+    return stop, tasks
+
+
+async def stop_in_process_workers(stop: asyncio.Event, tasks: list[asyncio.Task]) -> None:
+    """Let workers finish their current job and exit."""
+    global _wakeup
+    stop.set()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    _wakeup = None
+
+
+async def _main(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    setup_tracing(engine=engine)
+    logger.info(f"Avatar worker started with concurrency {concurrency}")
+    await asyncio.gather(*(run_worker(stop) for _ in range(concurrency)))
+    shutdown_tracing()
+    logger.info("Avatar worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process queued avatar jobs")
+    parser.add_argument("--concurrency", type=int, default=max(settings.AVATAR_WORKER_CONCURRENCY, 1))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_main(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Periodic housekeeping.
+
+Prunes the change log behind contact sync: rows older than
+``SYNC_RETENTION_DAYS`` can no longer be requested (older cursors get 410),
+so they are deleted every ``SYNC_PRUNE_INTERVAL`` seconds.
+
+The API process runs the loop from its lifespan hook. Deletion is
+idempotent, so several workers pruning concurrently is harmless. Run it once
+by hand or from cron with ``python -m app.workers.maintenance --once``.
+"""
+import argparse
+import asyncio
+import logging
+import random
+from datetime import timedelta
+
+from app.core.config import settings
+from app.crud.change_log import prune_changes
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def prune_change_log() -> int:
+    """Delete change log rows past the sync retention window; returns the number deleted."""
+    with SessionLocal() as db:
+        return prune_changes(db, timedelta(days=settings.SYNC_RETENTION_DAYS))
+
+
+async def run_maintenance(stop: asyncio.Event) -> None:
+    """Prune periodically until ``stop`` is set."""
+    interval = settings.SYNC_PRUNE_INTERVAL
+    # Случайная первая задержка: воркеры, запущенные одновременно, не чистят журнал хором
+    delay = random.uniform(interval / 10, interval)
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=delay)
+            return
+        except asyncio.TimeoutError:
+            pass
+        delay = interval
+        try:
+            if deleted := await asyncio.to_thread(prune_change_log):
+                logger.info(f"Pruned {deleted} change log rows")
+        except Exception:
+            logger.exception("Failed to prune change log")
+
+
+def start_maintenance() -> tuple[asyncio.Event, list[asyncio.Task]]:
+    """Start the maintenance loop on the running event loop (no-op when disabled)."""
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(run_maintenance(stop))] if settings.SYNC_PRUNE_INTERVAL > 0 else []
+    return stop, tasks
+
+
+async def stop_maintenance(stop: asyncio.Event, tasks: list[asyncio.Task]) -> None:
+    stop.set()
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Periodic housekeeping")
+    parser.add_argument("--once", action="store_true", help="Prune once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.once:
+        logger.info(f"Pruned {prune_change_log()} change log rows")
+        return
+    if settings.SYNC_PRUNE_INTERVAL <= 0:
+        parser.error("SYNC_PRUNE_INTERVAL is 0; use --once")
+    asyncio.run(run_maintenance(asyncio.Event()))
+
+
+if __name__ == "__main__":
+    main()
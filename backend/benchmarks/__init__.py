@@ -0,0 +1,11 @@
+"""
+Load and benchmark suite for the API.
+
+    python -m benchmarks seed --scale 0.01        # same as python -m app.db.seeder
+    python -m benchmarks run --base-url http://localhost:8000 --users 10000
+    python -m benchmarks fakes --latency 0.08     # offline OAuth providers and Supabase
+    python -m benchmarks compare results/old.json results/new.json
+
+Results are JSON files tagged with the git commit, so runs of different
+commits on the same machine and dataset can be compared directly.
+"""
@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from benchmarks.runner import compare, environment, run
+from benchmarks.scenarios import DEFAULT_SCENARIOS, SCENARIOS
+
+# Не зависит от рабочего каталога, из которого запущен python -m benchmarks
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def cmd_seed(args) -> None:
+    from app.db import seeder
+
+    print(json.dumps(seeder.main(args.extra), indent=2))
+
+
+def cmd_run(args) -> None:
+    scenarios = args.scenario or DEFAULT_SCENARIOS
+    result = asyncio.run(
+        run(
+            args.base_url, scenarios, users=args.users, concurrency=args.concurrency,
+            duration=args.duration, warmup=args.warmup, logins=args.logins, seed=args.seed,
+        )
+    )
+    output = args.output
+    if output is None:
+        commit = (environment()["commit"] or "unknown")[:10]
+        output = RESULTS_DIR / f"{commit}-{result['environment']['started_at'][:19].replace(':', '')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2))
+
+    for name, scenario in result["scenarios"].items():
+        for op, stats in scenario["operations"].items():
+            print(
+                f"{name}/{op}: {stats['rps']} req/s  p50={stats['p50_ms']}ms "
+                f"p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms errors={stats['errors']}"
+            )
+    print(f"Results written to {output}")
+
+
+def cmd_fakes(args) -> None:
+    from benchmarks.fakes import FakeBehaviour, FakeConfig, FakeServer, fake_settings
+
+    config = FakeConfig(default=FakeBehaviour(args.latency, args.jitter, args.error_rate), seed=args.seed)
+    with FakeServer(args.host, args.port, config) as server:
+        print("Point the API at the fakes with:")
+        for name, value in fake_settings(server.url).items():
+            print(f"export {name}={value}")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+def cmd_compare(args) -> None:
+    old = json.loads(args.old.read_text())
+    new = json.loads(args.new.read_text())
+    print("\n".join(compare(old, new)))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="API load benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = sub.add_parser(
+        "seed", help="Seed the dataset into DATABASE_URL (arguments of python -m app.db.seeder)"
+    )
+    seed_parser.set_defaults(func=cmd_seed)
+
+    run_parser = sub.add_parser("run", help="Run scenarios against a running server")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    run_parser.add_argument("--users", type=int, default=1000, help="Number of seeded users")
+    run_parser.add_argument("--concurrency", type=int, default=10)
+    run_parser.add_argument("--duration", type=float, default=30.0)
+    run_parser.add_argument("--warmup", type=float, default=5.0)
+    run_parser.add_argument("--logins", type=int, default=50)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", type=Path)
+    run_parser.set_defaults(func=cmd_run)
+
+    fakes_parser = sub.add_parser("fakes", help="Serve fake OAuth providers and Supabase Storage")
+    fakes_parser.add_argument("--host", default="127.0.0.1")
+    fakes_parser.add_argument("--port", type=int, default=9100)
+    fakes_parser.add_argument("--latency", type=float, default=0.05, help="Added latency, seconds")
+    fakes_parser.add_argument("--jitter", type=float, default=0.02)
+    fakes_parser.add_argument("--error-rate", type=float, default=0.0)
+    fakes_parser.add_argument("--seed", type=int)
+    fakes_parser.set_defaults(func=cmd_fakes)
+
+    compare_parser = sub.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("old", type=Path)
+    compare_parser.add_argument("new", type=Path)
+    compare_parser.set_defaults(func=cmd_compare)
+
+    # Аргументы seed целиком передаются сидеру
+    args, args.extra = parser.parse_known_args(argv)
+    if args.extra and args.command != "seed":
+        parser.error(f"unrecognized arguments: {' '.join(args.extra)}")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
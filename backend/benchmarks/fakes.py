@@ -0,0 +1,273 @@
+"""
+In-process stand-ins for the OAuth providers and Supabase Storage.
+
+One Starlette app emulates, under path prefixes:
+
+- ``/google``, ``/github``, ``/discord``: consent (instant redirect back with
+  a code), token exchange and userinfo. The code ``<provider>-<n>`` always
+  maps to the same identity ``fake_user_<n>``, so repeated logins hit the
+  "existing user" path.
+- ``/supabase``: the Storage REST API used by ``SupabaseStorage`` (upload,
+  download, delete, signed upload URLs, public objects), kept in memory.
+
+Latency and error rates are configurable per prefix. Use the app directly
+through ``httpx.ASGITransport`` in tests, or run it on a port with
+``FakeServer`` / ``python -m benchmarks fakes`` and point the API at it with
+the settings from ``fake_settings()``.
+"""
+import asyncio
+import random
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urlencode
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, RedirectResponse, Response
+from starlette.routing import Route
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+PREFIXES = ("google", "github", "discord", "supabase")
+
+
+@dataclass
+class FakeBehaviour:
+    """How a fake responds: added latency (seconds, uniform in ±jitter) and share of 503 errors."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+
+
+@dataclass
+class FakeConfig:
+    default: FakeBehaviour = field(default_factory=FakeBehaviour)
+    per_prefix: dict[str, FakeBehaviour] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+    def for_path(self, path: str) -> FakeBehaviour:
+        prefix = path.lstrip("/").split("/", 1)[0]
+        return self.per_prefix.get(prefix, self.default)
+
+
+def fake_settings(base_url: str) -> dict[str, str]:
+    """Settings (environment variables) pointing the API at fakes served from ``base_url``."""
+    base = base_url.rstrip("/")
+    return {
+        "GOOGLE_ACCOUNTS_URL": f"{base}/google",
+        "GOOGLE_TOKEN_URL": f"{base}/google/token",
+        "GOOGLE_API_URL": f"{base}/google",
+        "GITHUB_URL": f"{base}/github",
+        "GITHUB_API_URL": f"{base}/github/api",
+        "DISCORD_API_URL": f"{base}/discord",
+        "SUPABASE_URL": f"{base}/supabase",
+        "SUPABASE_KEY": "fake-service-key",
+        "STORAGE_BACKEND": "supabase",
+    }
+
+
+def _user_number(token: str) -> Optional[int]:
+    # Токены имеют вид "<provider>-token-<n>"
+    try:
+        return int(token.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def _bearer(request: Request) -> Optional[int]:
+    header = request.headers.get("authorization", "")
+    return _user_number(header[7:]) if header.lower().startswith("bearer ") else None
+
+
+def _consent(provider: str):
+    async def endpoint(request: Request) -> Response:
+        params = request.query_params
+        n = params.get("login_hint") or str(random.randint(1, 10**6))
+        query = urlencode({"code": f"{provider}-{n}", "state": params.get("state", "")})
+        return RedirectResponse(f"{params['redirect_uri']}?{query}", status_code=302)
+
+    return endpoint
+
+
+def _token(provider: str):
+    async def endpoint(request: Request) -> Response:
+        form = await request.form()
+        n = _user_number(str(form.get("code", "")))
+        if n is None or not str(form["code"]).startswith(f"{provider}-"):
+            return JSONResponse({"error": "invalid_grant"}, status_code=400)
+        return JSONResponse(
+            {"access_token": f"{provider}-token-{n}", "token_type": "bearer", "expires_in": 3600}
+        )
+
+    return endpoint
+
+
+async def google_userinfo(request: Request) -> Response:
+    n = _bearer(request)
+    if n is None:
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+    return JSONResponse({
+        "id": f"g{n}",
+        "email": f"fake_user_{n}@google.fake",
+        "name": f"Fake User {n}",
+        "given_name": "Fake",
+        "family_name": f"User {n}",
+        "picture": None,
+    })
+
+
+async def github_user(request: Request) -> Response:
+    n = _bearer(request)
+    if n is None:
+        return JSONResponse({"message": "Bad credentials"}, status_code=401)
+    return JSONResponse({"id": n, "login": f"fake_user_{n}", "name": f"Fake User {n}", "email": None, "avatar_url": None})
+
+
+async def github_emails(request: Request) -> Response:
+    n = _bearer(request)
+    if n is None:
+        return JSONResponse({"message": "Bad credentials"}, status_code=401)
+    return JSONResponse([{"email": f"fake_user_{n}@github.fake", "primary": True, "verified": True}])
+
+
+async def discord_me(request: Request) -> Response:
+    n = _bearer(request)
+    if n is None:
+        return JSONResponse({"message": "401: Unauthorized"}, status_code=401)
+    return JSONResponse({
+        "id": str(n),
+        "username": f"fake_user_{n}",
+        "global_name": f"Fake User {n}",
+        "email": f"fake_user_{n}@discord.fake",
+        "avatar": None,
+    })
+
+
+class FakeSupabase:
+    """In-memory Supabase Storage objects keyed by (bucket, key)."""
+
+    def __init__(self):
+        self.objects: dict[tuple[str, str], tuple[bytes, str]] = {}
+        self.upload_tokens: dict[str, tuple[str, str]] = {}
+
+    def routes(self) -> list[Route]:
+        base = "/supabase/storage/v1/object"
+        return [
+            Route(f"{base}/upload/sign/{{bucket}}/{{key:path}}", self.sign_upload, methods=["POST", "PUT"]),
+            Route(f"{base}/public/{{bucket}}/{{key:path}}", self.download, methods=["GET"]),
+            Route(f"{base}/{{bucket}}/{{key:path}}", self.object, methods=["GET", "POST", "PUT"]),
+            Route(f"{base}/{{bucket}}", self.delete, methods=["DELETE"]),
+        ]
+
+    @staticmethod
+    def _authorized(request: Request) -> bool:
+        return bool(request.headers.get("apikey") or request.headers.get("authorization"))
+
+    async def object(self, request: Request) -> Response:
+        if request.method == "GET":
+            if not self._authorized(request):
+                return JSONResponse({"error": "Unauthorized"}, status_code=400)
+            return await self.download(request)
+        bucket, key = request.path_params["bucket"], request.path_params["key"]
+        if not self._authorized(request):
+            return JSONResponse({"error": "Unauthorized"}, status_code=400)
+        self.objects[(bucket, key)] = (await request.body(), request.headers.get("content-type", "application/octet-stream"))
+        return JSONResponse({"Key": f"{bucket}/{key}"})
+
+    async def download(self, request: Request) -> Response:
+        stored = self.objects.get((request.path_params["bucket"], request.path_params["key"]))
+        if stored is None:
+            return JSONResponse({"error": "not_found"}, status_code=400)
+        return Response(stored[0], media_type=stored[1])
+
+    async def delete(self, request: Request) -> Response:
+        bucket = request.path_params["bucket"]
+        prefixes = (await request.json()).get("prefixes", [])
+        removed = [{"name": key} for key in prefixes if self.objects.pop((bucket, key), None) is not None]
+        return JSONResponse(removed)
+
+    async def sign_upload(self, request: Request) -> Response:
+        bucket, key = request.path_params["bucket"], request.path_params["key"]
+        if request.method == "PUT":
+            token = request.query_params.get("token", "")
+            if self.upload_tokens.pop(token, None) != (bucket, key):
+                return JSONResponse({"error": "invalid_token"}, status_code=400)
+            self.objects[(bucket, key)] = (await request.body(), request.headers.get("content-type", "application/octet-stream"))
+            return JSONResponse({"Key": f"{bucket}/{key}"})
+        token = secrets.token_urlsafe(16)
+        self.upload_tokens[token] = (bucket, key)
+        return JSONResponse({"url": f"/object/upload/sign/{bucket}/{key}?token={token}"})
+
+
+class _Behaviour:
+    """Applies configured latency and error rate in front of the fake routes."""
+
+    def __init__(self, app: ASGIApp, config: FakeConfig):
+        self.app = app
+        self.config = config
+        self.rng = random.Random(config.seed)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        behaviour = self.config.for_path(scope["path"])
+        delay = behaviour.latency + self.rng.uniform(-behaviour.jitter, behaviour.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if behaviour.error_rate and self.rng.random() < behaviour.error_rate:
+            await JSONResponse({"error": "fake_unavailable"}, status_code=503)(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def create_fake_app(config: Optional[FakeConfig] = None) -> ASGIApp:
+    """Build the combined fake providers app."""
+    storage = FakeSupabase()
+    routes = [
+        Route("/google/o/oauth2/v2/auth", _consent("google")),
+        Route("/google/token", _token("google"), methods=["POST"]),
+        Route("/google/oauth2/v2/userinfo", google_userinfo),
+        Route("/github/login/oauth/authorize", _consent("github")),
+        Route("/github/login/oauth/access_token", _token("github"), methods=["POST"]),
+        Route("/github/api/user", github_user),
+        Route("/github/api/user/emails", github_emails),
+        Route("/discord/oauth2/authorize", _consent("discord")),
+        Route("/discord/oauth2/token", _token("discord"), methods=["POST"]),
+        Route("/discord/users/@me", discord_me),
+        *storage.routes(),
+    ]
+    app = Starlette(routes=routes)
+    app.state.storage = storage
+    wrapped = _Behaviour(app, config or FakeConfig())
+    wrapped.state = app.state
+    return wrapped
+
+
+class FakeServer:
+    """Serve the fakes with uvicorn on a background thread (for benchmarking a separate API process)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100, config: Optional[FakeConfig] = None):
+        import uvicorn
+
+        self.url = f"http://{host}:{port}"
+        self.server = uvicorn.Server(
+            uvicorn.Config(create_fake_app(config), host=host, port=port, log_level="warning", lifespan="off")
+        )
+        self.thread = threading.Thread(target=self.server.run, name="fake-providers", daemon=True)
+
+    def __enter__(self) -> "FakeServer":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake providers server did not start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
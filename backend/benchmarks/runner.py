@@ -0,0 +1,183 @@
+"""Closed-loop load runner: N virtual users repeat a scenario for a fixed time."""
+import asyncio
+import math
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+
+from benchmarks.scenarios import AUTHENTICATED, SCENARIOS, Context, Recorder, sample_avatar
+from app.db.seeder import SEED_PASSWORD, seed_email
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    """Per-operation latency percentiles (ms), throughput and error counts."""
+    operations = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(name, []))
+        operations[name] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+    return operations
+
+
+def environment() -> dict:
+    """Where and on which code a run happened, so results are only compared like for like."""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True, timeout=10
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "cpus": os.cpu_count(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+async def login_users(client: httpx.AsyncClient, ctx: Context, count: int) -> list[str]:
+    """Log in the first ``count`` seeded users and return their tokens."""
+    tokens = []
+    for n in range(1, min(count, ctx.users) + 1):
+        response = await client.post(
+            f"{ctx.api_prefix}/auth/login", json={"email": seed_email(n), "password": SEED_PASSWORD}
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["access_token"])
+    return tokens
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    name: str,
+    ctx: Context,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> dict:
+    """Run one scenario with ``concurrency`` virtual users and summarize the measured window."""
+    scenario = SCENARIOS[name]
+    recorder = Recorder()
+    recorder.recording = False
+    deadline = time.perf_counter() + warmup + duration
+
+    async def virtual_user(index: int) -> None:
+        # Отдельный генератор на пользователя — последовательность запросов воспроизводима
+        rng = random.Random(seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            await scenario(client, ctx, recorder, rng)
+
+    async def start_measuring() -> float:
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        return time.perf_counter()
+
+    measuring = asyncio.create_task(start_measuring())
+    await asyncio.gather(*(virtual_user(i) for i in range(concurrency)))
+    measured = time.perf_counter() - await measuring
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(measured, 2),
+        "operations": summarize(recorder, measured),
+    }
+
+
+async def run(
+    base_url: str,
+    scenarios: list[str],
+    users: int,
+    concurrency: int = 10,
+    duration: float = 30.0,
+    warmup: float = 5.0,
+    logins: int = 50,
+    seed: int = 42,
+    api_prefix: str = "/api/v1",
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> dict:
+    """
+    Run scenarios one after another against a server with a seeded dataset.
+
+    Args:
+        base_url: Server to load
+        scenarios: Names from ``SCENARIOS``
+        users: Number of seeded benchmark users
+        concurrency: Virtual users per scenario
+        duration: Measured seconds per scenario
+        warmup: Unmeasured seconds before each measurement
+        logins: How many users to log in for authenticated scenarios
+
+    Returns:
+        dict: Environment, parameters and per-scenario results
+    """
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=30.0, transport=transport
+    ) as client:
+        ctx = Context(api_prefix=api_prefix, users=users)
+        if AUTHENTICATED & set(scenarios):
+            ctx.tokens = await login_users(client, ctx, logins)
+        if "avatar_upload" in scenarios:
+            ctx.avatar = sample_avatar()
+
+        results = {}
+        for name in scenarios:
+            results[name] = await run_scenario(client, name, ctx, concurrency, duration, warmup, seed)
+
+    return {
+        "environment": environment(),
+        "parameters": {
+            "base_url": base_url,
+            "users": users,
+            "concurrency": concurrency,
+            "duration_s": duration,
+            "warmup_s": warmup,
+            "seed": seed,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    """Human-readable p50/p95/p99 and throughput deltas between two result files."""
+    # commit равен None, если прогон записан вне git-репозитория
+    lines = [f"{(old['environment'].get('commit') or '?')[:10]} -> {(new['environment'].get('commit') or '?')[:10]}"]
+    for scenario, result in new["scenarios"].items():
+        before = old["scenarios"].get(scenario, {}).get("operations", {})
+        for op, stats in result["operations"].items():
+            prev = before.get(op)
+            if prev is None:
+                continue
+            deltas = []
+            for key in ("p50_ms", "p95_ms", "p99_ms", "rps"):
+                change = (stats[key] - prev[key]) / prev[key] * 100 if prev[key] else 0.0
+                deltas.append(f"{key}={prev[key]}->{stats[key]} ({change:+.1f}%)")
+            lines.append(f"{scenario}/{op}: " + " ".join(deltas))
+    return lines
@@ -0,0 +1,142 @@
+"""
+Benchmark scenarios.
+
+A scenario is one iteration of a virtual user: it issues one or more
+requests through ``Recorder.request`` so every operation gets its own
+latency series.
+"""
+import io
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from app.db.seeder import SEED_PASSWORD, seed_email, seed_username
+
+
+@dataclass
+class Context:
+    """What scenarios know about the target: API prefix, dataset size and logged-in users."""
+
+    api_prefix: str
+    users: int
+    tokens: list[str] = field(default_factory=list)
+    avatar: bytes = b""
+
+    def random_user(self, rng: random.Random) -> int:
+        return rng.randint(1, self.users)
+
+    def auth(self, rng: random.Random) -> dict[str, str]:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+
+class Recorder:
+    """Collects per-operation latencies and errors."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.recording = True
+
+    async def request(
+        self, client: httpx.AsyncClient, name: str, method: str, url: str, expect: int = 200, **kwargs
+    ) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - start
+
+        if not self.recording:
+            return response
+        if response is None or response.status_code != expect:
+            self.errors[name] = self.errors.get(name, 0) + 1
+            return response
+        self.latencies.setdefault(name, []).append(elapsed)
+        return response
+
+
+async def public_profile(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """Anonymous public profile read."""
+    await rec.request(client, "public_profile", "GET", f"{ctx.api_prefix}/public/{seed_username(ctx.random_user(rng))}")
+
+
+async def channel_crud(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """Create, read, update and delete one channel of a logged-in user."""
+    headers = ctx.auth(rng)
+    base = f"{ctx.api_prefix}/channels"
+    response = await rec.request(
+        client, "channel_create", "POST", base, expect=201, headers=headers,
+        json={"type": "website", "value": f"https://example.com/{rng.random()}"},
+    )
+    if response is None or response.status_code != 201:
+        return
+    channel_id = response.json()["id"]
+    await rec.request(client, "channel_list", "GET", base, headers=headers)
+    await rec.request(
+        client, "channel_update", "PUT", f"{base}/{channel_id}", headers=headers, json={"label": "bench"}
+    )
+    await rec.request(client, "channel_delete", "DELETE", f"{base}/{channel_id}", expect=204, headers=headers)
+
+
+async def contact_search(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """Search users by a username prefix."""
+    query = seed_username(ctx.random_user(rng))[: rng.randint(12, 14)]
+    await rec.request(
+        client, "contact_search", "GET", f"{ctx.api_prefix}/contacts/search",
+        headers=ctx.auth(rng), params={"q": query},
+    )
+
+
+async def login_burst(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """Password login (bcrypt-bound)."""
+    await rec.request(
+        client, "login", "POST", f"{ctx.api_prefix}/auth/login",
+        json={"email": seed_email(ctx.random_user(rng)), "password": SEED_PASSWORD},
+    )
+
+
+async def avatar_upload(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """Avatar upload up to the 202 response; processing itself runs in the worker."""
+    await rec.request(
+        client, "avatar_upload", "POST", f"{ctx.api_prefix}/auth/avatar", expect=202,
+        headers=ctx.auth(rng), files={"file": ("avatar.png", ctx.avatar, "image/png")},
+    )
+
+
+async def oauth_login(client: httpx.AsyncClient, ctx: Context, rec: Recorder, rng: random.Random) -> None:
+    """GitHub OAuth callback: code exchange, userinfo and user/channel upsert (needs benchmarks.fakes)."""
+    await rec.request(
+        client, "oauth_github_callback", "GET", f"{ctx.api_prefix}/oauth/github/callback",
+        expect=307, params={"code": f"github-{ctx.random_user(rng)}"},
+    )
+
+
+Scenario = Callable[[httpx.AsyncClient, Context, Recorder, random.Random], Awaitable[None]]
+
+SCENARIOS: dict[str, Scenario] = {
+    "public_profile": public_profile,
+    "channel_crud": channel_crud,
+    "contact_search": contact_search,
+    "login_burst": login_burst,
+    "avatar_upload": avatar_upload,
+    "oauth_login": oauth_login,
+}
+
+# Без явного --scenario запускаются те, что не требуют фейковых провайдеров
+DEFAULT_SCENARIOS = ["public_profile", "channel_crud", "contact_search", "login_burst", "avatar_upload"]
+
+# Сценарии, которым нужны токены залогиненных пользователей
+AUTHENTICATED = {"channel_crud", "contact_search", "avatar_upload"}
+
+
+def sample_avatar(size: int = 512) -> bytes:
+    """A PNG big enough to exercise decoding and resizing."""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.radial_gradient("L").resize((size, size)).convert("RGB").save(buffer, "PNG")
+    return buffer.getvalue()
@@ -0,0 +1,66 @@
+# Production server: gunicorn master with preloaded app and uvicorn workers.
+#
+#   gunicorn app.main:app          (this file is picked up from the working directory)
+#
+# kill -HUP <master> restarts workers one by one with the new configuration;
+# kill -TERM lets in-flight requests finish within graceful_timeout.
+import os
+import shutil
+import tempfile
+
+from app.core.config import settings
+from app.core.server import default_worker_count
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = settings.WEB_CONCURRENCY or default_worker_count(settings.WORKER_MEMORY_MB)
+
+# Приложение импортируется один раз в мастере; воркеры получают его через fork (copy-on-write)
+preload_app = True
+
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+timeout = settings.WORKER_TIMEOUT
+graceful_timeout = settings.WORKER_GRACEFUL_TIMEOUT
+keepalive = 5
+accesslog = "-"
+forwarded_allow_ips = "*"
+
+# Метрики нескольких процессов собираются через общий каталог; он должен быть готов
+# до импорта prometheus_client, то есть до загрузки приложения
+if workers > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+elif os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # Файлы прошлого запуска исказили бы счетчики
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def on_starting(server):
+    from app.core.events import resolve_broker
+    from app.db.migrations import check_migrations
+    from app.db.session import engine
+
+    check_migrations(engine)
+    engine.dispose()
+    if workers > 1 and resolve_broker() == "local":
+        # Локальный брокер не доставляет события в SSE-потоки других воркеров
+        server.log.warning(
+            f"EVENTS_BROKER is local with {workers} workers: change notifications only reach "
+            "streams on the worker that committed them; use EVENTS_BROKER=postgres"
+        )
+    server.log.info(f"Starting {workers} workers (max_requests={max_requests}±{max_requests_jitter})")
+
+
+def post_fork(server, worker):
+    # Соединения пула, открытые в мастере, нельзя делить между процессами
+    from app.db.session import engine
+
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
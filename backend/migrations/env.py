@@ -15,7 +15,7 @@ from app.models import channel as _channel_model  # noqa: F401
 config = context.config
 
 # Alembic logs
-if config.config_file_name is not None:
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 target_metadata = Base.metadata
@@ -0,0 +1,41 @@
+"""add_avatar_jobs_table
+
+Revision ID: i5a6b7c8d9e0
+Revises: h4a5b6c7d8e9
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'i5a6b7c8d9e0'
+down_revision = 'h4a5b6c7d8e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'avatar_jobs',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('source_key', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('avatar_url', sa.String(length=500), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_avatar_jobs_user_id'), 'avatar_jobs', ['user_id'], unique=False)
+    op.create_index(op.f('ix_avatar_jobs_status'), 'avatar_jobs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_avatar_jobs_status'), table_name='avatar_jobs')
+    op.drop_index(op.f('ix_avatar_jobs_user_id'), table_name='avatar_jobs')
+    op.drop_table('avatar_jobs')
@@ -0,0 +1,37 @@
+"""add_change_log_table
+
+Revision ID: j6a7b8c9d0e1
+Revises: i5a6b7c8d9e0
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'j6a7b8c9d0e1'
+down_revision = 'i5a6b7c8d9e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_log',
+        sa.Column('seq', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('op', sa.String(length=10), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_change_log_user_id_seq', 'change_log', ['user_id', 'seq'], unique=False)
+    op.create_index(op.f('ix_change_log_created_at'), 'change_log', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_change_log_created_at'), table_name='change_log')
+    op.drop_index('ix_change_log_user_id_seq', table_name='change_log')
+    op.drop_table('change_log')
@@ -1,4 +1,9 @@
 # Pytest configuration and fixtures for HumanDNS tests
+import os
+
+# Repeated statements within one request fail tests instead of reaching production
+os.environ.setdefault("SQL_N_PLUS_ONE_MODE", "raise")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -8,6 +13,7 @@ from sqlalchemy.pool import StaticPool
 from app.main import app
 from app.db.base import Base
 from app.core.config import settings
+from app.db.query_stats import install_query_hooks
 
 # Test database URL
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -17,6 +23,7 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
+install_query_hooks(engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(scope="function")
@@ -52,3 +59,43 @@ def test_user_data():
         "last_name": "User"
     }
 
+
+
+@pytest.fixture
+def api_session():
+    """Session factory over a private in-memory database wired into the app's get_db."""
+    from app.db.deps import get_db
+
+    memory_engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    install_query_hooks(memory_engine)
+    Base.metadata.create_all(bind=memory_engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=memory_engine)
+
+    def override_get_db():
+        with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def api_client(api_session):
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(api_session):
+    """Create a user directly in the database; returns (user_id, auth headers)."""
+    from app.core.security import create_access_token
+    from app.models.user import User
+
+    def factory(username: str = "owner"):
+        with api_session() as session:
+            user = User(username=username, email=f"{username}@example.com", password_hash="x")
+            session.add(user)
+            session.commit()
+            return user.id, {"Authorization": f"Bearer {create_access_token(user.id)}"}
+
+    return factory
@@ -0,0 +1,106 @@
+# Tests for the avatar processing job queue
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.storage import local_storage, original_key
+from app.crud import avatar_job as crud_avatar_job
+from app.db.base import Base
+from app.models.avatar_job import AvatarJob, AvatarJobStatus
+from app.models.user import User
+from app.workers import avatar as avatar_worker
+
+
+@pytest.fixture
+def session_factory(monkeypatch, tmp_path):
+    """Isolated in-memory database and storage root for the worker."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(avatar_worker, "SessionLocal", factory)
+    monkeypatch.setattr(local_storage, "root", tmp_path)
+    monkeypatch.setattr("app.core.storage.settings.STORAGE_BACKEND", "local")
+    yield factory
+    Base.metadata.drop_all(bind=engine)
+
+
+def _queue_job(factory, data: bytes, filename: str) -> tuple[int, str]:
+    key = original_key(1, filename)
+    asyncio.run(local_storage.upload(key, data))
+    with factory() as db:
+        db.add(User(id=1, email="jobs@example.com", username="jobs"))
+        db.commit()
+        job = crud_avatar_job.create_job(db, 1, key)
+        return job.id, key
+
+
+def _png_bytes(size=(800, 600)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 10, 10)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_job_updates_avatar(session_factory, tmp_path):
+    """A claimed job derives the avatar, swaps avatar_url and removes the original."""
+    job_id, key = _queue_job(session_factory, _png_bytes(), "orig.png")
+
+    claimed = avatar_worker._claim()
+    assert claimed == (job_id, 1, key, 1)
+    assert avatar_worker._claim() is None  # nothing else queued
+
+    asyncio.run(avatar_worker.process_job(*claimed))
+
+    with session_factory() as db:
+        job = db.get(AvatarJob, job_id)
+        user = db.get(User, 1)
+        assert job.status == AvatarJobStatus.done.value
+        assert job.attempts == 1
+        assert user.avatar_url == job.avatar_url
+        assert "/uploads/avatars/1/" in user.avatar_url
+    assert not (tmp_path / key).exists()
+
+
+def test_job_rejects_invalid_image(session_factory):
+    """Invalid originals mark the job failed and leave avatar_url untouched."""
+    job_id, _ = _queue_job(session_factory, b"not an image", "orig.png")
+
+    asyncio.run(avatar_worker.process_job(*avatar_worker._claim()))
+
+    with session_factory() as db:
+        job = db.get(AvatarJob, job_id)
+        assert job.status == AvatarJobStatus.failed.value
+        assert job.error
+        assert db.get(User, 1).avatar_url is None
+
+
+def test_requeued_job_keeps_original(session_factory, tmp_path):
+    """A result of an attempt that lost its claim is dropped and the original stays for the retry."""
+    job_id, key = _queue_job(session_factory, _png_bytes(), "orig.png")
+    claimed = avatar_worker._claim()
+    with session_factory() as db:
+        # Задание вернули в очередь по таймауту, пока первая попытка еще работала
+        db.get(AvatarJob, job_id).status = AvatarJobStatus.queued.value
+        db.commit()
+
+    asyncio.run(avatar_worker.process_job(*claimed))
+
+    with session_factory() as db:
+        assert db.get(AvatarJob, job_id).status == AvatarJobStatus.queued.value
+        assert db.get(User, 1).avatar_url is None
+    assert (tmp_path / key).exists()
+    # Обработанный аватар отброшенной попытки не остается в хранилище
+    assert not list((tmp_path / "avatars").rglob("*.*"))
+
+
+def test_finalize_queues_one_job_per_upload(api_client, make_user):
+    """Finalizing the same original twice is rejected."""
+    user_id, headers = make_user("finalize")
+    payload = {"key": original_key(user_id, "a.png")}
+
+    assert api_client.post("/api/v1/auth/avatar/finalize", json=payload, headers=headers).status_code == 202
+    assert api_client.post("/api/v1/auth/avatar/finalize", json=payload, headers=headers).status_code == 409
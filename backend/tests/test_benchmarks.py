@@ -0,0 +1,30 @@
+# Tests for benchmark result statistics
+from benchmarks.runner import compare, percentile, summarize
+from benchmarks.scenarios import Recorder
+
+
+def test_percentiles_use_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.050
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+
+def test_summary_and_comparison():
+    recorder = Recorder()
+    recorder.latencies["op"] = [0.010, 0.020, 0.030, 0.040]
+    recorder.errors["op"] = 1
+    summary = summarize(recorder, elapsed=2.0)
+    assert summary["op"]["requests"] == 4
+    assert summary["op"]["errors"] == 1
+    assert summary["op"]["rps"] == 2.0
+    assert summary["op"]["p50_ms"] == 20.0
+
+    old = {"environment": {"commit": "a" * 40}, "scenarios": {"s": {"operations": summary}}}
+    faster = {**summary["op"], "p50_ms": 10.0}
+    new = {"environment": {"commit": "b" * 40}, "scenarios": {"s": {"operations": {"op": faster}}}}
+    assert "p50_ms=20.0->10.0 (-50.0%)" in compare(old, new)[1]
+
+    # Прогон вне git-репозитория записывает commit = None
+    outside_git = {**old, "environment": {"commit": None}}
+    assert compare(outside_git, new)[0] == "? -> " + "b" * 10
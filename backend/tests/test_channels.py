@@ -0,0 +1,143 @@
+# Channel endpoints: bulk operations and reordering
+import re
+
+from sqlalchemy import event
+
+from app.crud.ordering import RANK_STEP
+from app.models.group import Group
+
+BATCH_URL = "/api/v1/channels/batch"
+
+
+def _query_count(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+def test_batch_applies_all_operations_in_constant_queries(api_client, api_session, make_user):
+    user_id, headers = make_user()
+    with api_session() as session:
+        group = Group(user_id=user_id, name="Work")
+        session.add(group)
+        session.commit()
+        group_id = group.id
+
+    creates = [
+        {"op": "create", "type": "email", "value": f"me{i}@example.com", "sort_order": i, "group_ids": [group_id]}
+        for i in range(20)
+    ]
+    response = api_client.post(BATCH_URL, json={"operations": creates}, headers=headers)
+    assert response.status_code == 200
+    channels = response.json()
+    assert [c["value"] for c in channels] == [f"me{i}@example.com" for i in range(20)]
+    # По одному INSERT связей с группами и журнала изменений, а не по запросу на канал.
+    # Каналы PostgreSQL вставляет одним INSERT; SQLite не умеет упорядочить RETURNING
+    # пакета и вставляет по строке
+    assert _query_count(response) <= 7 + len(creates)
+
+    ids = [c["id"] for c in channels]
+    operations = [
+        {"op": "delete", "id": ids[0]},
+        {"op": "update", "id": ids[1], "label": "Work", "group_ids": []},
+        {"op": "move", "id": ids[2], "after_id": ids[19]},
+        {"op": "create", "type": "phone", "value": "+100", "sort_order": 50},
+    ]
+    response = api_client.post(BATCH_URL, json={"operations": operations}, headers=headers)
+    assert response.status_code == 200
+    by_id = {c["id"]: c for c in response.json()}
+    assert ids[0] not in by_id
+    assert by_id[ids[1]]["label"] == "Work"
+    assert response.json()[-1]["id"] == ids[2]
+    # Перемещение в пакете — тот же ранг с промежутком, что и у одиночного move
+    assert response.json()[-1]["sort_order"] == 19 + RANK_STEP
+    assert len(by_id) == 20
+    assert _query_count(response) <= 13
+
+    with api_session() as session:
+        members = {c.id for c in session.get(Group, group_id).channels}
+    assert members == set(ids[2:])
+
+
+def test_batch_rejects_foreign_channels_atomically(api_client, make_user):
+    _, owner = make_user("owner")
+    _, other = make_user("other")
+    created = api_client.post(
+        BATCH_URL, json={"operations": [{"op": "create", "type": "email", "value": "a@example.com"}]}, headers=owner
+    ).json()
+
+    response = api_client.post(
+        BATCH_URL,
+        json={"operations": [
+            {"op": "create", "type": "phone", "value": "+1"},
+            {"op": "delete", "id": created[0]["id"]},
+        ]},
+        headers=other,
+    )
+    assert response.status_code == 400
+    assert api_client.get("/api/v1/channels", headers=other).json() == []
+    assert len(api_client.get("/api/v1/channels", headers=owner).json()) == 1
+
+
+def test_move_writes_one_row_and_rebalances_when_out_of_gaps(api_client, api_session, make_user):
+    _, headers = make_user()
+    # Старые данные: у всех каналов sort_order = 0
+    created = api_client.post(BATCH_URL, json={"operations": [
+        {"op": "create", "type": "email", "value": f"{i}@example.com"} for i in range(5)
+    ]}, headers=headers).json()
+    ids = [c["id"] for c in created]
+
+    updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            updates.append(len(parameters) if executemany else 1)
+
+    engine = api_session.kw["bind"]
+    event.listen(engine, "before_cursor_execute", count_updates)
+    try:
+        # Промежутков нет — один раз перенумеровываем
+        moved = api_client.post(f"/api/v1/channels/{ids[4]}/move", json={"after_id": ids[0]}, headers=headers)
+        assert moved.status_code == 200
+        order = [ids[0], ids[4], ids[1], ids[2], ids[3]]
+        listed = api_client.get("/api/v1/channels", headers=headers).json()
+        assert [c["id"] for c in listed] == order
+        assert [c["sort_order"] for c in listed] == [RANK_STEP * (i + 1) for i in range(5)]
+
+        updates.clear()
+        for item_id, after_id in [(ids[3], None), (ids[0], ids[2]), (ids[1], ids[3])]:
+            response = api_client.post(f"/api/v1/channels/{item_id}/move", json={"after_id": after_id}, headers=headers)
+            assert response.status_code == 200
+        assert updates == [1, 1, 1]
+    finally:
+        event.remove(engine, "before_cursor_execute", count_updates)
+
+    listed = api_client.get("/api/v1/channels", headers=headers).json()
+    assert [c["id"] for c in listed] == [ids[3], ids[1], ids[4], ids[2], ids[0]]
+
+    response = api_client.post(f"/api/v1/channels/{ids[0]}/move", json={"after_id": 10**6}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_group_ids_are_returned_from_one_query(api_client, api_session, make_user):
+    user_id, headers = make_user()
+    with api_session() as session:
+        groups = [Group(user_id=user_id, name=name) for name in ("Work", "Home")]
+        session.add_all(groups)
+        session.commit()
+        work, home = (g.id for g in groups)
+
+    response = api_client.post(BATCH_URL, json={"operations": [
+        {"op": "create", "type": "email", "value": f"{i}@example.com", "is_public": True, "group_ids": [home, work][: i % 3]}
+        for i in range(12)
+    ]}, headers=headers)
+    expected = [sorted([home, work][: i % 3]) for i in range(12)]
+    assert [c["group_ids"] for c in response.json()] == expected
+
+    response = api_client.get("/api/v1/channels", headers=headers)
+    assert [c["group_ids"] for c in response.json()] == expected
+    # пользователь, каналы, связи с группами
+    assert _query_count(response) == 3
+
+    first = response.json()[2]
+    assert api_client.get(f"/api/v1/channels/{first['id']}", headers=headers).json()["group_ids"] == expected[2]
+    public = api_client.get("/api/v1/public/owner").json()
+    assert [c["group_ids"] for c in public["channels"]] == expected
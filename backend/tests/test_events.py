@@ -0,0 +1,97 @@
+# Push notifications of contact changes
+import asyncio
+
+import pytest
+
+from app.api.routes.events import event_stream
+from app.core.config import settings
+from app.core.events import RESYNC, Subscription, event_hub, resolve_broker
+from app.crud import contact as crud_contact
+from app.crud.change_log import record_change
+from app.models.change_log import ChangeEntity
+
+STREAM_URL = "/api/v1/events/stream"
+
+
+@pytest.fixture
+def hub(api_session, monkeypatch):
+    monkeypatch.setattr(event_hub, "session_factory", api_session)
+    yield event_hub
+    assert event_hub.connections == 0
+
+
+def test_committed_changes_reach_connected_followers(hub, api_session, make_user):
+    me, _ = make_user("me")
+    friend, _ = make_user("friend")
+    stranger, _ = make_user("stranger")
+    with api_session() as session:
+        crud_contact.create_contact(session, me, friend)
+
+    def change_friend_channel(commit: bool):
+        with api_session() as session:
+            record_change(session, friend, ChangeEntity.channel, 42)
+            session.commit() if commit else session.rollback()
+
+    async def scenario():
+        mine, strangers = hub.subscribe(me), hub.subscribe(stranger)
+        try:
+            # Откат транзакции ничего не публикует
+            await asyncio.to_thread(change_friend_channel, False)
+            assert await mine.next(0.2) is None
+
+            await asyncio.to_thread(change_friend_channel, True)
+            event = await mine.next(2)
+            assert event == {"type": "change", "user_id": friend, "entity": "channel", "entity_id": 42, "op": "upsert"}
+            assert await strangers.next(0.2) is None
+        finally:
+            hub.unsubscribe(mine)
+            hub.unsubscribe(strangers)
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_gets_single_resync():
+    async def scenario():
+        subscription = Subscription(user_id=1, queue_size=2)
+        for i in range(5):
+            subscription.offer({"type": "change", "entity_id": i})
+        assert subscription.queue.qsize() == 1
+        assert await subscription.next(1) is RESYNC
+        assert subscription.resync_pending is False
+
+    asyncio.run(scenario())
+
+
+def test_stream_frames_and_unsubscribe(hub):
+    async def scenario():
+        subscription = hub.subscribe(1)
+        frames = event_stream(subscription, heartbeat=0.05)
+        assert (await anext(frames)).startswith("retry:")
+        assert await anext(frames) == ": ping\n\n"
+        subscription.offer({"type": "change", "entity": "contact", "entity_id": 2})
+        assert (await anext(frames)).startswith("event: change\ndata: ")
+        await frames.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_stream_auth_and_connection_limit(api_client, make_user, monkeypatch):
+    _, headers = make_user("me")
+    assert api_client.get(STREAM_URL).status_code == 401
+    assert api_client.get(STREAM_URL, params={"ticket": "bogus"}).status_code == 401
+    # Сессионный токен в URL не принимается — только билет потока
+    access_token = headers["Authorization"].split()[1]
+    assert api_client.get(STREAM_URL, params={"ticket": access_token}).status_code == 401
+
+    monkeypatch.setattr(settings, "EVENTS_MAX_CONNECTIONS_PER_USER", 0)
+    ticket = api_client.post("/api/v1/events/ticket", headers=headers).json()["ticket"]
+    assert api_client.get(STREAM_URL, params={"ticket": ticket}).status_code == 429
+    assert api_client.get(STREAM_URL, headers=headers).status_code == 429
+
+
+def test_auto_broker_follows_database(monkeypatch):
+    monkeypatch.setattr(settings, "EVENTS_BROKER", "auto")
+    monkeypatch.setattr(settings, "DATABASE_URL", "postgresql+psycopg://u:p@db/oneid")
+    assert resolve_broker() == "postgres"
+    monkeypatch.setattr(settings, "DATABASE_URL", "sqlite:///./human_dns.db")
+    assert resolve_broker() == "local"
@@ -0,0 +1,72 @@
+# Streaming contact book export
+import csv
+import io
+import json
+
+from app.core.export import to_vcard
+from app.crud import contact as crud_contact
+from app.models.channel import Channel
+
+EXPORT_URL = "/api/v1/contacts/export"
+
+
+def _contact_book(api_session, make_user):
+    me, headers = make_user("me")
+    alice, _ = make_user("alice")
+    bob, _ = make_user("bob")
+    with api_session() as session:
+        session.add_all([
+            Channel(user_id=alice, type="phone", value="+1 555 0100", is_primary=True, sort_order=1),
+            Channel(user_id=alice, type="telegram", value="@alice", sort_order=2),
+            Channel(user_id=alice, type="github", value="alice", sort_order=3),
+            Channel(user_id=alice, type="email", value="secret@example.com", is_public=False, sort_order=4),
+            Channel(user_id=bob, type="email", value="bob@example.com"),
+        ])
+        session.commit()
+        crud_contact.create_contact(session, me, bob)
+        crud_contact.create_contact(session, me, alice)
+    return headers
+
+
+def test_export_ndjson_and_csv_contain_public_channels(api_client, api_session, make_user):
+    headers = _contact_book(api_session, make_user)
+
+    response = api_client.get(EXPORT_URL, params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    cards = [json.loads(line) for line in response.text.splitlines()]
+    assert [card["username"] for card in cards] == ["alice", "bob"]
+    assert [ch["value"] for ch in cards[0]["channels"]] == ["+1 555 0100", "@alice", "alice"]
+
+    response = api_client.get(EXPORT_URL, params={"format": "csv"}, headers=headers)
+    assert response.headers["content-disposition"] == 'attachment; filename="contacts.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["username"], row["email"]) for row in rows] == [("alice", ""), ("bob", "bob@example.com")]
+
+
+def test_export_vcard_maps_channel_types(api_client, api_session, make_user):
+    headers = _contact_book(api_session, make_user)
+
+    response = api_client.get(EXPORT_URL, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/vcard")
+    alice = response.text.split("END:VCARD")[0]
+    assert "TEL;TYPE=CELL,PREF:+1 555 0100\r\n" in alice
+    assert "IMPP;X-SERVICE-TYPE=Telegram:tg://resolve?domain=alice\r\n" in alice
+    assert "URL:https://github.com/alice\r\n" in alice
+    assert "secret@example.com" not in response.text
+    assert response.text.count("BEGIN:VCARD") == 2
+
+    assert api_client.get(EXPORT_URL, params={"format": "xml"}, headers=headers).status_code == 422
+
+
+def test_vcard_escapes_and_folds_long_lines():
+    card = {
+        "username": "u", "display_name": None, "first_name": "Ann;", "last_name": None,
+        "avatar_url": None, "bio": "ш" * 60 + "\nend", "channels": [],
+    }
+    vcard = to_vcard(card)
+    assert "FN:Ann\\;\r\n" in vcard
+    assert all(len(line.encode()) <= 75 for line in vcard.split("\r\n"))
+    unfolded = vcard.replace("\r\n ", "")
+    assert "NOTE:" + "ш" * 60 + "\\nend\r\n" in unfolded
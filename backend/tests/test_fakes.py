@@ -0,0 +1,99 @@
+# Hermetic OAuth and storage flows against the fake providers
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core import http_client
+from app.core.storage import StorageError
+from app.core.supabase_storage import SupabaseStorage
+from app.db.base import Base
+from app.db.deps import get_db
+from app.main import app
+from benchmarks.fakes import FakeBehaviour, FakeConfig, create_fake_app, fake_settings
+
+FAKE_URL = "http://fakes"
+
+
+@pytest.fixture
+def fakes(monkeypatch):
+    fake_app = create_fake_app()
+    for name, value in fake_settings(FAKE_URL).items():
+        monkeypatch.setattr(f"app.core.config.settings.{name}", value)
+    monkeypatch.setattr(
+        http_client, "_oauth_client", httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app))
+    )
+    return fake_app
+
+
+@pytest.fixture
+def client(fakes):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_google_login_round_trip(client, fakes):
+    """State from the login redirect is checked, the code exchanged and the user created."""
+    callback = "http://testserver/api/v1/oauth/google/callback"
+    login = client.get("/api/v1/oauth/google", params={"redirect_uri": callback}, follow_redirects=False)
+    consent_url = urlsplit(login.headers["location"])
+    assert consent_url.netloc == "fakes"
+
+    consent = TestClient(fakes).get(
+        f"{consent_url.path}?{consent_url.query}&login_hint=7", follow_redirects=False
+    )
+    response = client.get(consent.headers["location"].replace("http://testserver", ""))
+    assert response.status_code == 200
+    assert response.json()["access_token"]
+
+    replay = client.get(consent.headers["location"].replace("http://testserver", ""))
+    assert replay.status_code == 400
+
+
+def test_github_callback_redirects_with_token(client):
+    response = client.get("/api/v1/oauth/github/callback", params={"code": "github-3"}, follow_redirects=False)
+    assert response.status_code == 307
+    assert "token=" in response.headers["location"]
+
+
+def test_supabase_storage_against_fake(monkeypatch):
+    monkeypatch.setattr("app.core.supabase_storage.settings.STORAGE_RETRY_BACKOFF", 0.0)
+    fake_app = create_fake_app()
+    storage = SupabaseStorage(
+        url=f"{FAKE_URL}/supabase", key="k", bucket="avatars", transport=httpx.ASGITransport(app=fake_app)
+    )
+
+    async def scenario(tmp_file: str):
+        url = await storage.upload("avatars/1/a.png", b"png-bytes", "image/png")
+        size = await storage.download("avatars/1/a.png", tmp_file, max_bytes=100)
+        deleted = await storage.delete("avatars/1/a.png")
+        await storage.aclose()
+        return url, size, deleted
+
+    url, size, deleted = asyncio.run(scenario("/dev/null"))
+    assert url == f"{FAKE_URL}/supabase/storage/v1/object/public/avatars/avatars/1/a.png"
+    assert size == len(b"png-bytes")
+    assert deleted
+
+
+def test_fake_error_rate_exhausts_retries(monkeypatch):
+    monkeypatch.setattr("app.core.supabase_storage.settings.STORAGE_RETRY_BACKOFF", 0.0)
+    fake_app = create_fake_app(FakeConfig(per_prefix={"supabase": FakeBehaviour(error_rate=1.0)}))
+    storage = SupabaseStorage(url=f"{FAKE_URL}/supabase", key="k", transport=httpx.ASGITransport(app=fake_app))
+
+    with pytest.raises(StorageError):
+        asyncio.run(storage.upload("avatars/1/a.png", b"x"))
@@ -0,0 +1,105 @@
+# Group endpoints: membership sets and reordering
+from sqlalchemy import event
+
+from app.models.group import Group
+
+API = "/api/v1"
+
+
+def _setup(api_client, api_session, make_user, channels=3, groups=("Work", "Home")):
+    user_id, headers = make_user()
+    created = api_client.post(f"{API}/channels/batch", json={"operations": [
+        {"op": "create", "type": "email", "value": f"{i}@example.com"} for i in range(channels)
+    ]}, headers=headers).json()
+    with api_session() as session:
+        rows = [Group(user_id=user_id, name=name) for name in groups]
+        session.add_all(rows)
+        session.commit()
+        group_ids = [g.id for g in rows]
+    return headers, [c["id"] for c in created], group_ids
+
+
+def _members(api_session, group_id):
+    with api_session() as session:
+        return {c.id for c in session.get(Group, group_id).channels}
+
+
+def test_assign_and_unassign_channel_sets(api_client, api_session, make_user):
+    headers, channel_ids, (work, _) = _setup(api_client, api_session, make_user)
+    _, stranger = make_user("stranger")
+    foreign = api_client.post(f"{API}/channels", json={"type": "phone", "value": "+1"}, headers=stranger).json()
+
+    statements = []
+    engine = api_session.kw["bind"]
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        response = api_client.post(
+            f"{API}/groups/{work}/channels", json={"channel_ids": channel_ids + [foreign["id"]]}, headers=headers
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert response.status_code == 204
+    assert sum(s.startswith("INSERT INTO channel_groups") for s in statements) == 1
+    assert _members(api_session, work) == set(channel_ids)
+
+    # Повторное добавление ничего не дублирует
+    api_client.post(f"{API}/groups/{work}/channels", json={"channel_ids": channel_ids[:1]}, headers=headers)
+    response = api_client.delete(
+        f"{API}/groups/{work}/channels", params={"channel_ids": channel_ids[:2]}, headers=headers
+    )
+    assert response.status_code == 204
+    assert _members(api_session, work) == {channel_ids[2]}
+
+    assert api_client.post(
+        f"{API}/groups/{work}/channels", json={"channel_ids": channel_ids}, headers=stranger
+    ).status_code == 404
+
+
+def test_set_channel_groups_by_diff(api_client, api_session, make_user):
+    headers, channel_ids, (work, home) = _setup(api_client, api_session, make_user)
+    channel = channel_ids[0]
+
+    for group_ids in ([work], [work, home], [home], []):
+        response = api_client.put(f"{API}/channels/{channel}/groups", json={"group_ids": group_ids}, headers=headers)
+        assert response.status_code == 200
+        assert {g for g in (work, home) if channel in _members(api_session, g)} == set(group_ids)
+
+    assert api_client.delete(f"{API}/channels/{channel}/groups/{work}", headers=headers).status_code == 404
+
+
+def test_move_group(api_client, api_session, make_user):
+    headers, _, (a, b, c) = _setup(api_client, api_session, make_user, channels=0, groups=("A", "B", "C"))
+
+    response = api_client.post(f"{API}/groups/{c}/move", json={"after_id": None}, headers=headers)
+    assert response.status_code == 200
+    response = api_client.post(f"{API}/groups/{a}/move", json={"after_id": b}, headers=headers)
+    assert response.status_code == 200
+    assert [g["id"] for g in api_client.get(f"{API}/groups/", headers=headers).json()] == [c, b, a]
+
+
+def test_group_tree_with_ungrouped_bucket(api_client, api_session, make_user):
+    headers, channel_ids, (work, home) = _setup(api_client, api_session, make_user, channels=4)
+    api_client.post(f"{API}/groups/{work}/channels", json={"channel_ids": channel_ids[:2]}, headers=headers)
+    api_client.post(f"{API}/groups/{home}/channels", json={"channel_ids": channel_ids[1:3]}, headers=headers)
+    api_client.put(f"{API}/channels/{channel_ids[0]}", json={"is_public": True}, headers=headers)
+
+    response = api_client.get(f"{API}/groups/", params={"include": "channels"}, headers=headers)
+    assert response.status_code == 200
+    tree = response.json()
+    assert {g["id"]: [c["id"] for c in g["channels"]] for g in tree["groups"]} == {
+        work: channel_ids[:2], home: channel_ids[1:3],
+    }
+    assert [c["id"] for c in tree["ungrouped"]] == channel_ids[3:]
+    shared = next(c for g in tree["groups"] for c in g["channels"] if c["id"] == channel_ids[1])
+    assert shared["group_ids"] == sorted([work, home])
+
+    cached = api_client.get(
+        f"{API}/groups/", params={"include": "channels"}, headers={**headers, "If-None-Match": response.headers["etag"]}
+    )
+    assert cached.status_code == 304
+
+    public = api_client.get(f"{API}/public/owner", params={"include": "channels"}).json()
+    assert "email" not in public["user"]
+    assert {g["id"]: [c["id"] for c in g["channels"]] for g in public["groups"]} == {work: channel_ids[:1], home: []}
+    assert public["ungrouped"] == []
@@ -0,0 +1,73 @@
+# Tests for avatar image decoding
+import io
+
+import pytest
+from PIL import Image
+
+from app.core import image_utils
+from app.core.image_utils import (
+    _render_avatar, avatar_target_size, decode_avatar_image, is_safe_image_file, open_avatar_image,
+)
+
+
+def _write_image(path, size, fmt):
+    Image.new("RGB", size, (10, 120, 200)).save(path, fmt)
+    return str(path)
+
+
+def test_large_jpeg_is_decoded_in_draft_mode(tmp_path):
+    """Oversized JPEGs are scaled down by the decoder itself."""
+    path = _write_image(tmp_path / "big.jpg", (4000, 3000), "JPEG")
+
+    with open_avatar_image(path) as img:
+        assert avatar_target_size(img.size) == (400, 300)
+        img.draft(None, avatar_target_size(img.size))
+        # libjpeg picks the largest 1/n scale that still covers the target size
+        assert img.size == (500, 375)
+
+    with open_avatar_image(path) as img:
+        assert decode_avatar_image(img).size == (400, 300)
+
+
+def test_render_avatar_fits_target_size(tmp_path):
+    """Rendered avatars fit within AVATAR_SIZE and keep their format."""
+    path = _write_image(tmp_path / "big.png", (1600, 800), "PNG")
+
+    data = _render_avatar(path, ".png")
+
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == "PNG"
+        assert img.size == (400, 200)
+
+
+def test_pixel_budget_is_enforced_before_decode(tmp_path, monkeypatch):
+    """Images over the pixel budget are rejected from their header alone."""
+    path = _write_image(tmp_path / "wide.png", (300, 300), "PNG")
+    monkeypatch.setattr(image_utils, "MAX_IMAGE_PIXELS", 300 * 299)
+
+    with pytest.raises(ValueError):
+        open_avatar_image(path)
+    assert not is_safe_image_file(path, "image/png")
+
+
+def test_large_png_is_rejected_but_jpeg_of_same_size_is_not(tmp_path):
+    """Formats without draft decoding keep the full-decode size limit."""
+    png = _write_image(tmp_path / "big.png", (3000, 2000), "PNG")
+    jpeg = _write_image(tmp_path / "big.jpg", (3000, 2000), "JPEG")
+
+    with pytest.raises(ValueError):
+        open_avatar_image(png)
+    assert not is_safe_image_file(png, "image/png")
+    with open_avatar_image(jpeg) as img:
+        assert img.size == (3000, 2000)
+
+
+def test_truncated_image_is_rejected(tmp_path):
+    """Corrupt image data fails validation."""
+    path = _write_image(tmp_path / "ok.jpg", (600, 600), "JPEG")
+    assert is_safe_image_file(path, "image/jpeg")
+
+    data = open(path, "rb").read()
+    with open(path, "wb") as f:
+        f.write(data[: len(data) // 3])
+    assert not is_safe_image_file(path, "image/jpeg")
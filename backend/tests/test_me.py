@@ -0,0 +1,33 @@
+# Dashboard bootstrap in one round trip
+import re
+
+from app.models.contact import Contact
+from app.models.group import Group
+
+
+def test_bootstrap_combines_dashboard_and_supports_etag(api_client, api_session, make_user):
+    user_id, headers = make_user("owner")
+    friend_id, _ = make_user("friend")
+    with api_session() as session:
+        session.add_all([Group(user_id=user_id, name="Work"), Contact(user_id=user_id, contact_user_id=friend_id)])
+        session.commit()
+    api_client.post("/api/v1/channels", json={"type": "email", "value": "me@example.com"}, headers=headers)
+
+    response = api_client.get("/api/v1/me/bootstrap", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["username"] == "owner"
+    assert body["channels"] == api_client.get("/api/v1/channels", headers=headers).json()
+    assert [g["name"] for g in body["groups"]] == ["Work"]
+    assert [c["username"] for c in body["contacts"]] == ["friend"]
+    assert body["security"] == api_client.get("/api/v1/auth/security", headers=headers).json()
+    # пользователь, каналы, группы каналов, группы, контакты
+    assert re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1) == "5"
+
+    etag = response.headers["etag"]
+    assert api_client.get("/api/v1/me/bootstrap", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    api_client.post("/api/v1/channels", json={"type": "phone", "value": "+1"}, headers=headers)
+    changed = api_client.get("/api/v1/me/bootstrap", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,23 @@
+# Tests for the Prometheus metrics endpoint
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+
+def test_metrics_endpoint_reports_route_templates():
+    """Requests are labelled by route template, not by raw path."""
+    client = TestClient(app)
+    client.get("/health")
+    client.put("/api/v1/storage/upload/some-forged-token", content=b"x")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert 'route="/api/v1/storage/upload/{token}",status="403"' in body
+    assert "some-forged-token" not in body
+    assert "http_request_duration_seconds_bucket" in body
+    assert "http_requests_in_progress" in body
+    assert "avatar_jobs_queued" in body
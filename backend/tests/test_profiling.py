@@ -0,0 +1,49 @@
+# Tests for the sampling request profiler
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiling import ProfilingMiddleware, write_profile
+
+
+def busy_loop(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def make_client(tmp_path, monkeypatch) -> TestClient:
+    monkeypatch.setattr("app.core.profiling.settings.PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr("app.core.profiling.settings.PROFILE_TOKEN", "secret")
+    monkeypatch.setattr("app.core.profiling.settings.PROFILE_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr("app.core.profiling.settings.PROFILE_INTERVAL_MS", 1.0)
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int) -> dict:
+        busy_loop(0.05)
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+def test_authorized_header_writes_folded_profile(tmp_path, monkeypatch):
+    """Profile file is named after the route template and contains the handler's stack."""
+    client = make_client(tmp_path, monkeypatch)
+
+    client.get("/items/1")
+    assert list(tmp_path.iterdir()) == []
+
+    client.get("/items/1", headers={"X-Profile-Token": "secret"})
+    [profile] = list(tmp_path.glob("*.folded"))
+    assert "_GET_items_item_id_" in profile.name
+    assert "busy_loop" in profile.read_text()
+
+
+def test_retention_keeps_newest_profiles(tmp_path):
+    for i in range(5):
+        write_profile(tmp_path, f"{i}.folded", "main 1\n", max_files=3)
+    assert len(list(tmp_path.glob("*.folded"))) == 3
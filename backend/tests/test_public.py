@@ -0,0 +1,51 @@
+# Public profiles: batch lookup
+import re
+
+from app.models.channel import Channel
+from app.models.group import Group
+
+API = "/api/v1/public"
+
+
+def _query_count(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+
+def _seed(api_session, make_user, count):
+    for n in range(count):
+        user_id, _ = make_user(f"user{n}")
+        with api_session() as session:
+            session.add_all([
+                Channel(user_id=user_id, type="email", value=f"user{n}@example.com", is_public=True),
+                Channel(user_id=user_id, type="phone", value=f"+{n}", is_public=False),
+                Group(user_id=user_id, name="Work"),
+            ])
+            session.commit()
+
+
+def test_batch_lookup_uses_constant_queries_and_reports_misses(api_client, api_session, make_user):
+    _seed(api_session, make_user, 3)
+
+    small = api_client.get(API, params={"usernames": "user0,nobody"})
+    assert small.status_code == 200
+    assert list(small.json()["profiles"]) == ["user0"]
+    assert small.json()["missing"] == ["nobody"]
+
+    names = [f"user{n}" for n in (2, 0, 1)]
+    response = api_client.post(f"{API}/batch", json={"usernames": names + ["ghost", "user0"]})
+    body = response.json()
+    assert list(body["profiles"]) == names
+    assert body["missing"] == ["ghost"]
+    profile = body["profiles"]["user2"]
+    assert "email" not in profile["user"]
+    assert [c["value"] for c in profile["channels"]] == ["user2@example.com"]
+    assert [g["name"] for g in profile["groups"]] == ["Work"]
+    assert _query_count(response) == _query_count(small)
+
+    single = api_client.get(f"{API}/user2").json()
+    assert single == profile
+
+
+def test_batch_lookup_is_capped(api_client, monkeypatch):
+    monkeypatch.setattr("app.api.routes.public.settings.PUBLIC_BATCH_MAX_USERNAMES", 2)
+    assert api_client.get(API, params={"usernames": "a,b,c"}).status_code == 400
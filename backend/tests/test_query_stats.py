@@ -0,0 +1,42 @@
+# Tests for per-request SQL instrumentation
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db.query_stats import NPlusOneError, install_query_hooks, param_shape, track_queries
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    install_query_hooks(engine)
+    return engine
+
+
+def test_queries_are_counted_per_scope(engine):
+    """Only statements inside the tracking scope are counted."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with track_queries("test") as stats:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    assert stats.count == 2
+    assert stats.duration > 0
+
+
+def test_repeated_statement_raises_in_raise_mode(engine, monkeypatch):
+    """The same statement template over the threshold is reported as N+1."""
+    monkeypatch.setattr("app.db.query_stats.settings.SQL_N_PLUS_ONE_MODE", "raise")
+    monkeypatch.setattr("app.db.query_stats.settings.SQL_N_PLUS_ONE_THRESHOLD", 3)
+
+    with engine.connect() as conn, track_queries("loop"):
+        for i in range(3):
+            conn.execute(text("SELECT :i"), {"i": i})
+        with pytest.raises(NPlusOneError):
+            conn.execute(text("SELECT :i"), {"i": 3})
+
+
+def test_param_shape_hides_values():
+    """Slow query logs describe parameters by type only."""
+    assert param_shape({"email": "a@b.c", "id": 1}) == "{email: str, id: int}"
+    assert param_shape((1, "x")) == "(int, str)"
+    assert param_shape([(1,), (2,)], executemany=True) == "2 x (int)"
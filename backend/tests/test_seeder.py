@@ -0,0 +1,35 @@
+# Tests for the bulk dataset seeder
+from sqlalchemy import create_engine, func, select
+
+from app.db.base import Base
+from app.db.seeder import SeedPlan, seed, seed_username
+from app.models.channel import Channel, ChannelType
+from app.models.channel_groups import channel_groups
+from app.models.group import Group
+from app.models.user import User
+
+
+def test_seed_generates_linked_dataset_and_replaces_previous_run(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.db'}")
+    Base.metadata.create_all(engine)
+    plan = SeedPlan(users=300, seed=1)
+
+    seed(engine, plan, password_hash="hash")
+    result = seed(engine, plan, password_hash="hash")
+
+    with engine.connect() as conn:
+        assert conn.scalar(select(func.count()).select_from(User)) == 300
+        assert conn.scalar(select(func.count()).select_from(Channel)) == result["rows"]["channels"]
+        types = set(conn.scalars(select(Channel.type).distinct()))
+        assert types == {t.value for t in ChannelType}
+
+        # Связи канал-группа не пересекают границы пользователей
+        mismatched = conn.scalar(
+            select(func.count())
+            .select_from(channel_groups)
+            .join(Channel, Channel.id == channel_groups.c.channel_id)
+            .join(Group, Group.id == channel_groups.c.group_id)
+            .where(Channel.user_id != Group.user_id)
+        )
+        assert mismatched == 0
+        assert conn.scalar(select(User.username).order_by(User.id).limit(1)) == seed_username(1)
@@ -0,0 +1,40 @@
+# Worker pool sizing and the startup migration check
+import pytest
+from sqlalchemy import create_engine
+
+from app.core.server import cgroup_cpu_limit, cgroup_memory_limit, default_worker_count
+from app.db.migrations import PendingMigrationsError, check_migrations
+
+
+def test_cgroup_limits_v2_and_v1(tmp_path):
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    (v2 / "cpu.max").write_text("150000 100000\n")
+    (v2 / "memory.max").write_text(str(512 * 1024 * 1024))
+    assert cgroup_cpu_limit(v2) == 1.5
+    assert cgroup_memory_limit(v2) == 512 * 1024 * 1024
+    # 2 ядра по квоте, но память позволяет только 3 воркера по 160 МБ -> 2
+    assert default_worker_count(160, v2) <= 2
+
+    (v2 / "cpu.max").write_text("max 100000")
+    (v2 / "memory.max").write_text("max")
+    assert cgroup_cpu_limit(v2) is None
+    assert cgroup_memory_limit(v2) is None
+
+    v1 = tmp_path / "v1"
+    (v1 / "cpu").mkdir(parents=True)
+    (v1 / "memory").mkdir()
+    (v1 / "cpu" / "cpu.cfs_quota_us").write_text("-1")
+    (v1 / "cpu" / "cpu.cfs_period_us").write_text("100000")
+    (v1 / "memory" / "memory.limit_in_bytes").write_text(str(100 * 1024 * 1024))
+    assert cgroup_cpu_limit(v1) is None
+    # Памяти меньше, чем нужно одному воркеру, но хотя бы один запускается всегда
+    assert default_worker_count(160, v1) == 1
+
+
+def test_check_migrations_modes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    check_migrations(engine, "off")
+    with pytest.raises(PendingMigrationsError):
+        check_migrations(engine, "check")
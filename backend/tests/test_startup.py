@@ -0,0 +1,45 @@
+# Import-time budget: building the app must not pull in heavy optional subsystems
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Импортируются только при первом использовании
+LAZY_MODULES = ["PIL", "magic", "authlib", "httpx", "app.core.supabase_storage", "opentelemetry.sdk"]
+
+# Щедрый лимит для CI; основная проверка — отсутствие тяжелых модулей
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "5"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def test_app_import_is_lazy_and_within_budget(tmp_path):
+    env = {**os.environ, "LOCAL_STORAGE_DIR": str(tmp_path / "uploads")}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE % LAZY_MODULES],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["seconds"] < IMPORT_BUDGET_SECONDS
+    # Каталог локального хранилища готов до первой загрузки; импорт ничего не печатает
+    assert (tmp_path / "uploads").is_dir()
+    assert result.stdout.strip().count("\n") == 0
+
+
+def test_create_app_builds_independent_apps():
+    from app.main import create_app
+
+    first, second = create_app(), create_app()
+    assert first is not second
+    assert {route.path for route in first.routes} == {route.path for route in second.routes}
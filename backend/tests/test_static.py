@@ -0,0 +1,74 @@
+# Tests for avatar static file serving
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.static import AvatarStaticFiles, IMMUTABLE_CACHE_CONTROL
+
+HASHED_NAME = "avatar_1_0123456789abcdef0123.png"
+
+
+@pytest.fixture
+def static_client(tmp_path):
+    (tmp_path / "avatars" / "1").mkdir(parents=True)
+    (tmp_path / "avatars" / "1" / HASHED_NAME).write_bytes(b"hashed")
+    (tmp_path / "avatars" / "legacy.png").write_bytes(b"legacy")
+    (tmp_path / "originals" / "1").mkdir(parents=True)
+    (tmp_path / "originals" / "1" / "raw.png").write_bytes(b"raw")
+
+    app = FastAPI()
+    app.mount("/uploads", AvatarStaticFiles(directory=str(tmp_path)), name="uploads")
+    return TestClient(app)
+
+
+def test_hashed_avatar_is_immutable(static_client):
+    """Content-hashed avatars get a year-long immutable cache and a strong ETag."""
+    response = static_client.get(f"/uploads/avatars/1/{HASHED_NAME}")
+    assert response.status_code == 200
+    assert response.content == b"hashed"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["etag"] == '"0123456789abcdef0123"'
+
+
+def test_conditional_request_returns_304(static_client):
+    """A matching If-None-Match is answered without a body and counted as a cache hit."""
+    labels = {"cache": "avatar_static", "result": "hit"}
+    before = REGISTRY.get_sample_value("cache_requests_total", labels) or 0
+    response = static_client.get(
+        f"/uploads/avatars/1/{HASHED_NAME}", headers={"If-None-Match": '"0123456789abcdef0123"'}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert REGISTRY.get_sample_value("cache_requests_total", labels) == before + 1
+
+
+def test_legacy_avatar_uses_short_cache(static_client):
+    """Names without a content hash are only cached briefly."""
+    response = static_client.get("/uploads/avatars/legacy.png")
+    assert response.status_code == 200
+    assert "immutable" not in response.headers["cache-control"]
+
+
+def test_originals_are_not_served(static_client):
+    """Raw uploads awaiting processing are not publicly readable."""
+    assert static_client.get("/uploads/originals/1/raw.png").status_code == 404
+
+
+def test_sendfile_header(static_client, monkeypatch):
+    """With a sendfile header configured the body is left to the proxy."""
+    monkeypatch.setattr("app.core.static.settings.AVATAR_SENDFILE_HEADER", "X-Accel-Redirect")
+    response = static_client.get(f"/uploads/avatars/1/{HASHED_NAME}")
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/protected-uploads/avatars/1/{HASHED_NAME}"
+    assert response.headers["content-type"] == "image/png"
+
+
+def test_missing_upload_is_404_before_first_upload(tmp_path, monkeypatch):
+    """The app creates the storage directory, so unknown avatars are 404 rather than 500."""
+    from app.main import create_app
+
+    monkeypatch.setattr("app.main.settings.LOCAL_STORAGE_DIR", str(tmp_path / "uploads"))
+    client = TestClient(create_app())
+    assert client.get("/uploads/avatars/1/missing.png").status_code == 404
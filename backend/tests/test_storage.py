@@ -0,0 +1,170 @@
+# Tests for storage backends
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.storage import LocalStorage, StorageError, guess_content_type
+from app.core.supabase_storage import SupabaseStorage
+
+
+def test_guess_content_type():
+    """Content type follows the file extension."""
+    assert guess_content_type("avatar.png") == "image/png"
+    assert guess_content_type("avatar.webp") == "image/webp"
+    assert guess_content_type("avatar.JPG") == "image/jpeg"
+
+
+def test_local_storage_roundtrip(tmp_path):
+    """Local stand-in stores, maps URLs back to keys and deletes objects."""
+    storage = LocalStorage(root=str(tmp_path), base_url="http://testserver")
+
+    url = asyncio.run(storage.upload("avatars/1/a.png", b"data"))
+    assert url == "http://testserver/uploads/avatars/1/a.png"
+    assert (tmp_path / "avatars" / "1" / "a.png").read_bytes() == b"data"
+    assert storage.key_for_url(url) == "avatars/1/a.png"
+
+    assert asyncio.run(storage.delete("avatars/1/a.png")) is True
+    assert asyncio.run(storage.delete("avatars/1/a.png")) is False
+
+
+def test_local_storage_rejects_path_traversal(tmp_path):
+    """Keys cannot escape the storage root."""
+    storage = LocalStorage(root=str(tmp_path))
+    with pytest.raises(StorageError):
+        asyncio.run(storage.upload("../escape.png", b"data"))
+
+
+def test_supabase_upload_retries_transient_errors():
+    """Transient 503s are retried and the content type is sent correctly."""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"Key": "avatars/avatars/1/a.webp"})
+
+    storage = SupabaseStorage(
+        url="https://example.supabase.co", key="secret", bucket="avatars",
+        transport=httpx.MockTransport(handler),
+    )
+    storage.retry_backoff = 0
+
+    async def upload():
+        try:
+            return await storage.upload("avatars/1/a.webp", b"data")
+        finally:
+            await storage.aclose()
+
+    url = asyncio.run(upload())
+    assert url == "https://example.supabase.co/storage/v1/object/public/avatars/avatars/1/a.webp"
+    assert len(calls) == 3
+    assert calls[-1].headers["content-type"] == "image/webp"
+    assert calls[-1].headers["authorization"] == "Bearer secret"
+
+
+def test_supabase_upload_gives_up_after_max_retries():
+    """Persistent failures surface as StorageError."""
+    storage = SupabaseStorage(
+        url="https://example.supabase.co", key="secret", bucket="avatars",
+        transport=httpx.MockTransport(lambda request: httpx.Response(500)),
+    )
+    storage.retry_backoff = 0
+
+    with pytest.raises(StorageError):
+        asyncio.run(storage.upload("avatars/1/a.png", b"data"))
+
+
+def test_local_signed_upload(tmp_path, monkeypatch, api_session):
+    """Signed URLs issued by the local stand-in accept exactly the signed upload."""
+    from fastapi.testclient import TestClient
+
+    from app.core.storage import local_storage
+    from app.main import app
+
+    monkeypatch.setattr(local_storage, "root", tmp_path)
+    signed = asyncio.run(local_storage.create_signed_upload("originals/1/a.png", "image/png", 600))
+    assert signed.method == "PUT"
+    path = signed.url.split("/api/v1", 1)[1]
+
+    client = TestClient(app)
+    response = client.put(f"/api/v1{path}", content=b"png-bytes", headers={"Content-Type": "image/jpeg"})
+    assert response.status_code == 400
+
+    response = client.put(f"/api/v1{path}", content=b"png-bytes", headers=signed.headers)
+    assert response.status_code == 201
+    assert (tmp_path / "originals" / "1" / "a.png").read_bytes() == b"png-bytes"
+
+    # Ссылка одноразовая: повторная загрузка по тому же ключу отклоняется
+    response = client.put(f"/api/v1{path}", content=b"other", headers=signed.headers)
+    assert response.status_code == 409
+    assert (tmp_path / "originals" / "1" / "a.png").read_bytes() == b"png-bytes"
+
+    response = client.put("/api/v1/storage/upload/forged", content=b"x", headers=signed.headers)
+    assert response.status_code == 403
+
+
+def test_supabase_signed_upload_is_single_use():
+    """Signed Supabase uploads do not overwrite: a second PUT to the same URL fails."""
+    stored = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(200, json={"url": "/object/upload/sign/avatars/originals/1/a.png?token=t"})
+        # Поведение Supabase: существующий объект перезаписывается только с x-upsert: true
+        if request.url.path in stored and request.headers.get("x-upsert") != "true":
+            return httpx.Response(400, json={"error": "Duplicate"})
+        stored[request.url.path] = request.content
+        return httpx.Response(200, json={"Key": "avatars/originals/1/a.png"})
+
+    transport = httpx.MockTransport(handler)
+    storage = SupabaseStorage(url="https://example.supabase.co", key="secret", bucket="avatars", transport=transport)
+
+    async def sign_and_put_twice():
+        try:
+            signed = await storage.create_signed_upload("originals/1/a.png", "image/png", 600)
+        finally:
+            await storage.aclose()
+        async with httpx.AsyncClient(transport=transport) as client:
+            first = await client.put(signed.url, content=b"png-bytes", headers=signed.headers)
+            second = await client.put(signed.url, content=b"other", headers=signed.headers)
+        return first, second
+
+    first, second = asyncio.run(sign_and_put_twice())
+    assert first.status_code == 200
+    assert second.status_code == 400
+    assert list(stored.values()) == [b"png-bytes"]
+
+
+def test_signed_upload_expiry_follows_expires_in(tmp_path, monkeypatch):
+    """The expiry signed into the token is the one requested, not the global default."""
+    from app.core.storage import local_storage
+
+    monkeypatch.setattr(local_storage, "root", tmp_path)
+    short = asyncio.run(local_storage.create_signed_upload("originals/1/b.png", "image/png", 5))
+    token = short.url.rsplit("/", 1)[1]
+    assert local_storage.verify_upload_token(token)["key"] == "originals/1/b.png"
+
+    now = time.time()
+    monkeypatch.setattr("app.core.storage.time.time", lambda: now + 10)
+    with pytest.raises(StorageError, match="expired"):
+        local_storage.verify_upload_token(token)
+
+
+def test_supabase_download_streams_to_file(tmp_path):
+    """Downloads are written to the destination and capped at max_bytes."""
+    storage = SupabaseStorage(
+        url="https://example.supabase.co", key="secret", bucket="avatars",
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 1000)),
+    )
+    dest = tmp_path / "original.png"
+
+    async def download(max_bytes):
+        return await storage.download("originals/1/a.png", str(dest), max_bytes)
+
+    assert asyncio.run(download(1000)) == 1000
+    assert dest.read_bytes() == b"x" * 1000
+    with pytest.raises(StorageError, match="exceeds"):
+        asyncio.run(download(10))
@@ -0,0 +1,145 @@
+# Contact book delta sync
+from app.crud import contact as crud_contact
+from app.crud.sync import encode_cursor
+
+SYNC_URL = "/api/v1/contacts/sync"
+
+
+def _sync(api_client, headers, cursor=None):
+    response = api_client.get(SYNC_URL, params={"cursor": cursor} if cursor else None, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_delta_sync_returns_only_changes_with_tombstones(api_client, api_session, make_user):
+    me, headers = make_user("me")
+    friend, friend_headers = make_user("friend")
+    stranger, stranger_headers = make_user("stranger")
+    with api_session() as session:
+        crud_contact.create_contact(session, me, friend)
+
+    shared = api_client.post(
+        "/api/v1/channels", json={"type": "email", "value": "f@example.com", "is_public": True}, headers=friend_headers
+    ).json()
+    api_client.post("/api/v1/channels", json={"type": "phone", "value": "+1"}, headers=friend_headers)
+
+    full = _sync(api_client, headers)
+    assert full["full"] is True
+    assert [c["username"] for c in full["contacts"]] == ["friend"]
+    assert [c["id"] for c in full["channels"]] == [shared["id"]]
+
+    assert _sync(api_client, headers, full["cursor"])["channels"] == []
+
+    # Изменения друга и постороннего пользователя
+    second = api_client.post(
+        "/api/v1/channels", json={"type": "telegram", "value": "@f", "is_public": True}, headers=friend_headers
+    ).json()
+    api_client.put(f"/api/v1/channels/{shared['id']}", json={"is_public": False}, headers=friend_headers)
+    api_client.post("/api/v1/channels", json={"type": "email", "value": "s@example.com", "is_public": True},
+                    headers=stranger_headers)
+    api_client.put("/api/v1/auth/profile", json={"bio": "hello"}, headers=friend_headers)
+
+    delta = _sync(api_client, headers, full["cursor"])
+    assert delta["full"] is False
+    assert [c["id"] for c in delta["channels"]] == [second["id"]]
+    assert delta["removed_channels"] == [shared["id"]]
+    assert [p["bio"] for p in delta["profiles"]] == ["hello"]
+
+    # Новый контакт приходит целиком, удаленный — надгробием
+    with api_session() as session:
+        crud_contact.create_contact(session, me, stranger)
+        crud_contact.remove_contact(session, me, friend)
+    delta = _sync(api_client, headers, delta["cursor"])
+    assert [c["username"] for c in delta["contacts"]] == ["stranger"]
+    assert [c["value"] for c in delta["channels"]] == ["s@example.com"]
+    assert delta["removed_contacts"] == [friend]
+
+
+def test_group_membership_changes_reach_delta_sync(api_client, api_session, make_user):
+    me, headers = make_user("me")
+    friend, friend_headers = make_user("friend")
+    with api_session() as session:
+        crud_contact.create_contact(session, me, friend)
+    channel = api_client.post(
+        "/api/v1/channels", json={"type": "email", "value": "f@example.com", "is_public": True}, headers=friend_headers
+    ).json()
+    group = api_client.post("/api/v1/groups/", json={"name": "work"}, headers=friend_headers).json()
+    cursor = _sync(api_client, headers)["cursor"]
+
+    api_client.post(f"/api/v1/groups/{group['id']}/channels", json={"channel_ids": [channel["id"]]},
+                    headers=friend_headers)
+    delta = _sync(api_client, headers, cursor)
+    assert [c["group_ids"] for c in delta["channels"]] == [[group["id"]]]
+
+    api_client.put(f"/api/v1/channels/{channel['id']}/groups", json={"group_ids": []}, headers=friend_headers)
+    delta = _sync(api_client, headers, delta["cursor"])
+    assert [c["group_ids"] for c in delta["channels"]] == [[]]
+
+    api_client.put(f"/api/v1/channels/{channel['id']}/groups", json={"group_ids": [group["id"]]},
+                   headers=friend_headers)
+    cursor = _sync(api_client, headers, delta["cursor"])["cursor"]
+    api_client.delete(f"/api/v1/groups/{group['id']}/channels", params={"channel_ids": [channel["id"]]},
+                      headers=friend_headers)
+    delta = _sync(api_client, headers, cursor)
+    assert [c["group_ids"] for c in delta["channels"]] == [[]]
+
+    # Изменения без эффекта в журнал не попадают
+    api_client.delete(f"/api/v1/groups/{group['id']}/channels", params={"channel_ids": [channel["id"]]},
+                      headers=friend_headers)
+    delta = _sync(api_client, headers, delta["cursor"])
+    assert delta["channels"] == []
+
+    api_client.put(f"/api/v1/channels/{channel['id']}/groups", json={"group_ids": [group["id"]]},
+                   headers=friend_headers)
+    cursor = _sync(api_client, headers, delta["cursor"])["cursor"]
+    api_client.delete(f"/api/v1/groups/{group['id']}", headers=friend_headers)
+    assert [c["group_ids"] for c in _sync(api_client, headers, cursor)["channels"]] == [[]]
+
+
+def test_sync_pages_and_rejects_bad_cursors(api_client, api_session, make_user, monkeypatch):
+    me, headers = make_user("me")
+    friend, friend_headers = make_user("friend")
+    with api_session() as session:
+        crud_contact.create_contact(session, me, friend)
+    cursor = _sync(api_client, headers)["cursor"]
+
+    monkeypatch.setattr("app.crud.sync.settings.SYNC_PAGE_SIZE", 2)
+    api_client.post("/api/v1/channels/batch", json={"operations": [
+        {"op": "create", "type": "email", "value": f"{i}@example.com", "is_public": True} for i in range(5)
+    ]}, headers=friend_headers)
+
+    received, pages = [], 0
+    while True:
+        page = _sync(api_client, headers, cursor)
+        received += [c["value"] for c in page["channels"]]
+        cursor, pages = page["cursor"], pages + 1
+        if not page["has_more"]:
+            break
+    assert received == [f"{i}@example.com" for i in range(5)]
+    assert pages == 3
+
+    assert api_client.get(SYNC_URL, params={"cursor": "garbage"}, headers=headers).status_code == 400
+    assert api_client.get(SYNC_URL, params={"cursor": encode_cursor(0, issued_at=0)}, headers=headers).status_code == 410
+
+
+def test_maintenance_prunes_change_log_past_retention(api_session, make_user, monkeypatch):
+    from datetime import datetime, timedelta
+
+    from sqlalchemy import select
+
+    from app.models.change_log import ChangeLog
+    from app.workers import maintenance
+
+    me, _ = make_user("me")
+    friend, _ = make_user("friend")
+    with api_session() as session:
+        crud_contact.create_contact(session, me, friend)
+        crud_contact.remove_contact(session, me, friend)
+        oldest = session.scalar(select(ChangeLog).order_by(ChangeLog.seq))
+        oldest.created_at = datetime.utcnow() - timedelta(days=31)
+        session.commit()
+
+    monkeypatch.setattr(maintenance, "SessionLocal", api_session)
+    assert maintenance.prune_change_log() == 1
+    with api_session() as session:
+        assert [row.op for row in session.scalars(select(ChangeLog))] == ["delete"]
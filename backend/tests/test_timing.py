@@ -0,0 +1,49 @@
+# Tests for the Server-Timing header
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.timing import ServerTimingMiddleware, TimedJSONResponse, phase
+from app.db.query_stats import QueryStatsMiddleware, install_query_hooks
+
+
+def make_app() -> FastAPI:
+    engine = create_engine("sqlite://")
+    install_query_hooks(engine)
+
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/work")
+    def work() -> dict:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+        with phase("storage"):
+            pass
+        return {"ok": True}
+
+    return app
+
+
+def test_server_timing_breaks_down_phases():
+    """DB, storage, serialization and total time are reported per request."""
+    response = TestClient(make_app()).get("/work")
+
+    header = response.headers["server-timing"]
+    names = [part.split(";")[0] for part in header.split(", ")]
+    assert names[-1] == "total"
+    assert {"db", "storage", "serialize"} <= set(names)
+    assert 'desc="2 queries"' in header
+
+
+def test_timing_allow_origin_only_for_cors_origins(monkeypatch):
+    monkeypatch.setattr("app.core.timing.settings.CORS_ORIGINS", ["http://localhost:3000"])
+    client = TestClient(make_app())
+
+    allowed = client.get("/work", headers={"Origin": "http://localhost:3000"})
+    other = client.get("/work", headers={"Origin": "http://evil.example"})
+
+    assert allowed.headers["timing-allow-origin"] == "http://localhost:3000"
+    assert "timing-allow-origin" not in other.headers
@@ -0,0 +1,70 @@
+# Tests for OpenTelemetry tracing setup
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from app.core import tracing
+
+
+def test_route_and_sql_spans_share_a_trace(tmp_path, monkeypatch):
+    """A request produces a server span with SQL and manual spans as children, exported to a file."""
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_ENABLED", True)
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_EXPORTER", "file")
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_FILE", str(trace_file))
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_SAMPLE_RATE", 1.0)
+
+    engine = create_engine("sqlite://")
+    app = FastAPI()
+
+    @app.get("/work")
+    def work() -> dict:
+        with tracing.tracer.start_as_current_span("work.manual"):
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    tracing.setup_tracing(app, engine)
+    try:
+        TestClient(app).get("/work")
+    finally:
+        tracing.shutdown_tracing()
+
+    spans = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    by_name = {span["name"]: span for span in spans}
+    assert {"GET /work", "work.manual"} <= set(by_name)
+    assert any(span["attributes"].get("db.statement") == "SELECT 1" for span in spans)
+    assert len({span["context"]["trace_id"] for span in spans}) == 1
+
+
+def test_every_app_instance_is_instrumented(tmp_path, monkeypatch):
+    """Apps built in the same process, including after a shutdown, get route spans from one provider."""
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_ENABLED", True)
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_EXPORTER", "file")
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_FILE", str(tmp_path / "traces.jsonl"))
+    monkeypatch.setattr("app.core.tracing.settings.TRACING_SAMPLE_RATE", 1.0)
+
+    first, second = FastAPI(), FastAPI()
+    tracing.setup_tracing(first)
+    provider = tracing._provider
+    exporter = InMemorySpanExporter()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracing.shutdown_tracing()
+
+    # Как при повторном create_app() или перезагрузке: провайдер тот же и продолжает экспортировать
+    tracing.setup_tracing(second)
+    assert tracing._provider is provider
+
+    @second.get("/ping")
+    def ping() -> dict:
+        return {"ok": True}
+
+    TestClient(second).get("/ping")
+    tracing.shutdown_tracing()
+    assert first._is_instrumented_by_opentelemetry
+    assert "GET /ping" in {span.name for span in exporter.get_finished_spans()}
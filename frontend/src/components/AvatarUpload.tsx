@@ -19,6 +19,12 @@ const getFullAvatarUrl = (avatarUrl: string | null): string | null => {
   return `${backendBase}${avatarUrl}`;
 };
 
+interface AvatarJob {
+  status: string;
+  avatar_url: string | null;
+  error: string | null;
+}
+
 interface AvatarUploadProps {
   currentAvatarUrl?: string | null;
   onAvatarUpdate: (newAvatarUrl: string) => void;
@@ -71,7 +77,7 @@ export default function AvatarUpload({
       console.log('FormData created, sending request...');
       console.log('FormData entries:', Array.from(formData.entries()));
 
-      const response = await api<{ avatar_url: string }>(
+      const response = await api<{ job_id: string; status: string }>(
         "/auth/avatar",
         { 
           method: "POST", 
@@ -81,8 +87,20 @@ export default function AvatarUpload({
       );
 
       console.log('Upload response:', response);
-      console.log('Avatar URL from response:', response.avatar_url);
-      onAvatarUpdate(response.avatar_url);
+
+      // Обработка идет в фоне — опрашиваем статус задачи
+      let job: AvatarJob = { status: response.status, avatar_url: null, error: null };
+      while (job.status === 'queued' || job.status === 'processing') {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        job = await api<AvatarJob>(`/auth/avatar/jobs/${response.job_id}`, {}, token);
+      }
+
+      if (job.status !== 'done' || !job.avatar_url) {
+        throw new Error(job.error || 'Ошибка обработки изображения');
+      }
+
+      console.log('Avatar URL from job:', job.avatar_url);
+      onAvatarUpdate(job.avatar_url);
     } catch (err) {
       console.error('Upload error:', err);
       setError(err instanceof Error ? err.message : 'Ошибка загрузки');